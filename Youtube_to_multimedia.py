@@ -1,57 +1,33 @@
+import time
+
+STARTED = time.perf_counter()  # the startup report counts from here, imports included
+
 import os
 import sys
-import math
-import textwrap
-import threading
-import time
-import queue
-from pathlib import Path
-from urllib.parse import urlparse
 
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 
-import yt_dlp as ydl
+# Only yt-dlp-free parts of ytmedia here: the engine (and yt-dlp) load on EngineLoader's thread.
+from ytmedia import (AuthOptions, BandwidthManager, Batch, InfoCache, Job, JobJournal, JobOptions, Library,
+                     MetricsExporter)
+from ytmedia.clients import ClientStats
+from ytmedia.cookies import CookieCache
+from ytmedia.options import AUDIO_BITRATES, BROWSERS, MAX_VBR_KBPS, PRIORITIES, QUALITIES, abr_from_label
+from ytmedia.startup import EngineLoader, StartupTimer
+from ytmedia.uibus import LogRing, UIEventBus
+from ytmedia.urls import is_collection_url, is_youtube_url
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
-QUALITIES = ["Best (auto)", "720p progressive bias", "1080p", "1440p", "2160p (4K)"]
-
-# Audio bitrate choices (minimum preferred bitrate for selecting bestaudio)
-AUDIO_BITRATES = [
-    "Auto",
-    "≥64 kbps",
-    "≥96 kbps",
-    "≥128 kbps",
-    "≥160 kbps",
-    "≥192 kbps",
-    "≥256 kbps",
-    "≥320 kbps",
-]
-
-# Map display label -> yt-dlp audio selector chunk (primary selector only)
-ABR_FILTERS = {
-    "Auto": "ba",
-    "≥64 kbps": "ba[abr>=64]",
-    "≥96 kbps": "ba[abr>=96]",
-    "≥128 kbps": "ba[abr>=128]",
-    "≥160 kbps": "ba[abr>=160]",
-    "≥192 kbps": "ba[abr>=192]",
-    "≥256 kbps": "ba[abr>=256]",
-    "≥320 kbps": "ba[abr>=320]",
-}
-
-# Max slider value (in kbps) for video bitrate filter
-MAX_VBR_KBPS = 25000  # 25 Mbps
-
-TARGET_HEIGHT = {"1080p": 1080, "1440p": 1440, "2160p (4K)": 2160}
-
-BROWSERS = ["chrome", "edge", "opera", "brave", "vivaldi", "chromium", "firefox"]
+SPEED_LIMITS = ["Unlimited", "1 MB/s", "2 MB/s", "5 MB/s", "10 MB/s", "25 MB/s"]
 
 
 class App(ctk.CTk):
     def __init__(self):
+        self.startup = StartupTimer(STARTED)
+        self.startup.mark("imports")
         super().__init__()
         self.title("YouTube → MP4/Audio (yt-dlp ProfilePath GUI v2)")
         self.geometry("980x760")
@@ -69,19 +45,35 @@ class App(ctk.CTk):
         self.try_android_after = ctk.BooleanVar(value=True)  # try Android after normal fails
 
         # Threading / UI queue
-        self._ui_q = queue.Queue()
+        self._ui_bus = UIEventBus()
+        self.log_ring = LogRing(spill_path=os.environ.get("YTMEDIA_LOG_FILE") or None)
         self._busy = False
-        self._worker = None
-        self._cancel = threading.Event()
-        self._hook_last_ts = 0.0
-        self._last_pct_logged = -1
+        self.parallel = ctk.StringVar(value="2")
+        self.bandwidth = BandwidthManager()
+        # The engine loads yt-dlp and warms up on a background thread; jobs started before
+        # it is ready wait in _pending (see _on_engine_ready).
+        self.engine = None
+        self.jobs = None
+        self._pending = []
+        self.journal = JobJournal()
+        self.metrics = MetricsExporter()  # metrics.jsonl, plus $YTMEDIA_METRICS_PROM when set
+        self.batches = []
+        self.loader = EngineLoader(
+            lambda: self._create_engine(InfoCache(), Library(), ClientStats(), CookieCache()),
+            timer=self.startup,
+            on_ready=lambda _: self._ui("engine_ready"),
+        ).start()
         self.after(100, self._drain_ui_queue)
+        self.after_idle(lambda: self.startup.mark("window"))
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         # URL
         ctk.CTkLabel(self, text="YouTube URL:", font=("Arial", 14)).grid(
             row=0, column=0, sticky="w", padx=16, pady=(16, 6)
         )
-        self.url_entry = ctk.CTkEntry(self, width=930, placeholder_text="https://www.youtube.com/watch?v=...")
+        self.url_entry = ctk.CTkEntry(
+            self, width=930, placeholder_text="https://www.youtube.com/watch?v=...  (playlist and channel URLs work too)"
+        )
         self.url_entry.grid(row=1, column=0, padx=16, sticky="ew")
         self.url_entry.bind("<Return>", lambda _: self.start())
 
@@ -100,7 +92,7 @@ class App(ctk.CTk):
         row2.grid(row=3, column=0, padx=16, pady=(10, 0), sticky="ew")
         ctk.CTkLabel(row2, text="Quality:").grid(row=0, column=0, padx=(0, 8))
         self.q = ctk.StringVar(value="Best (auto)")
-        ctk.CTkOptionMenu(row2, variable=self.q, values=QUALITIES, width=220).grid(
+        ctk.CTkOptionMenu(row2, variable=self.q, values=list(QUALITIES), width=220).grid(
             row=0, column=1, padx=(0, 14)
         )
 
@@ -141,6 +133,59 @@ class App(ctk.CTk):
             command=self._on_reencode_toggle,
         ).grid(row=1, column=4, columnspan=3, sticky="w", pady=(6, 0))
 
+        self.autotune = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            row2,
+            text="Auto-tune download speed (fragments / chunk size)",
+            variable=self.autotune,
+        ).grid(row=2, column=0, columnspan=4, sticky="w", pady=(6, 0))
+
+        self.stream_audio = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            row2,
+            text="MP3/WAV: encode while downloading",
+            variable=self.stream_audio,
+        ).grid(row=3, column=0, columnspan=4, sticky="w", pady=(6, 0))
+
+        ctk.CTkLabel(row2, text="Connections per file:").grid(row=2, column=4, sticky="e", pady=(6, 0))
+        self.connections = ctk.StringVar(value="1")
+        ctk.CTkOptionMenu(row2, variable=self.connections, values=["1", "2", "4", "6", "8"], width=70).grid(
+            row=2, column=5, sticky="w", padx=(8, 0), pady=(6, 0)
+        )
+
+        self.hardlink = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            row2,
+            text="Hard-link videos already saved in another folder",
+            variable=self.hardlink,
+        ).grid(row=4, column=0, columnspan=4, sticky="w", pady=(6, 0))
+
+        self.race_clients = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            row2,
+            text="Try normal and Android clients at the same time",
+            variable=self.race_clients,
+        ).grid(row=4, column=4, columnspan=3, sticky="w", pady=(6, 0))
+
+        self.keep_partial = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            row2,
+            text="Keep partial files when cancelled",
+            variable=self.keep_partial,
+        ).grid(row=5, column=0, columnspan=4, sticky="w", pady=(6, 0))
+
+        ctk.CTkLabel(row2, text="Priority:").grid(row=5, column=4, sticky="e", pady=(6, 0))
+        self.priority = ctk.StringVar(value="normal")
+        ctk.CTkOptionMenu(row2, variable=self.priority, values=list(PRIORITIES), width=90).grid(
+            row=5, column=5, sticky="w", padx=(8, 0), pady=(6, 0)
+        )
+
+        ctk.CTkLabel(row2, text="Encode workers:").grid(row=3, column=4, sticky="e", pady=(6, 0))
+        self.encode_workers = ctk.StringVar(value="1")
+        ctk.CTkOptionMenu(row2, variable=self.encode_workers, values=["1", "2", "4", "6", "8"], width=70).grid(
+            row=3, column=5, sticky="w", padx=(8, 0), pady=(6, 0)
+        )
+
         # Auth
         auth = ctk.CTkFrame(self)
         auth.grid(row=4, column=0, padx=16, pady=(12, 0), sticky="ew")
@@ -205,8 +250,31 @@ class App(ctk.CTk):
         self.btn_wav = ctk.CTkButton(row3, text="To WAV", command=self.to_wav)
         self.btn_wav.grid(row=0, column=4, padx=(10, 0))
 
-        self.btn_cancel = ctk.CTkButton(row3, text="Cancel", command=self.cancel, fg_color="#444444")
-        self.btn_cancel.grid(row=0, column=5, padx=(10, 0))
+        # Download once, write all three outputs
+        self.btn_all = ctk.CTkButton(row3, text="MP4+MP3+WAV", command=self.export_all)
+        self.btn_all.grid(row=0, column=5, padx=(10, 0))
+
+        self.btn_cancel = ctk.CTkButton(row3, text="Cancel all", command=self.cancel, fg_color="#444444")
+        self.btn_cancel.grid(row=0, column=6, padx=(10, 0))
+
+        ctk.CTkLabel(row3, text="Parallel jobs:").grid(row=0, column=7, padx=(14, 6))
+        ctk.CTkOptionMenu(
+            row3,
+            variable=self.parallel,
+            values=[str(n) for n in range(1, 7)],
+            width=70,
+            command=self._on_parallel_change,
+        ).grid(row=0, column=8)
+
+        ctk.CTkLabel(row3, text="Speed limit:").grid(row=0, column=9, padx=(14, 6))
+        self.speed_limit = ctk.StringVar(value=SPEED_LIMITS[0])
+        ctk.CTkOptionMenu(
+            row3,
+            variable=self.speed_limit,
+            values=SPEED_LIMITS,
+            width=110,
+            command=self._on_speed_limit_change,
+        ).grid(row=0, column=10)
 
         # Progress + log
         log = ctk.CTkFrame(self)
@@ -219,52 +287,55 @@ class App(ctk.CTk):
         self.p.set(0)
         self.p.grid(row=0, column=0, sticky="ew")
 
+        self.queue_label = ctk.CTkLabel(log, text="", anchor="e", width=320)
+        self.queue_label.grid(row=0, column=1, padx=(10, 0))
+
         self.status = ctk.CTkTextbox(log, height=300)
-        self.status.grid(row=1, column=0, sticky="nsew", pady=(8, 0))
+        self.status.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(8, 0))
 
         self.log("Idle.")
 
     # ---------------- UI helpers (thread-safe) ----------------
     def _ui(self, kind: str, *payload):
         """Enqueue a UI action to be handled on the Tk main thread."""
-        self._ui_q.put((kind, payload))
+        self._ui_bus.post(kind, *payload)
 
     def _drain_ui_queue(self):
-        try:
-            while True:
-                kind, payload = self._ui_q.get_nowait()
-
-                if kind == "log":
-                    (text,) = payload
-                    self._log_direct(text)
-                elif kind == "clear_log":
-                    self.status.delete("1.0", "end")
-                elif kind == "progress":
-                    (frac,) = payload
-                    self.p.set(max(0.0, min(1.0, float(frac))))
-                elif kind == "msgbox":
-                    level, title, msg = payload
-                    if level == "info":
-                        messagebox.showinfo(title, msg)
-                    elif level == "warn":
-                        messagebox.showwarning(title, msg)
-                    else:
-                        messagebox.showerror(title, msg)
-                elif kind == "busy":
-                    (is_busy,) = payload
-                    self._set_busy_direct(bool(is_busy))
+        t0 = time.monotonic()
+        events, progress = self._ui_bus.drain()
+        for kind, payload in events:
+            if kind == "log":
+                self._log_direct(payload)
+            elif kind == "clear_log":
+                self.status.delete("1.0", "end")
+                self.log_ring.clear()
+            elif kind == "msgbox":
+                level, title, msg = payload
+                if level == "info":
+                    messagebox.showinfo(title, msg)
+                elif level == "warn":
+                    messagebox.showwarning(title, msg)
                 else:
-                    # Unknown event: ignore
-                    pass
-
-        except queue.Empty:
-            pass
+                    messagebox.showerror(title, msg)
+            elif kind == "job_state":
+                (job,) = payload
+                self._on_job_state(job)
+            elif kind == "batch_done":
+                (batch,) = payload
+                self._on_batch_done(batch)
+            elif kind == "engine_ready":
+                self._on_engine_ready()
+            else:
+                # Unknown event: ignore
+                pass
 
+        self._refresh_queue_status(progress)
+        self._ui_bus.drained(time.monotonic() - t0)
         self.after(100, self._drain_ui_queue)
 
-    def _log_direct(self, text: str):
-        self.status.insert("end", f"{text}\n")
-        self.status.see("end")
+    def _log_direct(self, lines):
+        """Append a batch of log lines with one insert, keeping the last LogRing.max_lines of them."""
+        self.log_ring.show(self.status, lines)
 
     def log(self, text: str):
         self._ui("log", text)
@@ -280,41 +351,190 @@ class App(ctk.CTk):
 
     def _set_busy_direct(self, is_busy: bool):
         self._busy = is_busy
-        # disable action buttons while a job is running
-        state = "disabled" if is_busy else "normal"
-        for btn in (self.btn_download, self.btn_list, self.btn_mp3, self.btn_wav):
-            btn.configure(state=state)
+        # action buttons stay enabled: new jobs simply queue up behind the running ones
         self.btn_cancel.configure(state="normal" if is_busy else "disabled")
 
-    # ---------------- Thread control ----------------
-    def _start_job(self, target, *args, **kwargs):
-        if self._busy:
-            self.ui_warn("Busy", "A job is already running.")
+    def _refresh_queue_status(self, progress=None):
+        """progress: latest per-job fractions from this tick's drain (used when a single job is running)."""
+        if self.jobs is None:
+            return
+        st = self.jobs.stats()
+        busy = bool(st["running"] or st["queued"] or any(not b.done for b in self.batches))
+        if busy != self._busy:
+            self._set_busy_direct(busy)
+        if busy:
+            frac = st["progress"]
+            if progress and st["running"] == 1 and len(progress) == 1:
+                (frac,) = progress.values()
+            self.p.set(max(0.0, min(1.0, float(frac))))
+            limit = self.bandwidth.rate
+            self.queue_label.configure(
+                text=f"{st['running']} running · {st['queued']} queued · {st['current_bps'] / 1024 / 1024:.2f} MB/s"
+                + (f" (cap {limit / 1024 / 1024:g} MB/s)" if limit else "")
+            )
+        else:
+            self.queue_label.configure(text=f"{st['done']} done · {st['failed']} failed")
+
+    # ---------------- Engine start-up ----------------
+    def _create_engine(self, cache, library, client_stats, cookies):
+        """Runs on the loader thread; this is where yt-dlp gets imported."""
+        from ytmedia.engine import DownloadEngine
+
+        return DownloadEngine(
+            cache=cache, library=library, client_stats=client_stats, cookies=cookies,
+            pool_sessions=True, bandwidth=self.bandwidth,
+        )
+
+    def _on_engine_ready(self):
+        try:
+            self.engine = self.loader.get()
+        except Exception as e:
+            self.log(f"Could not load yt-dlp: {e}")
+            self.ui_error("Error", f"Could not load yt-dlp:\n{e}")
+            return
+        from ytmedia.jobqueue import JobQueue
+
+        self.jobs = JobQueue(self.engine, max_workers=int(self.parallel.get()), on_event=self._on_job_event)
+        self.journal.attach(self.jobs)
+        self.metrics.attach(self.jobs)
+        self.startup.write()
+        self.log(f"Startup: {self.startup.report()}")
+        if self.loader.prewarm_error is not None:
+            self.log(f"(Prewarming the YouTube extractor failed: {self.loader.prewarm_error})")
+        pending, self._pending = self._pending, []
+        for job in pending:
+            if not job.cancel.is_set():
+                self._start_job(job)
+        self.after(500, self._offer_resume)
+
+    # ---------------- Job queue ----------------
+    def _on_job_event(self, kind, job, *payload):
+        """Engine/queue events arrive on worker threads; forward them to the UI queue."""
+        if kind == "log":
+            (text,) = payload
+            self.log(f"[#{job.id}] {text}")
+        elif kind == "progress":
+            (frac,) = payload
+            self._ui_bus.progress(job.id, frac)
+        elif kind == "state":
+            self._ui("job_state", job)
+
+    def _on_job_state(self, job: Job):
+        if job.status == "running":
+            self.log(f"[#{job.id}] Started: {job.url}")
+        elif job.status == "done":
+            self._on_job_done(job)
+        elif job.status == "failed":
+            self.log(f"[#{job.id}] ERROR: {job.error}")
+            if job.parent is None:  # playlist entries are reported in the batch summary
+                self.ui_error("Error", job.error or "Unknown error")
+        elif job.status == "cancelled":
+            self.log(f"[#{job.id}] Cancelled.")
+
+    def _on_job_done(self, job: Job):
+        if job.kind == "formats":
+            used_client, rows = job.result
+            self._ui("clear_log")
+            self.log(f"Available formats ({used_client} client):")
+            for r in rows:
+                self.log(r)
+            self.log("-- end of list --")
             return
-        self._cancel.clear()
-        self._hook_last_ts = 0.0
-        self._last_pct_logged = -1
-        self._ui("progress", 0.0)
-        self._ui("busy", True)
+        if job.kind == "export":
+            msg = "Saved " + ", ".join(t.upper() for t in job.result) + "."
+        else:
+            msg = "Download complete." if job.kind == "mp4" else f"Saved as {job.kind.upper()}."
+            if job.result == "library":
+                msg = "Already downloaded (found in the library)."
+        self.log(f"[#{job.id}] {msg}")
+        if job.parent is None and not self.jobs.active():
+            self.ui_info("Success", msg)
+
+    def _on_batch_done(self, batch: Batch):
+        self.batches.remove(batch)
+        s = batch.summary()
+        msg = f"{s['done']} downloaded, {s['skipped']} skipped, {s['failed']} failed, {s['cancelled']} cancelled."
+        for url, error in s["failures"]:
+            self.log(f"[#{batch.id}] FAILED {url}: {(error or 'unknown error').splitlines()[0]}")
+        if batch.job.status == "cancelled":
+            return
+        if s["failed"]:
+            self.ui_warn("Playlist finished", msg)
+        else:
+            self.ui_info("Playlist finished", msg)
 
-        def runner():
+    def _start_job(self, job: Job):
+        if self.jobs is None:
+            self._pending.append(job)
+            self.log(f"[#{job.id}] Waiting for yt-dlp to finish loading…")
+            return
+        if is_collection_url(job.url):
             try:
-                target(*args, **kwargs)
-            except Exception as e:
-                # Make sure unexpected exceptions are visible.
-                self.log(f"ERROR: {e}")
+                batch = Batch(self.jobs, job, on_done=lambda b: self._ui("batch_done", b))
+            except ValueError as e:
                 self.ui_error("Error", str(e))
-            finally:
-                self._ui("busy", False)
+                return
+            self.batches.append(batch)
+            self.log(f"[#{job.id}] Playlist/channel: {job.url} (videos are queued as they are found)")
+            batch.start()
+            return
+        self.jobs.submit(job)
+        if self.jobs.stats()["running"] >= self.jobs.max_workers:
+            self.log(f"[#{job.id}] Queued: {job.url}")
+
+    def _offer_resume(self):
+        """Offer to continue the jobs the last session left unfinished (crash or closed window)."""
+        records = self.journal.unfinished()
+        if not records:
+            return
+        names = "\n".join(f"• {r.get('title') or r['url']} ({r['kind'].upper()})" for r in records[:10])
+        more = f"\n…and {len(records) - 10} more" if len(records) > 10 else ""
+        if messagebox.askyesno(
+            "Resume downloads",
+            f"{len(records)} download(s) did not finish last time:\n\n{names}{more}\n\n"
+            "Resume them? Partly downloaded files are continued, not restarted.",
+        ):
+            for job in self.journal.resume(self.jobs, records):
+                self.log(f"[#{job.id}] Resuming: {job.title or job.url}")
+        else:
+            self.journal.discard(records)
 
-        self._worker = threading.Thread(target=runner, daemon=True)
-        self._worker.start()
+    def _on_parallel_change(self, value):
+        if self.jobs is not None:  # otherwise read when the queue is created
+            self.jobs.set_max_workers(int(value))
+
+    def _on_speed_limit_change(self, value):
+        mbps = float(value.split()[0]) if value != SPEED_LIMITS[0] else 0
+        self.bandwidth.set_rate(int(mbps * 1024 * 1024))
 
     def cancel(self):
-        if not self._busy:
+        if self.jobs is None:
+            for job in self._pending:
+                job.request_cancel()
+            self._pending.clear()
+            return
+        if not self.jobs.active() and not self.batches:
             return
-        self._cancel.set()
-        self.log("Cancel requested… (will stop at next safe point)")
+        for batch in list(self.batches):
+            batch.cancel()
+        self.jobs.cancel()
+        self.log("Cancel requested…")
+
+    def _on_close(self):
+        """Window closed: stop every job, keeping partial files for `resume`, then quit."""
+        if self.jobs is None:
+            for job in self._pending:
+                job.request_cancel()
+            self._pending.clear()
+        else:
+            self.journal.close()  # interrupted, not cancelled: keep them resumable
+            for batch in list(self.batches):
+                batch.cancel(interrupt=True)
+            self.jobs.shutdown(cancel=True, interrupt=True)
+        if self.engine is not None:
+            self.engine.close()
+        self.log_ring.close()
+        self.destroy()
 
     # ---------------- GUI callbacks ----------------
     def pick_dir(self):
@@ -353,31 +573,48 @@ class App(ctk.CTk):
             self.profile_path.set(p)
             self.auth_mode.set("browser")
 
-    # ---------------- yt-dlp option builders ----------------
-    def _auth_opts(self):
-        mode = self.auth_mode.get()
-        if mode == "txt":
-            if not self.cookies_file or not Path(self.cookies_file).exists():
-                raise RuntimeError("Pick a valid cookies.txt file.")
-            return {"cookies": self.cookies_file}
-        if mode == "browser":
-            prof = self.profile_path.get().strip() or None
-            return {"cookiesfrombrowser": (self.browser_var.get(), prof, None, None)}
-        return {}
-
-    def _base_opts(self, outtmpl):
-        return {
-            "outtmpl": outtmpl,
-            "noplaylist": True,
-            "merge_output_format": "mp4",
-            "progress_hooks": [self._hook],
-            "quiet": True,
-            "no_warnings": True,
-            "retries": 10,
-            "fragment_retries": 10,
-            "http_chunk_size": 256 * 1024,
-            "concurrent_fragment_downloads": 1,
-        }
+    # ---------------- Job options ----------------
+    def _job_options(self) -> JobOptions:
+        """Snapshot the UI controls into an explicit options object for the engine."""
+        auth = AuthOptions(
+            mode=self.auth_mode.get(),
+            cookies_file=self.cookies_file,
+            browser=self.browser_var.get(),
+            profile=self.profile_path.get(),
+        )
+        auth.ydl_opts()  # validate early (e.g. missing cookies.txt)
+        return JobOptions(
+            save_dir=self.save_dir or ".",
+            quality=QUALITIES.get(self.q.get(), "best"),
+            audio_kbps=abr_from_label(self.abr_pref.get()),
+            max_vbr_kbps=int(self.vbr_limit.get() or 0),
+            reencode=bool(self.reencode.get()),
+            encode_workers=int(self.encode_workers.get()),
+            try_android=bool(self.try_android_after.get()),
+            race_clients=bool(self.race_clients.get()),
+            autotune=bool(self.autotune.get()),
+            ranged_connections=int(self.connections.get()),
+            stream_audio=bool(self.stream_audio.get()),
+            hardlink=bool(self.hardlink.get()),
+            keep_partial=bool(self.keep_partial.get()),
+            priority=self.priority.get(),
+            auth=auth,
+        )
+
+    def _new_job(self, kind: str, need_dir: bool = True):
+        """Validate the URL / folder / auth and build a Job, or show an error and return None."""
+        url = self.url_entry.get().strip()
+        if not is_youtube_url(url):
+            self.ui_error("Error", "Enter a valid YouTube URL")
+            return None
+        if need_dir and not self.save_dir:
+            self.ui_error("Error", "Choose a save folder")
+            return None
+        try:
+            return Job(url, kind=kind, options=self._job_options())
+        except Exception as e:
+            self.ui_error("Error", str(e))
+            return None
 
     def _on_vbr_change(self, val):
         val = int(val)
@@ -400,322 +637,35 @@ class App(ctk.CTk):
             else:
                 self.vbr_label.configure(text=f"≤ {val} kbps")
 
-    def _audio_primary(self):
-        """Return the primary bestaudio selector string based on UI preference."""
-        label = self.abr_pref.get()
-        return ABR_FILTERS.get(label, "ba")
-
-    def _vbr_filter(self):
-        """Return a yt-dlp filter like [tbr<=X] for video bitrate, or '' for Auto.
-        tbr is in kbps and is available on most formats (separate video streams included)."""
-        v = int(self.vbr_limit.get() or 0)
-        return f"[tbr<={v}]" if v > 0 else ""
-
-    def _height_attempts(self, target_h: int, audio_primary: str, vfilt: str):
-        # Prefer separate video+audio, then fallback to a combined format at that height
-        v_exact = f"bv*[height={target_h}]{vfilt}"
-        v_leq = f"bv*[height<={target_h}]{vfilt}"
-
-        if audio_primary != "ba":
-            exact = f"({v_exact}+{audio_primary})/({v_exact}+ba)/b[height={target_h}]{vfilt}"
-            leq = f"({v_leq}+{audio_primary})/({v_leq}+ba)/b[height<={target_h}]{vfilt}"
-        else:
-            exact = f"{v_exact}+ba/b[height={target_h}]{vfilt}"
-            leq = f"{v_leq}+ba/b[height<={target_h}]{vfilt}"
-        return [exact, leq]
-
-    def _fmt_720_with_vbr(self, vfilt: str):
-        # Progressive bias path @<=720p, apply tbr filter if set
-        return f"best[height<=720][ext=mp4]{vfilt}/best[height<=720]{vfilt}"
-
-    # ---------------- Audio-only helpers ----------------
-    def _preferred_quality_from_ui(self):
-        """Return yt-dlp/FFmpegExtractAudio preferredquality based on UI.
-
-        yt-dlp's --audio-quality accepts either:
-        - a VBR quality number from 0 (best) to 10 (worst), or
-        - an explicit bitrate like 128K (CBR/ABR depending on codec/ffmpeg).
-        """
-        label = self.abr_pref.get() or "Auto"
-        if label == "Auto":
-            return "0"  # best VBR quality
-        digits = "".join(ch for ch in label if ch.isdigit())
-        return f"{digits}K" if digits else "0"
-
-    # ---------------- yt-dlp runners ----------------
-    def _try_download(self, url, fmt, client, auth_extra, *, reencode: bool, target_kbps: int):
-        outtmpl = os.path.join(self.save_dir, "%(title)s.%(ext)s")
-        opts = self._base_opts(outtmpl)
-        opts["format"] = fmt
-        if client == "android":
-            opts["extractor_args"] = {"youtube": {"player_client": ["android"]}}
-        opts.update(auth_extra)
-
-        # Choose remux vs re-encode
-        if reencode:
-            if target_kbps <= 0:
-                raise RuntimeError("Set a target bitrate (>0 kbps) when re-encode is enabled.")
-            opts["postprocessors"] = [{"key": "FFmpegVideoConvertor", "preferedformat": "mp4"}]
-            # Keep audio as-is (copy) while re-encoding video to target bitrate
-            ff_args = [
-                "-c:v", "libx264",
-                "-b:v", f"{target_kbps}k",
-                "-maxrate", f"{target_kbps}k",
-                "-bufsize", f"{target_kbps * 2}k",
-                "-pix_fmt", "yuv420p",
-                "-preset", "medium",
-                "-movflags", "+faststart",
-                "-c:a", "copy",
-            ]
-            opts["postprocessor_args"] = ff_args
-        else:
-            opts["postprocessors"] = [{"key": "FFmpegVideoRemuxer", "preferedformat": "mp4"}]
-
-        self.log(f"→ Trying format: {fmt} (client={client or 'normal'})")
-        with ydl.YoutubeDL(opts) as Y:
-            Y.download([url])
-
-    def _try_audio(self, url, fmt, codec, client, auth_extra, pref_q):
-        outtmpl = os.path.join(self.save_dir, "%(title)s.%(ext)s")
-        opts = self._base_opts(outtmpl)
-        # For audio-only we don't want to force a video merge format
-        opts["merge_output_format"] = None
-        opts["format"] = fmt
-        if client == "android":
-            opts["extractor_args"] = {"youtube": {"player_client": ["android"]}}
-        opts.update(auth_extra)
-        # Extract & convert to desired audio codec
-        opts["postprocessors"] = [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": codec,
-                "preferredquality": pref_q,
-            }
-        ]
-
-        self.log(f"→ Audio-only: {fmt} → {codec.upper()} (client={client or 'normal'})")
-        with ydl.YoutubeDL(opts) as Y:
-            Y.download([url])
-
     # ---------------- Actions (threaded) ----------------
     def start(self):
         """Download the URL as MP4 using the selected quality options."""
-        url = self.url_entry.get().strip()
-        if not url or "youtu" not in (urlparse(url).netloc or "").lower():
-            self.ui_error("Error", "Enter a valid YouTube URL")
-            return
-        if not self.save_dir:
-            self.ui_error("Error", "Choose a save folder")
-            return
-        try:
-            auth = self._auth_opts()
-        except Exception as e:
-            self.ui_error("Error", str(e))
-            return
-
-        q = self.q.get()
-        audio_primary = self._audio_primary()
-        vfilt = self._vbr_filter()
-
-        attempts = []
-        if q == "Best (auto)":
-            v = f"bestvideo*{vfilt}"
-            if audio_primary != "ba":
-                attempts.append(f"({v}+{audio_primary})/({v}+ba)/best{vfilt}")
-            else:
-                attempts.append(f"{v}+ba/best{vfilt}")
-        elif q == "720p progressive bias":
-            attempts.append(self._fmt_720_with_vbr(vfilt))
-        else:
-            target_h = TARGET_HEIGHT[q]
-            attempts.extend(self._height_attempts(target_h, audio_primary, vfilt))
-
-        clients = [None, "android"] if self.try_android_after.get() else [None]
-        reencode = bool(self.reencode.get())
-        target_kbps = int(self.vbr_limit.get() or 0)
-
-        self._start_job(self._download_worker, url, attempts, clients, auth, reencode, target_kbps)
-
-    def _download_worker(self, url, attempts, clients, auth, reencode, target_kbps):
-        errors = []
-        for client in clients:
-            for fmt in attempts:
-                if self._cancel.is_set():
-                    raise RuntimeError("Cancelled")
-                try:
-                    self._try_download(
-                        url,
-                        fmt,
-                        client,
-                        auth,
-                        reencode=reencode,
-                        target_kbps=target_kbps,
-                    )
-                    self._ui("progress", 1.0)
-                    self.ui_info("Success", "Download complete.")
-                    return
-                except Exception as e:
-                    msg = str(e)
-                    errors.append(f"[{client or 'normal'}] {fmt} → {msg}")
-                    self.log(f"ERROR: {msg}")
-
-        joined = "\n\n".join(errors[-6:]) if errors else "Unknown error"
-        self.ui_error("Error", f"All strategies failed. Last errors:\n\n{joined}")
+        job = self._new_job("mp4")
+        if job:
+            self._start_job(job)
 
     def to_mp3(self):
         """Download & convert the URL to MP3 using FFmpegExtractAudio."""
-        url = self.url_entry.get().strip()
-        if not url or "youtu" not in (urlparse(url).netloc or "").lower():
-            self.ui_error("Error", "Enter a valid YouTube URL")
-            return
-        if not self.save_dir:
-            self.ui_error("Error", "Choose a save folder")
-            return
-        try:
-            auth = self._auth_opts()
-        except Exception as e:
-            self.ui_error("Error", str(e))
-            return
-
-        audio_primary = self._audio_primary()
-        fmt = f"{audio_primary}/ba" if audio_primary != "ba" else "ba"
-        pref_q = self._preferred_quality_from_ui()
-        clients = [None, "android"] if self.try_android_after.get() else [None]
-
-        self._start_job(self._audio_worker, url, fmt, "mp3", clients, auth, pref_q)
+        job = self._new_job("mp3")
+        if job:
+            self._start_job(job)
 
     def to_wav(self):
         """Download & convert the URL to WAV using FFmpegExtractAudio."""
-        url = self.url_entry.get().strip()
-        if not url or "youtu" not in (urlparse(url).netloc or "").lower():
-            self.ui_error("Error", "Enter a valid YouTube URL")
-            return
-        if not self.save_dir:
-            self.ui_error("Error", "Choose a save folder")
-            return
-        try:
-            auth = self._auth_opts()
-        except Exception as e:
-            self.ui_error("Error", str(e))
-            return
-
-        audio_primary = self._audio_primary()
-        fmt = f"{audio_primary}/ba" if audio_primary != "ba" else "ba"
-        clients = [None, "android"] if self.try_android_after.get() else [None]
+        job = self._new_job("wav")
+        if job:
+            self._start_job(job)
 
-        self._start_job(self._audio_worker, url, fmt, "wav", clients, auth, "0")
-
-    def _audio_worker(self, url, fmt, codec, clients, auth, pref_q):
-        errors = []
-        for client in clients:
-            if self._cancel.is_set():
-                raise RuntimeError("Cancelled")
-            try:
-                self._try_audio(url, fmt, codec=codec, client=client, auth_extra=auth, pref_q=pref_q)
-                self._ui("progress", 1.0)
-                self.ui_info("Success", f"Saved as {codec.upper()}.")
-                return
-            except Exception as e:
-                msg = str(e)
-                errors.append(f"[{client or 'normal'}] {codec.upper()} → {msg}")
-                self.log(f"ERROR: {msg}")
-
-        joined = "\n\n".join(errors[-6:]) if errors else "Unknown error"
-        self.ui_error("Error", f"{codec.upper()} extraction failed. Last errors:\n\n{joined}")
+    def export_all(self):
+        """Download the streams once and write MP4, MP3 and WAV from them."""
+        job = self._new_job("export")
+        if job:
+            self._start_job(job)
 
     def list_formats(self):
-        url = self.url_entry.get().strip()
-        if not url or "youtu" not in (urlparse(url).netloc or "").lower():
-            self.ui_error("Error", "Enter a valid YouTube URL")
-            return
-        try:
-            auth = self._auth_opts()
-        except Exception as e:
-            self.ui_error("Error", str(e))
-            return
-
-        self._start_job(self._list_formats_worker, url, auth)
-
-    def _list_formats_worker(self, url, auth):
-        base = self._base_opts("%(title)s.%(ext)s")
-        base.update(auth)
-
-        info = None
-        used_client = "normal"
-
-        for client in [None, "android"]:
-            if self._cancel.is_set():
-                raise RuntimeError("Cancelled")
-            try:
-                opts = dict(base)
-                if client == "android":
-                    opts["extractor_args"] = {"youtube": {"player_client": ["android"]}}
-                with ydl.YoutubeDL(opts) as Y:
-                    info = Y.extract_info(url, download=False)
-                used_client = client or "normal"
-                break
-            except Exception as e:
-                self.log(f"List formats failed on {client or 'normal'}: {e}")
-                continue
-
-        if not info:
-            self.ui_error("Error", "Could not fetch format list with provided auth.")
-            return
-
-        rows = []
-        for f in (info.get("formats") or []):
-            if not f.get("format_id"):
-                continue
-            h = f.get("height") or ""
-            fps = f.get("fps") or ""
-            v = f.get("vcodec") or ""
-            a = f.get("acodec") or ""
-            ext = f.get("ext") or ""
-            abr = f.get("abr") or ""
-            tbr = f.get("tbr") or ""
-            rows.append(
-                f"{f['format_id']:>6} | {ext:>4} | h={str(h):>4} | fps={str(fps):>3} | "
-                f"v={v[:12]:<12} | a={a[:9]:<9} | abr={str(abr):>4} | tbr={str(tbr):>5}"
-            )
-
-        self._ui("clear_log")
-        self.log(f"Available formats ({used_client} client):")
-        for r in rows:
-            self.log(r)
-        self.log("-- end of list --")
-
-    def _hook(self, d):
-        # Runs inside the downloader thread
-        if self._cancel.is_set():
-            raise RuntimeError("Cancelled")
-
-        status = d.get("status")
-        now = time.monotonic()
-
-        if status == "downloading":
-            total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
-            done = d.get("downloaded_bytes") or 0
-            frac = (done / total) if total else 0.0
-
-            # Throttle UI updates
-            if now - self._hook_last_ts >= 0.2:
-                self._hook_last_ts = now
-                self._ui("progress", frac)
-
-                pct = int(frac * 100) if total else -1
-                if pct != -1 and pct != self._last_pct_logged:
-                    self._last_pct_logged = pct
-                    spd = d.get("speed")
-                    eta = d.get("eta")
-                    txt = f"Downloading… {pct:d}%"
-                    if spd:
-                        txt += f" @ {spd / 1024 / 1024:.2f} MB/s"
-                    if eta:
-                        txt += f" | ETA {eta}s"
-                    self.log(txt)
-
-        elif status == "finished":
-            self.log("Merging / processing…")
+        job = self._new_job("formats", need_dir=False)
+        if job:
+            self._start_job(job)
 
 
 if __name__ == "__main__":
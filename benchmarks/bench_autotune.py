@@ -0,0 +1,135 @@
+"""Offline check of the throughput autotuner.
+
+Starts a local HTTP server that throttles every connection and adds a fixed
+latency to every request, then lets ThroughputTuner pick settings round after
+round for two workloads:
+
+- ``fragmented``: N small fragments fetched by a pool of concurrent workers
+- ``http``: one file fetched sequentially in Range chunks
+
+Run from the repo root:  python -m benchmarks.bench_autotune [--rounds 8]
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ytmedia.autotune import ThroughputTuner
+
+
+class ThrottledHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    payload = b""
+    rate = 1024 * 1024  # bytes/sec per connection
+    latency = 0.05  # seconds added to every request
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        data = self.payload
+        m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if m:
+            start = int(m.group(1))
+            end = min(int(m.group(2)) if m.group(2) else len(data) - 1, len(data) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            body = data[start:end + 1]
+        else:
+            self.send_response(200)
+            body = data if self.path.startswith("/file") else data[:FRAGMENT_SIZE]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        step = 16 * 1024
+        for i in range(0, len(body), step):
+            piece = body[i:i + step]
+            self.wfile.write(piece)
+            time.sleep(len(piece) / self.rate)
+
+
+FRAGMENT_SIZE = 128 * 1024
+
+
+def fetch(conn, path, headers=None):
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    return len(resp.read())
+
+
+def run_fragmented(port, workers, fragments):
+    local = threading.local()
+
+    def one(n):
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection("127.0.0.1", port)
+        return fetch(local.conn, f"/frag/{n}")
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        total = sum(pool.map(one, range(fragments)))
+    return total / (time.monotonic() - t0)
+
+
+def run_http(port, chunk, size):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    t0 = time.monotonic()
+    total = 0
+    while total < size:
+        end = min(total + chunk, size) - 1
+        total += fetch(conn, "/file", {"Range": f"bytes={total}-{end}"})
+    conn.close()
+    return total / (time.monotonic() - t0)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rounds", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=2.0, help="per-connection cap in MB/s")
+    ap.add_argument("--latency", type=float, default=0.05, help="per-request latency in seconds")
+    ap.add_argument("--size", type=int, default=8, help="payload size in MB")
+    ap.add_argument("--json", metavar="FILE", help="write the trajectory as JSON")
+    args = ap.parse_args(argv)
+
+    size = args.size * 1024 * 1024
+    ThrottledHandler.payload = os.urandom(size)
+    ThrottledHandler.rate = args.rate * 1024 * 1024
+    ThrottledHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottledHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tuner = ThroughputTuner(path=os.path.join(tmp, "autotune.json"), max_fragments=16)
+        for kind in ("fragmented", "http"):
+            key = tuner.key("127.0.0.1", kind)
+            rows = results[kind] = []
+            for r in range(args.rounds):
+                value = tuner.suggest(key)
+                if kind == "fragmented":
+                    bps = run_fragmented(port, value, size // FRAGMENT_SIZE)
+                else:
+                    bps = run_http(port, value, size)
+                tuner.record(key, value, bps)
+                rows.append({"round": r + 1, "value": value, "mb_per_s": round(bps / 1024 / 1024, 3)})
+                label = f"{value} workers" if kind == "fragmented" else f"{value // 1024} KiB chunks"
+                print(f"{kind:>10} round {r + 1}: {label:>16} → {bps / 1024 / 1024:6.2f} MB/s")
+            best, best_bps = tuner.best(key)
+            baseline = rows[0]["mb_per_s"]
+            print(f"{kind:>10} best: {best} ({best_bps / 1024 / 1024:.2f} MB/s, baseline {baseline:.2f} MB/s)\n")
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Rates achieved under the engine's BandwidthManager, measured at a local server.
+
+A local HTTP server streams an endless-looking ``video/mp4`` file (generated
+bytes, range requests supported) and counts what it sends on each URL. MP4 jobs
+on those direct URLs (yt-dlp's generic extractor) run for ``--seconds`` under
+a global cap of ``--limit``, then get cancelled:
+
+- ``equal``: two normal-priority jobs, expected 1 : 1
+- ``priority``: a high and a low priority job, expected 4 : 1
+- ``job cap``: one job capped at a quarter of the limit next to an uncapped one
+- ``live``: two jobs at half the limit, raised to the full limit half way
+- ``ranged``: one job over 4 parallel ranged connections
+
+Reported per job: the rate the server measured once the transfer settled (the
+first ``--warmup`` seconds are skipped: socket buffers fill at full speed) and
+the rate the manager reported for the job's flow.
+
+Run from the repo root:  python -m benchmarks.bench_bandwidth [--limit 8M] [--seconds 6]
+"""
+import argparse
+import json
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ytmedia import BandwidthManager, DownloadEngine, Job, JobOptions, JobQueue
+from ytmedia.bandwidth import parse_rate
+
+FILE_SIZE = 4 * 1024 ** 3
+BLOCK = bytes(range(256)) * 256  # 64 KB
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    sent = {}  # path -> bytes written
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        start, end = 0, FILE_SIZE - 1
+        m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if m:
+            start = int(m.group(1))
+            end = min(int(m.group(2)) if m.group(2) else end, end)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{FILE_SIZE}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        left = end - start + 1
+        while left:
+            chunk = BLOCK[:min(len(BLOCK), left)]
+            try:
+                self.wfile.write(chunk)
+            except OSError:
+                return
+            left -= len(chunk)
+            with self.lock:
+                self.sent[self.path] = self.sent.get(self.path, 0) + len(chunk)
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # a cancelled job drops its connection
+
+
+def run_scenario(name, base, limit, seconds, warmup, specs, change=None):
+    """specs: [(label, JobOptions kwargs)]; change(manager) runs half way. Returns per-job results."""
+    manager = BandwidthManager(limit)
+    jq = JobQueue(DownloadEngine(bandwidth=manager), max_workers=len(specs))
+    jobs = []
+    for label, opts in specs:
+        path = f"/{name.replace(' ', '-')}-{label}.mp4"
+        options = JobOptions(save_dir=base["dir"], try_android=False, **opts)
+        jobs.append((label, path, jq.submit(Job(base["url"] + path, kind="mp4", options=options))))
+
+    def server_bytes():
+        with StreamHandler.lock:
+            return {path: StreamHandler.sent.get(path, 0) for _, path, _ in jobs}
+
+    def measure(t_from, t_to):
+        time.sleep(max(0.0, t_from - time.monotonic()))
+        b0, t0 = server_bytes(), time.monotonic()
+        time.sleep(max(0.0, t_to - t0))
+        b1, t1 = server_bytes(), time.monotonic()
+        reported = manager.stats()["jobs"]
+        return {
+            path: ((b1[path] - b0[path]) / (t1 - t0), (reported.get(job.id) or {}).get("rate", 0.0))
+            for _, path, job in jobs
+        }
+
+    start = time.monotonic()
+    windows = []
+    if change is None:
+        windows.append(("", measure(start + warmup, start + seconds)))
+    else:
+        half = start + seconds / 2
+        windows.append(("before", measure(start + warmup, half)))
+        change(manager)
+        windows.append(("after", measure(half + warmup, start + seconds + warmup)))
+    jq.cancel()
+    jq.wait(timeout=30)
+    jq.shutdown()
+
+    results = []
+    for window, rates in windows:
+        for label, path, job in jobs:
+            measured, reported = rates[path]
+            tag = f"{label} {window}".strip()
+            print(f"{name:>9} | {tag:<14} measured {measured / 1024 / 1024:6.2f} MB/s, "
+                  f"reported {reported / 1024 / 1024:6.2f} MB/s")
+            results.append({"scenario": name, "job": label, "window": window or None,
+                            "measured_bps": round(measured), "reported_bps": round(reported)})
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--limit", type=parse_rate, default=parse_rate("8M"), help="global cap (default 8M)")
+    ap.add_argument("--seconds", type=float, default=6.0, help="how long each scenario runs")
+    ap.add_argument("--warmup", type=float, default=2.0, help="seconds skipped before measuring")
+    ap.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    args = ap.parse_args(argv)
+
+    server = QuietServer(("127.0.0.1", 0), StreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    limit = args.limit
+    print(f"Global cap {limit / 1024 / 1024:.2f} MB/s")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        base = {"url": f"http://127.0.0.1:{server.server_port}", "dir": tmp}
+        scenarios = [
+            ("equal", [("a", {}), ("b", {})], None),
+            ("priority", [("high", {"priority": "high"}), ("low", {"priority": "low"})], None),
+            ("job cap", [("capped", {"rate_limit": limit // 4}), ("free", {})], None),
+            ("live", [("a", {}), ("b", {})], lambda m: m.set_rate(limit)),
+            ("ranged", [("x4", {"ranged_connections": 4})], None),
+        ]
+        for name, specs, change in scenarios:
+            cap = limit // 2 if name == "live" else limit
+            results += run_scenario(name, base, cap, args.seconds, args.warmup, specs, change)
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Cancel latency of a running job, against a local server and real FFmpeg work.
+
+Generates a long AAC track with FFmpeg (a sine tone), serves it from a local
+HTTP server as ``audio/mp4`` and runs MP3 jobs on the direct URL (yt-dlp's
+generic extractor), cancelling each one mid-way:
+
+- ``stall``: during the download, from a server that stops sending after
+  ``--stall-kb`` (less than the engine's 256 KB HTTP chunks) and keeps the
+  connection open
+- ``mp3``: while yt-dlp's FFmpegExtractAudio encodes the MP3
+
+(The generic extractor reports no bitrate, so Re-encode's ``[tbr<=X]`` ladder
+can't be driven this way; its FFmpeg steps go through ``run_ffmpeg``, which
+polls the cancel flag.)
+
+Reported per scenario: time from ``JobQueue.cancel()`` to the job finishing as
+cancelled, and the files left in the save folder (none unless ``--keep``).
+
+Run from the repo root:  python -m benchmarks.bench_cancel [--seconds 3600] [--keep]
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ytmedia import DownloadEngine, Job, JobOptions, JobQueue
+from ytmedia.ffmpeg import run_ffmpeg
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    path_on_disk = None
+    stall_after = None  # bytes sent per response before the server stops sending
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        size = os.path.getsize(self.path_on_disk)
+        start, end = 0, size - 1
+        m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if m:
+            start = int(m.group(1))
+            end = min(int(m.group(2)) if m.group(2) else end, end)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "audio/mp4")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        sent = 0
+        with open(self.path_on_disk, "rb") as fh:
+            fh.seek(start)
+            left = end - start + 1
+            while left:
+                if self.stall_after is not None and sent >= self.stall_after:
+                    time.sleep(300)  # stalled: the connection stays open, nothing arrives
+                    return
+                chunk = fh.read(min(64 * 1024, left))
+                left -= len(chunk)
+                sent += len(chunk)
+                try:
+                    self.wfile.write(chunk)
+                except OSError:
+                    return
+
+
+def make_source(path, seconds):
+    run_ffmpeg([
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart", path,
+    ])
+
+
+def run_scenario(name, url, save_dir, keep, wait_after):
+    """Start the job, wait for the point to cancel at, cancel it and time how long it takes to stop."""
+    reached = threading.Event()
+
+    def on_event(kind, job, *payload):
+        if kind == "phase" and payload[0] == ("download" if name == "stall" else "postprocess"):
+            reached.set()
+
+    jq = JobQueue(DownloadEngine(), max_workers=1, on_event=on_event)
+    options = JobOptions(save_dir=save_dir, keep_partial=keep, try_android=False)
+    job = jq.submit(Job(url, kind="mp3", options=options))
+    if not reached.wait(120):
+        jq.shutdown(cancel=True)
+        error = f"job never got there (status {job.status}: {job.error})"
+        print(f"{name:>9}: {error}")
+        return {"scenario": name, "error": error}
+    time.sleep(wait_after)
+    fetched = job.downloaded_bytes
+    t0 = time.monotonic()
+    jq.cancel(job.id)
+    jq.wait([job], timeout=120)
+    wall = time.monotonic() - t0
+    jq.shutdown()
+    left = sorted(os.listdir(save_dir))
+    print(f"{name:>9}: {job.status} after {wall:.3f}s (job.cancel_latency {job.cancel_latency or 0:.3f}s, "
+          f"{fetched // 1024} KB fetched), files left: {', '.join(left) or 'none'}")
+    return {"scenario": name, "status": job.status, "cancel_s": round(wall, 4), "fetched": fetched, "files_left": left}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seconds", type=int, default=3600, help="test track length (longer = longer MP3 encode)")
+    ap.add_argument("--stall-kb", type=int, default=64, help="KB per response the stalling server sends before it stops")
+    ap.add_argument("--wait", type=float, default=1.0, help="seconds into the phase to cancel at")
+    ap.add_argument("--keep", action="store_true", help="cancel with keep_partial (files stay)")
+    ap.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    args = ap.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "track.m4a")
+        print(f"Generating a {args.seconds}s test track…")
+        make_source(src, args.seconds)
+        MediaHandler.path_on_disk = src
+        server = ThreadingHTTPServer(("127.0.0.1", 0), MediaHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/track.m4a"
+
+        for name in ("stall", "mp3"):
+            MediaHandler.stall_after = args.stall_kb * 1024 if name == "stall" else None
+            save_dir = os.path.join(tmp, name)
+            os.makedirs(save_dir)
+            results.append(run_scenario(name, url, save_dir, args.keep, args.wait))
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""End-to-end job timings against an offline YouTube stand-in (see benchmarks/stubsite.py).
+
+Synthetic streams are encoded once (into a temp dir, or ``--media DIR`` to keep
+them between runs) and served from a local server with optional latency, a
+per-connection bandwidth cap and injected failures. The engine gets
+``StubYoutubeIE`` ahead of yt-dlp's extractors, so real ``youtube.com/watch``
+URLs go through the whole job path (client order, format selection, download,
+merge, FFmpeg) without touching the network. Scenarios, ``--jobs`` jobs each:
+
+- ``mp4``: best quality, 1080p video + 128k audio merged into an MP4
+- ``reencode``: a 600 kbps cap, which picks the 360p VP9 stream; it gets transcoded
+- ``mp3`` / ``wav``: audio extraction
+- ``fallback``: the default client is "blocked", the job retries on Android
+
+Reported per scenario: time to first byte (job submitted → the server sends
+media), throughput at the server (first to last byte), extractions the stub
+served, post-processing time (first merge/post-process phase → job done), wall
+time, and the UI queue's load: the GUI's event forwarding into a UIEventBus
+drained every 100 ms (events posted, progress coalesced, deepest queue,
+oldest event at a drain).
+
+``--json`` writes the results with the commit and settings; ``--compare`` prints
+the change against such a file from an earlier run.
+
+Run from the repo root:  python -m benchmarks.bench_e2e [--jobs 2] [--bandwidth 8M] [--json FILE]
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+from ytmedia import DownloadEngine, Job, JobOptions, JobQueue
+from ytmedia.bandwidth import parse_rate
+from ytmedia.uibus import UIEventBus
+
+from .stubsite import MediaServer, StubYoutubeIE, make_media, probe_duration
+
+TICK = 0.1
+SCENARIOS = {
+    "mp4": ("mp4", {"quality": "best"}, False),
+    "reencode": ("mp4", {"reencode": True, "max_vbr_kbps": 600}, False),
+    "mp3": ("mp3", {}, False),
+    "wav": ("wav", {}, False),
+    "fallback": ("mp4", {"quality": "best"}, True),  # True: the default client is blocked
+}
+METRICS = ("ttfb", "throughput", "extractions", "postprocess", "wall", "ui_posted", "ui_max_depth", "ui_max_latency")
+
+
+class UILoad:
+    """The GUI's _on_job_event forwarding, drained every TICK on its own thread."""
+
+    def __init__(self):
+        self.bus = UIEventBus()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+
+    def on_event(self, kind, job, *payload):
+        if kind == "log":
+            self.bus.log(f"[#{job.id}] {payload[0]}")
+        elif kind == "progress":
+            self.bus.progress(job.id, payload[0])
+        elif kind == "state":
+            self.bus.post("job_state", job)
+
+    def _drain(self):
+        while not self._stop.wait(TICK):
+            self.bus.drain()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.bus.drain()
+
+
+def run_scenario(name, server, save_dir, jobs):
+    kind, opts, blocked = SCENARIOS[name]
+    ids = [f"{name[:8]}{i:03d}".ljust(11, "x") for i in range(jobs)]
+    StubYoutubeIE.blocked = {vid: {"normal"} for vid in ids} if blocked else {}
+    extractions = StubYoutubeIE.extractions
+    server.reset_counters()
+    pp_started = {}
+
+    def on_phase(kind_, job, *payload):
+        if kind_ == "phase" and payload[0] in ("merge", "postprocess"):
+            pp_started.setdefault(job.id, time.monotonic())
+
+    engine = DownloadEngine(extractors=[StubYoutubeIE], pool_sessions=True)
+    with UILoad() as ui:
+        jq = JobQueue(engine, max_workers=jobs, on_event=ui.on_event)
+        jq.subscribe(on_phase)
+        t0 = time.monotonic()
+        submitted = [jq.submit(Job(f"https://www.youtube.com/watch?v={vid}", kind=kind,
+                                   options=JobOptions(save_dir=save_dir, **opts)))
+                     for vid in ids]
+        jq.wait(timeout=600)
+        wall = time.monotonic() - t0
+        jq.shutdown()
+    failed = [f"#{j.id}: {j.error}" for j in submitted if j.status != "done"]
+    if failed:
+        raise RuntimeError(f"{name}: " + "; ".join(failed))
+
+    first, last = server.first_byte_at, server.last_byte_at
+    pp = [j.finished_at - pp_started[j.id] for j in submitted if j.id in pp_started]
+    ui_stats = ui.bus.stats()
+    return {
+        "scenario": name,
+        "jobs": jobs,
+        "ttfb": round(first - t0, 4) if first else None,
+        "throughput": round(server.bytes / (last - first)) if first and last > first else None,
+        "bytes": server.bytes,
+        "requests": server.requests,
+        "failures": server.failures + server.resets,
+        "extractions": StubYoutubeIE.extractions - extractions,
+        "postprocess": round(max(pp), 4) if pp else 0.0,
+        "wall": round(wall, 4),
+        "ui_posted": ui_stats["posted"],
+        "ui_coalesced": ui_stats["coalesced"],
+        "ui_max_depth": ui_stats["max_depth"],
+        "ui_max_latency": round(ui_stats["max_latency"], 4),
+    }
+
+
+def describe(r) -> str:
+    rate = f"{r['throughput'] / 1024 / 1024:6.2f} MB/s" if r["throughput"] else "     n/a"
+    ttfb = f"{r['ttfb'] * 1000:6.0f} ms" if r["ttfb"] is not None else "    n/a"
+    return (f"{r['scenario']:>8} | ttfb {ttfb}, {rate}, {r['extractions']} extractions, "
+            f"post-process {r['postprocess']:5.2f}s, wall {r['wall']:5.2f}s | "
+            f"UI {r['ui_posted']} posted ({r['ui_coalesced']} coalesced), depth ≤ {r['ui_max_depth']}, "
+            f"latency ≤ {r['ui_max_latency'] * 1000:.0f} ms")
+
+
+def compare(results, path):
+    with open(path, encoding="utf-8") as fh:
+        before = json.load(fh)
+    old = {r["scenario"]: r for r in before["scenarios"]}
+    print(f"\nAgainst {path} (commit {(before.get('commit') or '?')[:10]}):")
+    for r in results:
+        o = old.get(r["scenario"])
+        if o is None:
+            continue
+        deltas = []
+        for m in METRICS:
+            a, b = o.get(m), r.get(m)
+            if a and b is not None:
+                deltas.append(f"{m} {(b - a) / a * 100:+.0f}%")
+        print(f"{r['scenario']:>8} | {', '.join(deltas)}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    ap.add_argument("--jobs", type=int, default=2, help="jobs per scenario, run in parallel")
+    ap.add_argument("--media", metavar="DIR", help="keep the generated streams here (default: a temp dir)")
+    ap.add_argument("--seconds", type=int, default=20, help="length of the generated streams")
+    ap.add_argument("--latency", type=float, default=0.02, help="server delay per request, seconds")
+    ap.add_argument("--bandwidth", type=parse_rate, default=0, help="per-connection cap, e.g. 4M (default none)")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered 503")
+    ap.add_argument("--reset-rate", type=float, default=0.0, help="share of responses cut half way")
+    ap.add_argument("--extract-latency", type=float, default=0.3, help="seconds each stub extraction takes")
+    ap.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    ap.add_argument("--compare", metavar="FILE", help="print the change against an earlier --json file")
+    args = ap.parse_args(argv)
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media or os.path.join(tmp, "media")
+        t = time.monotonic()
+        make_media(media, args.seconds)
+        print(f"Media ready in {time.monotonic() - t:.1f}s ({media})")
+        server = MediaServer(media, args.latency, args.bandwidth, args.fail_rate, args.reset_rate).start()
+        StubYoutubeIE.base_url = server.url
+        StubYoutubeIE.media_folder = media
+        StubYoutubeIE.duration = probe_duration(media)
+        StubYoutubeIE.extract_latency = args.extract_latency
+
+        results = []
+        for name in names:
+            save_dir = os.path.join(tmp, name)
+            os.makedirs(save_dir)
+            results.append(run_scenario(name, server, save_dir, args.jobs))
+            print(describe(results[-1]))
+        server.shutdown()
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.json:
+        config = {k: getattr(args, k) for k in ("jobs", "seconds", "latency", "bandwidth", "fail_rate",
+                                                 "reset_rate", "extract_latency")}
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"commit": git_commit(), "at": time.time(), "config": config, "scenarios": results},
+                      fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Retry policy and throttle breaker against injected 429s, 403s, stalls and 503s, offline.
+
+Jobs run through the whole engine against benchmarks/stubsite.py with
+``StubYoutubeIE.player_api`` on, so extractions hit the local server too. Every
+scenario runs twice: with the adaptive policy (jittered backoff, the shared
+breaker, scaled down to seconds) and with a fixed one (no backoff, no breaker,
+what the engine did before). Scenarios, ``--jobs`` jobs each:
+
+- ``throttle``: the server answers 429 to everything for ``--window`` seconds
+- ``retry-after``: the same, with a Retry-After header
+- ``forbidden``: every request gets a 403 (retrying can't help: fail fast)
+- ``unavailable``: the videos are "removed" (no other client is tried)
+- ``stalls``: 15% of requests hang past the socket timeout
+- ``flaky``: 30% of requests are answered 503
+
+Reported: jobs done, wall time, requests the server saw and how many it
+failed on purpose, extractions, yt-dlp retries and the backoff they slept,
+breaker trips and the time jobs were held by it.
+
+Run from the repo root:  python -m benchmarks.bench_retry [--jobs 4] [--scenarios throttle,stalls] [--json FILE]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from ytmedia import DownloadEngine, Job, JobOptions, JobQueue
+from ytmedia.retry import RetryPolicy
+
+from .stubsite import MediaServer, StubYoutubeIE, make_media, probe_duration
+
+SCENARIOS = {
+    "throttle": {"window": True},
+    "retry-after": {"window": True, "retry_after": 2},
+    "forbidden": {"forbid_rate": 1.0},
+    "unavailable": {"unavailable": True},
+    "stalls": {"stall_rate": 0.15},
+    "flaky": {"fail_rate": 0.3},
+}
+TIMEOUT = 1.0  # socket timeout in both modes; stalls last 3x as long
+
+
+def policy(mode: str) -> RetryPolicy:
+    if mode == "fixed":
+        return RetryPolicy(base=0.0, cooldown=0, timeout=TIMEOUT)
+    return RetryPolicy(base=0.1, cap=2.0, budget=30.0, timeout=TIMEOUT, cooldown=1.0, max_cooldown=8.0,
+                       probe_timeout=10.0, seed=1)
+
+
+def run_scenario(name, mode, media, save_dir, args):
+    spec = SCENARIOS[name]
+    server = MediaServer(media, latency=0.01, fail_rate=spec.get("fail_rate", 0.0),
+                         forbid_rate=spec.get("forbid_rate", 0.0), stall_rate=spec.get("stall_rate", 0.0),
+                         stall_seconds=TIMEOUT * 3, retry_after=spec.get("retry_after"), seed=7).start()
+    StubYoutubeIE.base_url = server.url
+    ids = [f"{name[:6]}{mode[:3]}{i:02d}".ljust(11, "x") for i in range(args.jobs)]
+    StubYoutubeIE.unavailable = set(ids) if spec.get("unavailable") else set()
+    extractions = StubYoutubeIE.extractions
+
+    engine = DownloadEngine(extractors=[StubYoutubeIE], retry=policy(mode))
+    jq = JobQueue(engine, max_workers=args.jobs)
+    if spec.get("window"):
+        server.throttle(args.window)
+    t0 = time.monotonic()
+    jobs = [jq.submit(Job(f"https://www.youtube.com/watch?v={vid}", kind="mp4",
+                          options=JobOptions(save_dir=save_dir, quality="720p")))
+            for vid in ids]
+    jq.wait(timeout=600)
+    wall = time.monotonic() - t0
+    jq.shutdown()
+    engine.close()
+    server.shutdown()
+
+    retries = sum(n for j in jobs for k, n in j.metrics.retries.items() if k != "cache")
+    rs = engine.retry.stats()
+    return {
+        "scenario": name,
+        "mode": mode,
+        "done": sum(j.status == "done" for j in jobs),
+        "jobs": len(jobs),
+        "wall": round(wall, 3),
+        "slowest_failure": round(max((j.finished_at - t0 for j in jobs if j.status == "failed"), default=0), 3),
+        "requests": server.requests,
+        "injected": {"429": server.throttled, "403": server.forbidden, "503": server.failures,
+                     "stalls": server.stalls},
+        "extractions": StubYoutubeIE.extractions - extractions,
+        "retries": retries,
+        "backoff": round(sum(j.metrics.backoff for j in jobs), 3),
+        "tripped": rs["tripped"],
+        "held": round(rs["held"], 3),
+        "failures": rs["failures"],
+    }
+
+
+def describe(r) -> str:
+    injected = ", ".join(f"{n} {k}" for k, n in r["injected"].items() if n) or "none"
+    return (f"{r['scenario']:>11} {r['mode']:>8} | {r['done']}/{r['jobs']} done, wall {r['wall']:5.2f}s | "
+            f"{r['requests']} requests ({injected} injected), {r['extractions']} extractions | "
+            f"{r['retries']} retries, {r['backoff']:.1f}s backoff | breaker {r['tripped']} trip(s), "
+            f"held {r['held']:.1f}s | {', '.join(f'{k} {n}' for k, n in sorted(r['failures'].items())) or '-'}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    ap.add_argument("--jobs", type=int, default=4, help="jobs per scenario, run in parallel")
+    ap.add_argument("--window", type=float, default=3.0, help="seconds of 429s in the throttle scenarios")
+    ap.add_argument("--media", metavar="DIR", help="keep the generated streams here (default: a temp dir)")
+    ap.add_argument("--seconds", type=int, default=10, help="length of the generated streams")
+    ap.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    args = ap.parse_args(argv)
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media or os.path.join(tmp, "media")
+        make_media(media, args.seconds)
+        StubYoutubeIE.media_folder = media
+        StubYoutubeIE.duration = probe_duration(media)
+        StubYoutubeIE.extract_latency = 0.05
+        StubYoutubeIE.player_api = True
+        for name in names:
+            for mode in ("fixed", "adaptive"):
+                save_dir = os.path.join(tmp, f"{name}-{mode}")
+                os.makedirs(save_dir)
+                results.append(run_scenario(name, mode, media, save_dir, args))
+                print(describe(results[-1]))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"at": time.time(), "config": vars(args), "scenarios": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Single-pass vs segmented re-encode on a locally generated test video.
+
+Generates a clip with FFmpeg's ``testsrc2`` (plus a sine tone), then re-encodes
+it to the same target bitrate twice per worker count:
+
+- ``single``: one libx264 pass over the whole file, as the FFmpegVideoConvertor
+  path does (``video_encode_args`` + ``-c:a copy`` + ``+faststart``)
+- ``segmented``: ``ytmedia.segmented.segmented_encode`` with N workers
+
+and reports wall time, output bitrate and output duration for each.
+
+Run from the repo root:  python -m benchmarks.bench_segmented_encode [--seconds 60] [--workers 2 4]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from ytmedia.ffmpeg import run_ffmpeg, video_encode_args
+from ytmedia.segmented import media_duration, segmented_encode
+
+
+def make_source(path, seconds, size, fps):
+    run_ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", str(fps * 2), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k", "-shortest", path,
+    ])
+
+
+def single_pass(src, dst, kbps):
+    run_ffmpeg(["-i", src, *video_encode_args(kbps), "-movflags", "+faststart", "-c:a", "copy", dst])
+
+
+def measure(label, fn, dst):
+    t0 = time.monotonic()
+    fn()
+    wall = time.monotonic() - t0
+    duration = media_duration(dst)
+    kbps = os.path.getsize(dst) * 8 / 1000 / duration if duration else 0.0
+    print(f"{label:>14}: {wall:6.2f}s  {kbps:7.0f} kbps  {duration:6.2f}s of media")
+    return {"mode": label, "wall_s": round(wall, 3), "kbps": round(kbps, 1), "duration_s": round(duration, 3)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seconds", type=int, default=60, help="test clip length")
+    ap.add_argument("--size", default="1280x720", help="test clip resolution")
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--kbps", type=int, default=2500, help="target video bitrate")
+    ap.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    ap.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    args = ap.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "source.mp4")
+        print(f"Generating {args.seconds}s {args.size}@{args.fps} test clip…")
+        make_source(src, args.seconds, args.size, args.fps)
+
+        dst = os.path.join(tmp, "single.mp4")
+        base = measure("single", lambda: single_pass(src, dst, args.kbps), dst)
+        results.append(base)
+        for n in args.workers:
+            dst = os.path.join(tmp, f"segmented{n}.mp4")
+            row = measure(f"segmented x{n}", lambda: segmented_encode(src, dst, args.kbps, n), dst)
+            row["speedup"] = round(base["wall_s"] / row["wall_s"], 2) if row["wall_s"] else None
+            results.append(row)
+            print(f"{'':>14}  {row['speedup']}x vs single pass")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"target_kbps": args.kbps, "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""The job service (``python -m ytmedia serve``) under many concurrent clients, offline.
+
+A JobService with its own event loop thread fronts a JobQueue whose engine has
+``StubYoutubeIE`` (see benchmarks/stubsite.py), so jobs run the whole download
+path against a local media server. The clients, all on one asyncio loop:
+
+- ``--submit`` jobs POSTed at once (time to 201 each);
+- ``--watchers`` Server-Sent Event streams spread over those jobs, read until
+  the job's ``end`` (events received, how long a state change took to reach
+  them, events dropped);
+- ``--pollers`` keep-alive clients GETting job status in a loop until every
+  job is done (requests/sec, latency);
+- a ``/health`` probe every 50 ms meanwhile (how responsive the loop stays);
+- one more job cancelled right after it starts downloading (cancel request →
+  its ``cancelled`` state on a stream), and every output fetched back through
+  ``/jobs/ID/files/KIND`` and checked against the file on disk.
+
+Run from the repo root:  python -m benchmarks.bench_service [--watchers 200] [--pollers 50] [--json FILE]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+from ytmedia import DownloadEngine, JobQueue, JobService
+
+from .stubsite import MediaServer, StubYoutubeIE, make_media, probe_duration
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection to the service."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+                          f"\r\n".encode() + data)
+        await self.writer.drain()
+        status, headers = await read_head(self.reader)
+        payload = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection") == "close":
+            self.close()
+        if headers.get("content-type") == "application/json":
+            payload = json.loads(payload)
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def read_head(reader):
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    headers = {}
+    for line in head[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    return int(head[0].split(" ", 2)[1]), headers
+
+
+async def events(port, path):
+    """Yield (event, data) from a Server-Sent Events stream until it ends."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    try:
+        status, _ = await read_head(reader)
+        if status != 200:
+            raise RuntimeError(f"{path}: HTTP {status}")
+        while True:
+            block = (await reader.readuntil(b"\n\n")).decode()
+            fields = dict(line.split(": ", 1) for line in block.strip().split("\n") if not line.startswith(":"))
+            if "event" in fields:
+                yield fields["event"], json.loads(fields["data"])
+                if fields["event"] == "end":
+                    return
+    finally:
+        writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else None
+
+
+async def run(port, args):
+    url = "https://www.youtube.com/watch?v={}"
+    ids = [f"svc{i:08d}" for i in range(args.submit)]
+    t0 = time.monotonic()
+
+    async def submit(vid, **options):
+        c = Client(port)
+        t = time.monotonic()
+        status, job = await c.request("POST", "/jobs", {"url": url.format(vid), "kind": args.kind,
+                                                        "options": {"quality": "best", **options}})
+        c.close()
+        if status != 201:
+            raise RuntimeError(f"submit {vid}: HTTP {status} {job}")
+        return job["id"], time.monotonic() - t
+
+    submitted = await asyncio.gather(*(submit(vid) for vid in ids))
+    job_ids = [jid for jid, _ in submitted]
+    done = asyncio.Event()
+
+    received, dropped, lags = [], [], []
+
+    async def watch(jid):
+        n = 0
+        async for event, data in events(port, f"/jobs/{jid}/events"):
+            n += 1
+            if event == "state":
+                lags.append(time.time() - data["at"])
+            elif event == "end":
+                dropped.append(data["dropped"])
+        received.append(n)
+
+    poll_latency = []
+
+    async def poll(i):
+        c = Client(port)
+        while not done.is_set():
+            t = time.monotonic()
+            await c.request("GET", f"/jobs/{job_ids[i % len(job_ids)]}")
+            poll_latency.append(time.monotonic() - t)
+        c.close()
+
+    health = []
+
+    async def probe():
+        c = Client(port)
+        while not done.is_set():
+            t = time.monotonic()
+            await c.request("GET", "/health")
+            health.append(time.monotonic() - t)
+            await asyncio.sleep(0.05)
+        c.close()
+
+    async def cancel_one():
+        jid, _ = await submit("svccancel01", rate_limit=256 * 1024)  # slow enough to still be running
+        t_cancel = None
+        async for event, data in events(port, f"/jobs/{jid}/events"):
+            if event == "phase" and data["phase"] == "download" and t_cancel is None:
+                t_cancel = time.monotonic()
+                status, _ = await Client(port).request("POST", f"/jobs/{jid}/cancel")
+                if status != 200:
+                    raise RuntimeError(f"cancel: HTTP {status}")
+            elif event == "state" and data["status"] in ("cancelled", "done", "failed"):
+                return data["status"], (time.monotonic() - t_cancel) if t_cancel else None
+
+    watchers = [asyncio.create_task(watch(job_ids[i % len(job_ids)])) for i in range(args.watchers)]
+    pollers = [asyncio.create_task(poll(i)) for i in range(args.pollers)]
+    prober = asyncio.create_task(probe())
+    cancelled = asyncio.create_task(cancel_one())
+    t_poll = time.monotonic()
+    await asyncio.gather(*watchers)
+    cancel_status, cancel_seconds = await cancelled
+    done.set()
+    await asyncio.gather(*pollers, prober)
+    poll_seconds = time.monotonic() - t_poll
+    wall = time.monotonic() - t0
+
+    c = Client(port)
+    status, views = await c.request("GET", "/jobs?status=done")
+    files, fetched = 0, 0
+    for view in views["jobs"]:
+        for kind, path in view["outputs"].items():
+            status, body = await c.request("GET", f"/jobs/{view['id']}/files/{kind}")
+            if status != 200 or len(body) != os.path.getsize(path):
+                raise RuntimeError(f"#{view['id']} {kind}: HTTP {status}, {len(body)} bytes")
+            files += 1
+            fetched += len(body)
+    _, stats = await c.request("GET", "/stats")
+    c.close()
+    failed = [v for v in (await Client(port).request("GET", "/jobs?status=failed"))[1]["jobs"]]
+    if failed:
+        raise RuntimeError("; ".join(f"#{v['id']}: {v['error']}" for v in failed))
+
+    return {
+        "jobs": args.submit,
+        "watchers": args.watchers,
+        "pollers": args.pollers,
+        "wall": round(wall, 3),
+        "submit_p50": round(percentile([s for _, s in submitted], 0.5), 4),
+        "submit_max": round(max(s for _, s in submitted), 4),
+        "events": sum(received),
+        "events_dropped": sum(dropped),
+        "state_lag_p95": round(percentile(lags, 0.95), 4),
+        "polls": len(poll_latency),
+        "polls_per_sec": round(len(poll_latency) / poll_seconds),
+        "poll_p50": round(percentile(poll_latency, 0.5), 4),
+        "poll_p95": round(percentile(poll_latency, 0.95), 4),
+        "health_p95": round(percentile(health, 0.95), 4),
+        "health_max": round(max(health), 4),
+        "cancel": cancel_status,
+        "cancel_seconds": round(cancel_seconds, 4) if cancel_seconds is not None else None,
+        "files": files,
+        "fetched_bytes": fetched,
+        "requests": stats["service"]["requests"],
+    }
+
+
+def describe(r) -> str:
+    return "\n".join([
+        f"{r['jobs']} jobs, {r['watchers']} event streams, {r['pollers']} pollers: wall {r['wall']:.2f}s",
+        f"  submit     p50 {r['submit_p50'] * 1000:.1f} ms, max {r['submit_max'] * 1000:.1f} ms",
+        f"  events     {r['events']} delivered, {r['events_dropped']} dropped, "
+        f"state change → client p95 {r['state_lag_p95'] * 1000:.1f} ms",
+        f"  polling    {r['polls']} requests, {r['polls_per_sec']}/s, p50 {r['poll_p50'] * 1000:.1f} ms, "
+        f"p95 {r['poll_p95'] * 1000:.1f} ms",
+        f"  /health    p95 {r['health_p95'] * 1000:.1f} ms, max {r['health_max'] * 1000:.1f} ms under load",
+        f"  cancel     {r['cancel']} after {(r['cancel_seconds'] or 0) * 1000:.0f} ms",
+        f"  files      {r['files']} fetched back, {r['fetched_bytes'] / 1024 / 1024:.1f} MB",
+    ])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--submit", type=int, default=4, help="jobs submitted at once")
+    ap.add_argument("--kind", default="mp4", choices=["mp4", "mp3", "wav", "export"])
+    ap.add_argument("--workers", type=int, default=2, help="the service's worker pool (-j)")
+    ap.add_argument("--watchers", type=int, default=200, help="event streams, spread over the jobs")
+    ap.add_argument("--pollers", type=int, default=50, help="clients polling job status")
+    ap.add_argument("--media", metavar="DIR", help="keep the generated streams here (default: a temp dir)")
+    ap.add_argument("--seconds", type=int, default=20, help="length of the generated streams")
+    ap.add_argument("--latency", type=float, default=0.02, help="media server delay per request, seconds")
+    ap.add_argument("--extract-latency", type=float, default=0.3, help="seconds each stub extraction takes")
+    ap.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media or os.path.join(tmp, "media")
+        make_media(media, args.seconds)
+        server = MediaServer(media, args.latency).start()
+        StubYoutubeIE.base_url = server.url
+        StubYoutubeIE.media_folder = media
+        StubYoutubeIE.duration = probe_duration(media)
+        StubYoutubeIE.extract_latency = args.extract_latency
+
+        engine = DownloadEngine(extractors=[StubYoutubeIE], pool_sessions=True)
+        jq = JobQueue(engine, max_workers=args.workers)
+        service = JobService(jq, output_dir=os.path.join(tmp, "out"), port=0)
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(service.start(), loop).result()
+
+        result = asyncio.run(run(service.port, args))
+        print(describe(result))
+        jq.shutdown()
+        engine.close()
+        server.shutdown()
+        loop.call_soon_threadsafe(loop.stop)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"at": time.time(), "config": vars(args), "result": result}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
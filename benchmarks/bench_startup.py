@@ -0,0 +1,108 @@
+"""Start-up cost of the GUI's imports and of the first job, with and without the deferred engine.
+
+Each measurement runs in a fresh interpreter (``--runs`` times, median shown):
+
+- ``gui imports``: what Youtube_to_multimedia.py imports before its window
+  (customtkinter excluded, it may not be installed here), and whether yt-dlp
+  got loaded on the way
+- ``eager engine``: importing the engine the way the GUI used to at start
+- ``loader``: EngineLoader importing yt-dlp, building the engine and prewarming
+  a pooled session, on its thread
+- ``first session``: building the YoutubeDL the first job extracts with, cold
+  versus after the loader's prewarm (the YouTube extractor is set up offline,
+  nothing is fetched)
+
+Run from the repo root:  python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SNIPPETS = {
+    "gui imports": """
+import sys, time
+t = time.perf_counter()
+from ytmedia import AuthOptions, BandwidthManager, Batch, InfoCache, Job, JobJournal, JobOptions, Library, MetricsExporter
+from ytmedia.clients import ClientStats
+from ytmedia.cookies import CookieCache
+from ytmedia.options import QUALITIES
+from ytmedia.startup import EngineLoader, StartupTimer
+from ytmedia.uibus import LogRing, UIEventBus
+from ytmedia.urls import is_youtube_url
+print(time.perf_counter() - t, int("yt_dlp" in sys.modules))
+""",
+    "eager engine": """
+import time
+t = time.perf_counter()
+from ytmedia.engine import DownloadEngine
+from ytmedia.jobqueue import JobQueue
+print(time.perf_counter() - t, 1)
+""",
+    "loader": """
+import time
+from ytmedia.startup import EngineLoader
+t = time.perf_counter()
+def build():
+    from ytmedia.engine import DownloadEngine
+    return DownloadEngine(pool_sessions=True)
+EngineLoader(build).start().get()
+print(time.perf_counter() - t, 1)
+""",
+    "first session (cold)": """
+import time
+from ytmedia.engine import DownloadEngine
+engine = DownloadEngine(pool_sessions=True)
+t = time.perf_counter()
+with engine._ydl({"quiet": True}) as Y:
+    Y.get_info_extractor("Youtube")
+print(time.perf_counter() - t, 1)
+""",
+    "first session (prewarmed)": """
+import time
+from ytmedia.engine import DownloadEngine
+engine = DownloadEngine(pool_sessions=True)
+engine.prewarm()
+t = time.perf_counter()
+with engine._ydl({"quiet": True}) as Y:
+    Y.get_info_extractor("Youtube")
+print(time.perf_counter() - t, engine.sessions.stats()["reused"])
+""",
+}
+
+
+def measure(code: str, runs: int):
+    times, flags = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        took, flag = out.split()
+        times.append(float(took))
+        flags.append(int(flag))
+    return statistics.median(times), flags[-1]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    ap.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    args = ap.parse_args(argv)
+
+    results = []
+    for name, code in SNIPPETS.items():
+        took, flag = measure(code, args.runs)
+        note = ""
+        if name == "gui imports":
+            note = f" (yt-dlp loaded: {'yes' if flag else 'no'})"
+        elif name == "first session (prewarmed)":
+            note = f" (reused the prewarmed session: {'yes' if flag else 'no'})"
+        print(f"{name:>26}: {took * 1000:7.1f} ms{note}")
+        results.append({"name": name, "seconds": round(took, 4), "flag": flag})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
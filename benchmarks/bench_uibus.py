@@ -0,0 +1,230 @@
+"""Flood the UI event path with synthetic download-hook events.
+
+Worker threads play N downloading jobs: each posts a progress update per hook
+call and a log line whenever the whole percentage changes, and every second one
+of them dumps a format list (hundreds of log lines at once). A UI thread drains
+every 100 ms, the way the GUI's ``after()`` loop does, in two modes:
+
+- ``queue``: the old path, a ``queue.Queue`` drained item by item with one
+  ``insert`` + ``see`` per log line and a progress-bar update per event
+- ``bus``: ``UIEventBus`` + ``LogRing``, one insert per tick and progress
+  coalesced per job
+
+Reported per mode: events posted, widget calls, UI time per tick and the age of
+the oldest event when its tick finished (drain latency). With a display the
+calls go to a real (withdrawn) Tk ``Text``; without one each call is charged
+``--call-cost`` microseconds of busy time instead.
+
+Run from the repo root:  python -m benchmarks.bench_uibus [--jobs 8] [--seconds 5]
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+
+from ytmedia.uibus import LogRing, UIEventBus
+
+TICK = 0.1
+
+
+class SimulatedText:
+    """Stand-in for a Tk Text when there is no display: every call costs call_cost seconds."""
+
+    def __init__(self, call_cost):
+        self.call_cost = call_cost
+        self.lines = 0
+        self.calls = 0
+
+    def _spend(self):
+        self.calls += 1
+        end = time.perf_counter() + self.call_cost
+        while time.perf_counter() < end:
+            pass
+
+    def insert(self, _index, text):
+        self._spend()
+        self.lines += text.count("\n")
+
+    def delete(self, _start, end):
+        self._spend()
+        self.lines -= int(end.split(".")[0]) - 1
+
+    def see(self, _index):
+        self._spend()
+
+    def set_progress(self, _frac):
+        self._spend()
+
+
+class TkText:
+    def __init__(self):
+        import tkinter
+
+        self.root = tkinter.Tk()
+        self.root.withdraw()
+        self.text = tkinter.Text(self.root)
+        self.calls = 0
+
+    def insert(self, index, text):
+        self.calls += 1
+        self.text.insert(index, text)
+
+    def delete(self, start, end):
+        self.calls += 1
+        self.text.delete(start, end)
+
+    def see(self, index):
+        self.calls += 1
+        self.text.see(index)
+
+    def set_progress(self, _frac):
+        self.calls += 1
+        self.root.update_idletasks()
+
+
+def make_view(call_cost):
+    try:
+        return TkText(), "tk"
+    except Exception:  # no display (or no Tk)
+        return SimulatedText(call_cost), f"simulated {call_cost * 1e6:.0f}us/call"
+
+
+def flood(post_log, post_progress, jobs, seconds, hook_rate, format_rows, stop):
+    """Worker side: start jobs threads posting hook events; returns (threads, per-thread post counts)."""
+    counts = [0] * jobs
+
+    def worker(n):
+        pct = -1
+        t_end = time.monotonic() + seconds
+        i = 0
+        next_formats = time.monotonic() + 1.0
+        while not stop.is_set() and time.monotonic() < t_end:
+            frac = (i % 10000) / 10000
+            post_progress(n, frac)
+            counts[n] += 1
+            if int(frac * 100) != pct:
+                pct = int(frac * 100)
+                post_log(f"[#{n}] Downloading… {pct}% @ 4.20 MB/s | ETA 12s")
+                counts[n] += 1
+            if n == 0 and time.monotonic() >= next_formats:
+                next_formats += 1.0
+                for r in range(format_rows):
+                    post_log(f"{r:>4}  mp4  1920x1080  30  avc1.640028  mp4a.40.2  {r * 10:>6}k")
+                counts[n] += format_rows
+            i += 37
+            time.sleep(1 / hook_rate)
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(jobs)]
+    for t in threads:
+        t.start()
+    return threads, counts
+
+
+def run_queue(view, args):
+    q = queue.Queue()
+    stop = threading.Event()
+    threads, counts = flood(
+        lambda text: q.put(("log", text, time.monotonic())),
+        lambda key, frac: q.put(("progress", frac, time.monotonic())),
+        args.jobs, args.seconds, args.hook_rate, args.format_rows, stop,
+    )
+    ticks, latencies = [], []
+    while any(t.is_alive() for t in threads) or not q.empty():
+        time.sleep(TICK)
+        t0 = time.monotonic()
+        oldest = None
+        try:
+            while True:
+                kind, value, posted = q.get_nowait()
+                oldest = posted if oldest is None else oldest
+                if kind == "log":
+                    view.insert("end", f"{value}\n")
+                    view.see("end")
+                else:
+                    view.set_progress(value)
+        except queue.Empty:
+            pass
+        done = time.monotonic()
+        ticks.append(done - t0)
+        if oldest is not None:
+            latencies.append(done - oldest)
+    stop.set()
+    return summarize("queue", view, sum(counts), ticks, latencies, max_depth=None)
+
+
+def run_bus(view, args):
+    bus = UIEventBus()
+    ring = LogRing(max_lines=args.max_lines)
+    stop = threading.Event()
+    threads, counts = flood(bus.log, bus.progress, args.jobs, args.seconds, args.hook_rate, args.format_rows, stop)
+    ticks, latencies = [], []
+    while any(t.is_alive() for t in threads) or bus.depth():
+        time.sleep(TICK)
+        t0 = time.monotonic()
+        events, progress = bus.drain()
+        for _, lines in events:
+            ring.show(view, lines)
+        if progress:
+            view.set_progress(max(progress.values()))
+        took = time.monotonic() - t0
+        bus.drained(took)
+        ticks.append(took)
+        if events:
+            latencies.append(bus.last_latency + took)
+    stop.set()
+    st = bus.stats()
+    out = summarize("bus", view, sum(counts), ticks, latencies, max_depth=st["max_depth"])
+    out["coalesced"] = st["coalesced"]
+    out["dropped_logs"] = st["dropped_logs"]
+    out["lines_kept"] = len(ring.lines)
+    return out
+
+
+def summarize(mode, view, posted, ticks, latencies, max_depth):
+    ticks = sorted(ticks)
+    latencies = sorted(latencies) or [0.0]
+    return {
+        "mode": mode,
+        "posted": posted,
+        "widget_calls": view.calls,
+        "ticks": len(ticks),
+        "tick_ms_p50": round(ticks[len(ticks) // 2] * 1000, 2),
+        "tick_ms_max": round(ticks[-1] * 1000, 2),
+        "latency_ms_p50": round(latencies[len(latencies) // 2] * 1000, 1),
+        "latency_ms_max": round(latencies[-1] * 1000, 1),
+        "max_depth": max_depth,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--jobs", type=int, default=8, help="simulated downloading jobs")
+    ap.add_argument("--seconds", type=float, default=5.0, help="how long the workers post")
+    ap.add_argument("--hook-rate", type=float, default=1000, help="hook calls per second per job")
+    ap.add_argument("--format-rows", type=int, default=400, help="format-list lines dumped once a second")
+    ap.add_argument("--max-lines", type=int, default=2000, help="LogRing size for the bus mode")
+    ap.add_argument("--call-cost", type=float, default=100, help="simulated cost of a widget call, in us")
+    ap.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    args = ap.parse_args(argv)
+
+    results = []
+    for run in (run_queue, run_bus):
+        view, label = make_view(args.call_cost / 1e6)
+        r = run(view, args)
+        r["view"] = label
+        results.append(r)
+        print(
+            f"{r['mode']:>6} ({label}): {r['posted']} events → {r['widget_calls']} widget calls | "
+            f"tick p50 {r['tick_ms_p50']} ms, max {r['tick_ms_max']} ms | "
+            f"latency p50 {r['latency_ms_p50']} ms, max {r['latency_ms_max']} ms"
+            + (f" | max depth {r['max_depth']}, {r['coalesced']} progress coalesced" if r["mode"] == "bus" else "")
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""Offline stand-in for YouTube: synthetic media, a local server and a stub extractor.
+
+- ``make_media(folder, seconds)`` encodes the test streams with FFmpeg: DASH
+  video-only MP4s at 360p/720p/1080p, a 360p VP9 WebM (which a re-encode job
+  has to transcode), two AAC audio-only M4As and a 360p progressive MP4, at
+  bitrates close to YouTube's for those formats
+- ``MediaServer`` serves that folder with range support, adding per-request
+  latency, a per-connection bandwidth cap and injected failures: 503, 429
+  (with Retry-After) and 403 answers, requests that stall past the client's
+  timeout, connections cut mid-body, and ``throttle(seconds)``, a window in
+  which every request gets a 429 the way YouTube rate-limits a client.
+  ``fail_next(kind)`` injects one failure into the next request that isn't
+  a 1-byte range probe; ``ranges=False`` ignores Range headers and
+  ``sizes=False`` leaves the total out of Content-Range. It counts requests,
+  each kind of failure, bytes and the first byte sent, and keeps the Cookie
+  and Range headers of every request
+- ``StubYoutubeIE`` claims ``youtube.com/watch`` URLs and returns an info dict
+  with YouTube's format ids and real ``tbr``/``abr``/``height``/``filesize``
+  values for the files on the server, without touching the network. Pass it to
+  ``DownloadEngine(extractors=[StubYoutubeIE])``. With ``player_api`` set, each
+  extraction first fetches ``/player`` from the server, so it sees the
+  injected failures too
+- ``StubChannelIE`` claims ``youtube.com/@handle`` channel URLs and lists the
+  ids in ``StubChannelIE.uploads[handle]`` (newest first) as a lazy playlist of
+  watch URLs for ``StubYoutubeIE``, counting the entries it hands out
+
+The extractor is configured through class attributes (server URL, extraction
+latency, which clients are "blocked" for which video ids) and counts its
+extractions, so one benchmark can drive several scenarios.
+"""
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.networking.exceptions import HTTPError, network_exceptions
+from yt_dlp.utils import ExtractorError
+
+from ytmedia.ffmpeg import probe_media, run_ffmpeg
+
+# format_id -> (file, what) with YouTube's ids for the same kinds of stream
+STREAMS = {
+    "134": ("v360.mp4", {"width": 640, "height": 360, "vbr": 400}),
+    "136": ("v720.mp4", {"width": 1280, "height": 720, "vbr": 1500}),
+    "137": ("v1080.mp4", {"width": 1920, "height": 1080, "vbr": 3000}),
+    "243": ("v360.webm", {"width": 640, "height": 360, "vbr": 300, "vp9": True}),
+    "139": ("a48.m4a", {"abr": 48}),
+    "140": ("a128.m4a", {"abr": 128}),
+    "18": ("p360.mp4", {"width": 640, "height": 360, "vbr": 400, "abr": 96}),
+}
+CONTENT_TYPES = {".mp4": "video/mp4", ".m4a": "audio/mp4", ".webm": "video/webm"}
+COUNTERS = {503: "failures", 429: "throttled", 403: "forbidden", "stall": "stalls", "reset": "resets"}
+
+
+def make_media(folder: str, seconds: int = 20):
+    """Encode the STREAMS files into folder (existing ones are kept)."""
+    os.makedirs(folder, exist_ok=True)
+    for name, spec in STREAMS.values():
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            continue
+        args = []
+        if "height" in spec:
+            args += ["-f", "lavfi", "-i", f"testsrc2=size={spec['width']}x{spec['height']}:rate=30:duration={seconds}"]
+        if "abr" in spec:
+            args += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}"]
+        if spec.get("vp9"):
+            args += ["-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-g", "60",
+                     "-b:v", f"{spec['vbr']}k"]
+        elif "height" in spec:
+            v = spec["vbr"]
+            args += ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-g", "60",
+                     "-b:v", f"{v}k", "-maxrate", f"{v}k", "-bufsize", f"{2 * v}k"]
+        if "abr" in spec:
+            args += ["-c:a", "aac", "-b:a", f"{spec['abr']}k"]
+        if not path.endswith(".webm"):
+            args += ["-movflags", "+faststart"]
+        run_ffmpeg([*args, "-t", str(seconds), path])
+
+
+def probe_duration(folder: str) -> float:
+    info = probe_media(os.path.join(folder, STREAMS["140"][0])) or {}
+    return float(info.get("duration") or 0) or 20.0
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "StubMedia/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve()
+
+    def _serve(self, head: bool = False):
+        srv = self.server
+        time.sleep(srv.latency)
+        name = os.path.basename(self.path.split("?")[0])
+        path = os.path.join(srv.folder, name)
+        if name != "player" and not os.path.isfile(path):
+            self.send_error(404)
+            return
+        rng = self.headers.get("Range", "") if srv.ranges else ""
+        with srv.lock:
+            srv.requests += 1
+            srv.cookies.append(self.headers.get("Cookie"))
+            srv.range_headers.append((name, rng or None))
+            injected = srv.inject(head, probe=rng == "bytes=0-0")
+        if injected == "stall":
+            time.sleep(srv.stall_seconds)
+            self.close_connection = True
+            return
+        if injected in (503, 429, 403):
+            self.send_response(injected)
+            if injected == 429 and srv.retry_after is not None:
+                self.send_header("Retry-After", str(srv.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        reset = injected == "reset"
+        if name == "player":
+            body = b'{"playabilityStatus": {"status": "OK"}}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        m = re.match(r"bytes=(\d+)-(\d*)", rng)
+        if m:
+            start = int(m.group(1))
+            end = min(int(m.group(2)) if m.group(2) else end, end)
+            if start > end:
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size if srv.sizes else '*'}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[os.path.splitext(path)[1]])
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if head:
+            return
+        left = end - start + 1
+        cut = left // 2 if reset else None
+        block = 64 * 1024
+        t0 = time.monotonic()
+        sent = 0
+        with open(path, "rb") as fh:
+            fh.seek(start)
+            while left:
+                if cut is not None and sent >= cut:
+                    self.close_connection = True
+                    return
+                chunk = fh.read(min(block, left))
+                try:
+                    self.wfile.write(chunk)
+                except OSError:
+                    return
+                left -= len(chunk)
+                sent += len(chunk)
+                srv.count(len(chunk))
+                if srv.bandwidth:
+                    ahead = sent / srv.bandwidth - (time.monotonic() - t0)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+
+class MediaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, folder: str, latency: float = 0.0, bandwidth: int = 0,
+                 fail_rate: float = 0.0, reset_rate: float = 0.0, seed: int = 1,
+                 throttle_rate: float = 0.0, forbid_rate: float = 0.0, stall_rate: float = 0.0,
+                 stall_seconds: float = 30.0, retry_after: int | None = None):
+        super().__init__(("127.0.0.1", 0), MediaHandler)
+        self.folder = folder
+        self.latency = latency
+        self.bandwidth = bandwidth  # bytes/sec per connection, 0 = unlimited
+        self.fail_rate = fail_rate  # share of requests answered 503
+        self.reset_rate = reset_rate  # share of responses cut half way through the body
+        self.throttle_rate = throttle_rate  # share answered 429
+        self.forbid_rate = forbid_rate  # share answered 403
+        self.stall_rate = stall_rate  # share left unanswered for stall_seconds, then dropped
+        self.stall_seconds = stall_seconds
+        self.retry_after = retry_after  # Retry-After seconds sent with 429s (None: no header)
+        self.ranges = True  # False: answer every request with the whole file (200)
+        self.sizes = True  # False: "Content-Range: bytes a-b/*"
+        self.throttled_until = 0.0
+        self.scheduled = []  # failures for the next requests (see fail_next)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset_counters()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def handle_error(self, request, client_address):
+        pass  # clients dropping connections (cancel, injected resets)
+
+    def throttle(self, seconds: float):
+        """Answer every request with 429 for the next seconds."""
+        with self.lock:
+            self.throttled_until = time.monotonic() + seconds
+
+    def fail_next(self, kind, n: int = 1):
+        """Inject kind (503, 429, 403, "stall" or "reset") into the next n requests that aren't 1-byte probes."""
+        with self.lock:
+            self.scheduled += [kind] * n
+
+    def inject(self, head: bool, probe: bool = False):
+        """The failure to inject into one request (under lock): 503, 429, 403, "stall", "reset" or None."""
+        if time.monotonic() < self.throttled_until:
+            self.throttled += 1
+            return 429
+        if head:
+            return None
+        if self.scheduled and not probe:
+            kind = self.scheduled.pop(0)
+            setattr(self, COUNTERS[kind], getattr(self, COUNTERS[kind]) + 1)
+            return kind
+        for kind, rate in ((503, self.fail_rate), (429, self.throttle_rate), (403, self.forbid_rate),
+                           ("stall", self.stall_rate), ("reset", self.reset_rate)):
+            if rate and self.rng.random() < rate:
+                setattr(self, COUNTERS[kind], getattr(self, COUNTERS[kind]) + 1)
+                return kind
+        return None
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.cookies = []  # each request's Cookie header (None: none sent)
+            self.range_headers = []  # (file, Range header or None) of each request
+            self.failures = 0
+            self.resets = 0
+            self.throttled = 0
+            self.forbidden = 0
+            self.stalls = 0
+            self.bytes = 0
+            self.first_byte_at = None
+            self.last_byte_at = None
+
+    def count(self, n: int):
+        now = time.monotonic()
+        with self.lock:
+            self.bytes += n
+            if self.first_byte_at is None:
+                self.first_byte_at = now
+            self.last_byte_at = now
+
+
+class StubYoutubeIE(InfoExtractor):
+    IE_NAME = "youtube:stub"
+    _VALID_URL = r"https?://(?:www\.)?youtube\.com/watch\?v=(?P<id>[\w-]{11})"
+
+    base_url = None  # MediaServer.url
+    media_folder = None  # the folder it serves (for the file sizes)
+    duration = 20.0
+    extract_latency = 0.0  # seconds each extraction takes (player page + API calls)
+    blocked = {}  # video id -> clients that fail ("normal" for the default one)
+    unavailable = set()  # video ids that are "removed"
+    player_api = False  # fetch /player from the server on each extraction
+    extractions = 0
+    _count_lock = threading.Lock()
+
+    def _real_extract(self, url):
+        vid = self._match_id(url)
+        clients = (self.get_param("extractor_args") or {}).get("youtube", {}).get("player_client") or ["normal"]
+        with StubYoutubeIE._count_lock:
+            StubYoutubeIE.extractions += 1
+        time.sleep(self.extract_latency)
+        if vid in self.unavailable:
+            raise ExtractorError("Video unavailable. This video has been removed by the uploader", expected=True)
+        if self.player_api:
+            self._player(vid)
+        if clients[0] in self.blocked.get(vid, ()):
+            raise ExtractorError("Sign in to confirm you're not a bot", expected=True)
+        return {
+            "id": vid,
+            "title": f"Stub video {vid}",
+            "duration": self.duration,
+            "formats": [self._format(fid, name, spec) for fid, (name, spec) in STREAMS.items()],
+        }
+
+    def _player(self, vid):
+        # As YoutubeIE's API calls: network errors and 5xx are retried (extractor_retries), 403/429 are not
+        for retry in self.RetryManager():
+            try:
+                return self._download_json(f"{self.base_url}/player?v={vid}", vid, note="Downloading player API JSON")
+            except ExtractorError as e:
+                if not isinstance(e.cause, network_exceptions) or (
+                        isinstance(e.cause, HTTPError) and e.cause.status in (403, 429)):
+                    raise
+                retry.error = e
+
+    def _format(self, format_id, name, spec):
+        size = os.path.getsize(os.path.join(self.media_folder, name))
+        video, audio = "height" in spec, "abr" in spec
+        ext = os.path.splitext(name)[1][1:]
+        f = {
+            "format_id": format_id,
+            "url": f"{self.base_url}/{name}",
+            "ext": ext,
+            "protocol": "http",
+            "vcodec": ("vp9" if spec.get("vp9") else "avc1.4d401f") if video else "none",
+            "acodec": "mp4a.40.2" if audio else "none",
+            "filesize": size,
+            "tbr": round(size * 8 / self.duration / 1000, 1),
+        }
+        if video:
+            f.update(width=spec["width"], height=spec["height"], fps=30, vbr=spec["vbr"])
+        if audio:
+            f.update(abr=spec["abr"], asr=44100, audio_channels=1)
+        if video and not audio:
+            f["container"] = f"{ext}_dash"
+        elif audio and not video:
+            f["container"] = "m4a_dash"
+        return f
+
+
+class StubChannelIE(InfoExtractor):
+    IE_NAME = "youtube:tab:stub"
+    _VALID_URL = r"https?://(?:www\.)?youtube\.com/@(?P<id>[\w.-]+)(?:/videos)?/?$"
+
+    uploads = {}  # handle -> video ids, newest first
+    listed = 0  # entries handed out (a sync that stops early leaves the rest unlisted)
+
+    def _real_extract(self, url):
+        handle = self._match_id(url)
+        return self.playlist_result(self._entries(handle), handle, f"Stub channel @{handle}")
+
+    def _entries(self, handle):
+        for vid in list(self.uploads.get(handle, ())):
+            StubChannelIE.listed += 1
+            yield self.url_result(f"https://www.youtube.com/watch?v={vid}", StubYoutubeIE, vid, f"Stub video {vid}")
@@ -0,0 +1,53 @@
+"""Shared fixtures: the offline YouTube stand-in from benchmarks/stubsite.py, and per-test user folders.
+
+Run from the repo root:  python -m pytest tests
+"""
+import shutil
+
+import pytest
+
+from benchmarks.stubsite import MediaServer, StubChannelIE, StubYoutubeIE, make_media, probe_duration
+from ytmedia import DownloadEngine, JobQueue
+
+
+@pytest.fixture(autouse=True)
+def user_dirs(tmp_path, monkeypatch):
+    """Keep the cache, journal, archive and metrics files of each test in its own folder."""
+    monkeypatch.setenv("YTMEDIA_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("YTMEDIA_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("YTMEDIA_METRICS_PROM", raising=False)
+
+
+@pytest.fixture(scope="session")
+def media(tmp_path_factory):
+    """The stub streams, 3 seconds long, encoded once per session."""
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("FFmpeg is not on PATH")
+    folder = str(tmp_path_factory.mktemp("media"))
+    make_media(folder, 3)
+    return folder
+
+
+@pytest.fixture
+def server(media, monkeypatch):
+    """A MediaServer for media, with StubYoutubeIE pointed at it (its class settings restored afterwards)."""
+    srv = MediaServer(media).start()
+    monkeypatch.setattr(StubYoutubeIE, "base_url", srv.url)
+    monkeypatch.setattr(StubYoutubeIE, "media_folder", media)
+    monkeypatch.setattr(StubYoutubeIE, "duration", probe_duration(media))
+    monkeypatch.setattr(StubYoutubeIE, "blocked", {})
+    monkeypatch.setattr(StubYoutubeIE, "unavailable", set())
+    monkeypatch.setattr(StubYoutubeIE, "player_api", False)
+    monkeypatch.setattr(StubChannelIE, "uploads", {})
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def queue(server):
+    """A two-worker JobQueue whose engine resolves youtube.com URLs with the stub extractors."""
+    jq = JobQueue(DownloadEngine(extractors=[StubYoutubeIE, StubChannelIE]), max_workers=2)
+    yield jq
+    jq.shutdown(cancel=True)
+    jq.engine.close()
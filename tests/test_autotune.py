@@ -0,0 +1,68 @@
+import threading
+import time
+
+from benchmarks.stubsite import StubChannelIE, StubYoutubeIE
+from ytmedia import DownloadEngine, Job, JobOptions, JobQueue
+from ytmedia.autotune import ThroughputTuner
+from ytmedia.ytdlp_ext import _Gate
+
+URL = "https://www.youtube.com/watch?v=autotune001"
+
+
+def test_a_running_stream_takes_the_new_chunk_size(server, tmp_path):
+    server.bandwidth = 512 * 1024
+    tuner = ThroughputTuner(path=tmp_path / "autotune.json", window=0.3)
+    jq = JobQueue(DownloadEngine(extractors=[StubYoutubeIE, StubChannelIE], tuner=tuner), max_workers=1)
+    try:
+        job = jq.submit(Job(URL, options=JobOptions(save_dir=str(tmp_path), autotune=True)))
+        jq.wait([job], timeout=120)
+    finally:
+        jq.shutdown(cancel=True)
+        jq.engine.close()
+    assert job.status == "done", job.error
+
+    video = [rng for name, rng in server.range_headers if name == "v1080.mp4" and rng != "bytes=0-0"]
+    sizes = []
+    for rng in video:
+        start, _, end = rng[len("bytes="):].partition("-")
+        sizes.append(int(end) - int(start) + 1)
+    assert sizes[0] == tuner.steps["http"][0]
+    assert max(sizes[:-1]) > sizes[0]  # later ranges of the same transfer follow the tuner
+
+
+def test_streams_keep_their_own_setting(tmp_path):
+    tuner = ThroughputTuner(path=tmp_path / "autotune.json", window=0.0)
+    tuner.record(tuner.key("a.example", "http"), 1024 * 1024, 5e6)
+    session = tuner.session()
+    a = {"format_id": "a", "url": "https://a.example/v", "protocol": "https"}
+    b = {"format_id": "b", "url": "https://b.example/v", "protocol": "https"}
+    session.prime([a, b])
+    assert (session.value(a), session.value(b)) == (2 * 1024 * 1024, 256 * 1024)
+
+    session.hook({"status": "downloading", "downloaded_bytes": 0, "info_dict": b})
+    time.sleep(0.6)
+    session.hook({"status": "downloading", "downloaded_bytes": 10**6, "info_dict": b})
+    assert session.value(b) == 512 * 1024  # b moved on to its next trial
+    assert session.value(a) == 2 * 1024 * 1024  # a did not
+
+
+def test_gate_follows_a_changing_limit():
+    limit = [1]
+    gate = _Gate(lambda: limit[0])
+    peak, lock = [0], threading.Lock()
+
+    def work():
+        with gate.slot():
+            with lock:
+                peak[0] = max(peak[0], gate.active)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.12)
+    assert peak[0] == 1
+    limit[0] = 4
+    for t in threads:
+        t.join()
+    assert peak[0] == 4
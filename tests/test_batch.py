@@ -0,0 +1,36 @@
+import time
+
+from benchmarks.stubsite import StubChannelIE
+from ytmedia import Batch, Job, JobOptions
+
+CHANNEL = "https://www.youtube.com/@batch"
+
+
+def batch_job(save_dir):
+    return Job(CHANNEL, kind="mp4", options=JobOptions(save_dir=str(save_dir), quality="720p"))
+
+
+def test_batch_keeps_max_pending_and_unsubscribes(queue, tmp_path):
+    StubChannelIE.uploads["batch"] = [f"batch{i:06d}" for i in range(4)]
+    listeners = list(queue._listeners)
+    peak = [0]
+    batch = Batch(queue, batch_job(tmp_path), max_pending=1)
+    batch._on_submitted = lambda job, entry: peak.__setitem__(0, max(peak[0], len(batch.pending)))
+    assert batch.start().wait(120)
+    assert batch.summary()["done"] == 4
+    assert peak[0] == 1
+    assert queue._listeners == listeners  # no dead batch left behind on the queue
+
+
+def test_cancel_wakes_a_batch_waiting_for_a_slot(queue, server, tmp_path):
+    server.bandwidth = 64 * 1024  # entries take long enough to keep the only slot busy
+    StubChannelIE.uploads["batch"] = [f"batch{i:06d}" for i in range(3)]
+    batch = Batch(queue, batch_job(tmp_path), max_pending=1).start()
+    while not batch.pending:
+        time.sleep(0.05)
+    t0 = time.monotonic()
+    batch.cancel()
+    assert batch.wait(30)
+    assert time.monotonic() - t0 < 10
+    s = batch.summary()
+    assert batch.job.status == "cancelled" and s["entries"] == 1 and s["cancelled"] == 1
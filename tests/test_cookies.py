@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import time
+
+from ytmedia import DownloadEngine
+from ytmedia.cookies import COOKIEJAR_PARAM, CookieCache
+from ytmedia.options import AuthOptions
+
+EXPIRES = int(time.time()) + 86400
+
+
+def write_txt(path, cookies):
+    lines = ["# Netscape HTTP Cookie File"]
+    lines += [f".youtube.com\tTRUE\t/\tTRUE\t{EXPIRES}\t{name}\t{value}" for name, value in cookies]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def names(jar):
+    return sorted(c.name for c in jar)
+
+
+def test_cookies_txt_loads_once_and_reloads_on_change(tmp_path):
+    path = tmp_path / "cookies.txt"
+    write_txt(path, [("SID", "one")])
+    auth = AuthOptions(mode="txt", cookies_file=str(path))
+    cache = CookieCache()
+
+    jar = cache.jar(auth)
+    assert names(jar) == ["SID"]
+    assert cache.jar(auth) is jar
+    assert cache.jar(AuthOptions(mode="txt", cookies_file=str(path))) is jar  # same identity, same jar
+    assert (cache.loads, cache.hits) == (1, 2)
+
+    write_txt(path, [("SID", "one"), ("HSID", "two")])  # size changes
+    bigger = cache.jar(auth)
+    assert bigger is not jar and names(bigger) == ["HSID", "SID"]
+
+    st = os.stat(path)
+    write_txt(path, [("SID", "uno"), ("HSID", "two")])  # same size, newer mtime
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    newer = cache.jar(auth)
+    assert newer is not bigger and {c.name: c.value for c in newer}["SID"] == "uno"
+    assert cache.loads == 3
+
+
+def test_browser_database_loads_once_and_reloads_on_change(tmp_path):
+    profile = tmp_path / "profile"
+    profile.mkdir()
+    db = sqlite3.connect(profile / "cookies.sqlite")
+    db.execute("CREATE TABLE moz_cookies (id INTEGER PRIMARY KEY, originAttributes TEXT DEFAULT '', name TEXT, "
+               "value TEXT, host TEXT, path TEXT, expiry INTEGER, isSecure INTEGER)")
+    row = "INSERT INTO moz_cookies (name, value, host, path, expiry, isSecure) VALUES (?, ?, '.youtube.com', '/', ?, 1)"
+    db.execute(row, ("SID", "one", EXPIRES))
+    db.commit()
+    auth = AuthOptions(mode="browser", browser="firefox", profile=str(profile))
+    cache = CookieCache()
+
+    jar = cache.jar(auth)
+    assert names(jar) == ["SID"]
+    assert cache.jar(auth) is jar
+    assert (cache.loads, cache.hits) == (1, 1)
+
+    time.sleep(0.01)
+    db.execute(row, ("HSID", "two", EXPIRES))
+    db.commit()
+    db.close()
+    reloaded = cache.jar(auth)
+    assert reloaded is not jar and names(reloaded) == ["HSID", "SID"]
+    assert cache.loads == 2
+
+
+def test_every_session_gets_the_shared_jar(tmp_path):
+    path = tmp_path / "cookies.txt"
+    write_txt(path, [("SID", "one")])
+    cache = CookieCache()
+    jar = cache.jar(AuthOptions(mode="txt", cookies_file=str(path)))
+    engine = DownloadEngine(cookies=cache)
+    first, second = (engine._new_ydl({"quiet": True, COOKIEJAR_PARAM: jar}) for _ in range(2))
+    assert first.cookiejar is jar and second.cookiejar is jar
+    assert "SID=one" in first.cookiejar.get_cookie_header("https://www.youtube.com/watch")
@@ -0,0 +1,33 @@
+import os
+
+from ytmedia import Job, JobOptions
+
+URL = "https://www.youtube.com/watch?v={}"
+
+
+def run(queue, vid, kind, save_dir, **options):
+    job = queue.submit(Job(URL.format(vid), kind=kind, options=JobOptions(save_dir=str(save_dir), **options)))
+    queue.wait([job], timeout=120)
+    assert job.status == "done", job.error
+    return job
+
+
+def streams(job):
+    return [s for s in job.metrics.spans if s["phase"] == "download"]
+
+
+def test_audio_job_downloads_only_the_audio_stream(queue, server, tmp_path):
+    job = run(queue, "audio000001", "mp3", tmp_path)
+    assert job.format_ids == "140"
+    assert len(streams(job)) == 1
+    assert [a["ok"] for a in job.metrics.attempts] == [True]  # no stale video+audio merge failing the first client
+    assert server.bytes == os.path.getsize(os.path.join(server.folder, "a128.m4a"))
+    assert [os.path.splitext(p)[1] for p in job.outputs.values()] == [".mp3"]
+
+
+def test_progressive_pick_is_not_merged(queue, server, tmp_path):
+    job = run(queue, "progr000001", "mp4", tmp_path, quality="720p")
+    assert job.format_ids == "18"
+    assert len(streams(job)) == 1
+    assert [a["ok"] for a in job.metrics.attempts] == [True]
+    assert server.bytes == os.path.getsize(os.path.join(server.folder, "p360.mp4"))
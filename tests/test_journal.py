@@ -0,0 +1,105 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from benchmarks.stubsite import StubYoutubeIE
+from ytmedia.journal import JobJournal, _process_started
+from ytmedia.ranged import RANGES_SUFFIX
+from ytmedia.paths import user_data_dir
+
+ROOT = Path(__file__).resolve().parents[1]
+URL = "https://www.youtube.com/watch?v=killed00001"
+
+# A run of the engine in its own process, journalled like the CLI's
+CHILD = """
+import sys
+from benchmarks.stubsite import StubYoutubeIE
+from ytmedia import DownloadEngine, Job, JobOptions, JobQueue
+from ytmedia.journal import JobJournal
+
+StubYoutubeIE.base_url, StubYoutubeIE.media_folder, save_dir = sys.argv[1:4]
+StubYoutubeIE.duration = float(sys.argv[4])
+jq = JobQueue(DownloadEngine(extractors=[StubYoutubeIE]), max_workers=1)
+JobJournal().attach(jq)
+jq.submit(Job(sys.argv[5], options=JobOptions(save_dir=save_dir, ranged_connections=int(sys.argv[6]))))
+jq.wait()
+"""
+
+
+def journal_lines():
+    path = user_data_dir() / "journal.jsonl"
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def wait_for(predicate, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.05)
+    pytest.fail("timed out")
+
+
+def part_way(path) -> bool:
+    """Over 256 KiB of path is on disk (a ranged .part is preallocated: count its finished ranges)."""
+    try:
+        with open(path + RANGES_SUFFIX) as fh:
+            return len(fh.read().splitlines()) > 2  # the size, then a line per 256 KiB range
+    except FileNotFoundError:
+        return os.path.exists(path) and os.path.getsize(path) > 256 * 1024
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+@pytest.mark.parametrize("connections", [0, 4])
+def test_resume_finishes_a_job_whose_process_was_killed(queue, server, tmp_path, connections):
+    server.bandwidth = 256 * 1024  # slow enough to kill it part way through the video stream
+    child = subprocess.Popen([sys.executable, "-c", CHILD, server.url, server.folder, str(tmp_path),
+                              str(StubYoutubeIE.duration), URL, str(connections)], cwd=ROOT)
+    try:
+        partials = wait_for(lambda: [p for r in journal_lines() for p in r.get("partials") or []])
+        wait_for(lambda: any(part_way(p) for p in partials))
+    finally:
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+    sent = server.bytes
+
+    journal = JobJournal()
+    records = journal.unfinished()
+    assert [(r["url"], r["phase"]) for r in records] == [(URL, "download")]
+    server.bandwidth = 0
+    server.reset_counters()
+    journal.attach(queue)
+    (job,) = journal.resume(queue, records)
+    queue.wait([job], timeout=120)
+    assert job.status == "done", job.error
+    assert job.key == records[0]["key"]
+    assert job.options.ranged_connections == connections
+    assert os.path.exists(job.outputs["mp4"])
+    full = sum(os.path.getsize(os.path.join(server.folder, f)) for f in ("v1080.mp4", "a128.m4a"))
+    assert server.bytes < full  # the .part file was continued, not fetched again
+    assert sent + server.bytes >= full
+    assert JobJournal().unfinished() == []
+
+
+def test_a_reused_pid_is_not_taken_for_the_owner(tmp_path):
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        path = tmp_path / "journal.jsonl"
+        started = _process_started(other.pid)
+        rec = {"url": URL, "kind": "mp4", "options": {}, "status": "running", "pid": other.pid, "run": "old"}
+        lines = [{**rec, "key": "live", "pid_started": started},
+                 {**rec, "key": "reused", "pid_started": started - 1 if isinstance(started, int) else "earlier"}]
+        path.write_text("".join(json.dumps(r) + "\n" for r in lines))
+        assert [r["key"] for r in JobJournal(path).unfinished()] == ["reused"]
+    finally:
+        other.kill()
+        other.wait()
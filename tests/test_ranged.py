@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from ytmedia import Job, JobOptions
+from ytmedia.ranged import MIN_RANGE_SIZE, RangedDownloader, RangeHTTPError, RangeNotSupported
+
+FILE = "v720.mp4"
+
+
+def ranges(size, connections):
+    step = max(MIN_RANGE_SIZE, -(-size // (connections * 4)))
+    return -(-size // step)
+
+
+def fetch(server, tmp_path, connections=3):
+    src = os.path.join(server.folder, FILE)
+    dl = RangedDownloader(connections=connections, retry_sleep=lambda n: None)
+    size = dl.download(f"{server.url}/{FILE}", str(tmp_path / FILE))
+    with open(src, "rb") as a, open(tmp_path / FILE, "rb") as b:
+        assert a.read() == b.read()
+    return dl, size
+
+
+def test_splits_the_file_into_ranges(server, tmp_path):
+    dl, size = fetch(server, tmp_path)
+    n = ranges(size, 3)
+    assert n > 1
+    assert server.requests == 1 + n  # the probe, then one request per range
+    assert dl.range_retries == 0
+
+
+@pytest.mark.parametrize("failure", ["reset", 503])
+def test_retries_only_the_failed_range(server, tmp_path, failure):
+    server.fail_next(failure)
+    dl, size = fetch(server, tmp_path)
+    assert dl.range_retries == 1
+    assert server.requests == 1 + ranges(size, 3) + 1
+
+
+def test_client_errors_are_not_retried(server, tmp_path):
+    server.fail_next(403)
+    with pytest.raises(RangeHTTPError) as e:
+        fetch(server, tmp_path)
+    assert e.value.status == 403
+    assert server.forbidden == 1
+
+
+@pytest.mark.parametrize("setting", ["ranges", "sizes"])
+def test_probe_rejects_servers_it_cannot_split_for(server, tmp_path, setting):
+    setattr(server, setting, False)
+    with pytest.raises(RangeNotSupported):
+        RangedDownloader().download(f"{server.url}/{FILE}", str(tmp_path / FILE))
+
+
+@pytest.mark.parametrize("setting", ["ranges", "sizes"])
+def test_job_falls_back_to_one_connection(queue, server, tmp_path, setting):
+    setattr(server, setting, False)
+    job = queue.submit(Job("https://www.youtube.com/watch?v=ranged00001", kind="mp4",
+                           options=JobOptions(save_dir=str(tmp_path), quality="720p", ranged_connections=4)))
+    queue.wait([job], timeout=120)
+    assert job.status == "done", job.error
+    assert job.format_ids == "18"
+    assert os.path.getsize(job.outputs["mp4"]) == os.path.getsize(os.path.join(server.folder, "p360.mp4"))
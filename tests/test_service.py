@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from ytmedia import DownloadEngine, Job, JobQueue, JobService
+from ytmedia.batch import Batch
+from ytmedia.options import AuthOptions, JobOptions
+from ytmedia.service import BATCH_RETENTION, HTTPError
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    queues = []
+
+    def make(auth=None):
+        jq = JobQueue(DownloadEngine(), max_workers=1)
+        queues.append(jq)
+        return JobService(jq, output_dir=str(tmp_path), defaults=JobOptions(auth=auth or AuthOptions()))
+
+    yield make
+    for jq in queues:
+        jq.shutdown()
+
+
+@pytest.mark.parametrize("auth", [
+    {"mode": "txt", "cookies_file": "/etc/passwd"},
+    {"mode": "browser", "browser": "firefox"},
+    {"cookies_file": "/etc/passwd"},
+])
+def test_requests_cannot_bring_their_own_cookies(make_service, auth):
+    with pytest.raises(HTTPError) as e:
+        make_service()._options({"auth": auth})
+    assert e.value.status == 403
+
+
+def test_requests_use_or_drop_the_operators_cookies(make_service, tmp_path):
+    jar = tmp_path / "cookies.txt"
+    jar.write_text("# Netscape HTTP Cookie File\n")
+    service = make_service(AuthOptions(mode="txt", cookies_file=str(jar)))
+    assert service._options({}).auth.cookies_file == str(jar)
+    assert service._options({"auth": {"mode": "txt"}}).auth.cookies_file == str(jar)
+    assert service._options({"auth": {"mode": "none"}}).auth.mode == "none"
+    with pytest.raises(HTTPError) as e:
+        service._options({"auth": {"mode": "txt", "cookies_file": str(tmp_path / "other.txt")}})
+    assert e.value.status == 403
+    with pytest.raises(HTTPError):
+        service._options({"auth": {"mode": "browser"}})
+
+
+@pytest.mark.parametrize("options", [
+    {"priority": "urgent"},
+    {"targets": ["mp4", "flac"]},
+    {"rate_limit": -1},
+    {"ranged_connections": 100000},
+    {"encode_workers": 17},
+])
+def test_out_of_range_options_are_rejected(make_service, options):
+    with pytest.raises(HTTPError) as e:
+        make_service()._options(options)
+    assert e.value.status == 400
+
+
+def test_options_within_range_are_accepted(make_service):
+    o = make_service()._options({"priority": "high", "targets": ["mp3", "wav"], "ranged_connections": 16,
+                                 "encode_workers": 4, "rate_limit": 0})
+    assert (o.priority, o.targets, o.ranged_connections, o.encode_workers) == ("high", ("mp3", "wav"), 16, 4)
+
+
+def test_finished_batches_are_forgotten(make_service):
+    service = make_service()
+    old, recent, running = (Batch(service.queue, Job("https://www.youtube.com/playlist?list=PL1")) for _ in range(3))
+    for batch, age in ((old, BATCH_RETENTION + 1), (recent, 1)):
+        batch.job.finished_at = time.monotonic() - age
+        batch._finished.set()
+    service.batches = {b.id: b for b in (old, recent, running)}
+    service._forget_batches()
+    assert set(service.batches) == {recent.id, running.id}
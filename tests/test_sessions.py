@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from benchmarks.stubsite import StubYoutubeIE
+from ytmedia import DownloadEngine
+from ytmedia.cookies import COOKIEJAR_PARAM, CookieCache
+from ytmedia.options import AuthOptions
+
+URL = "https://www.youtube.com/watch?v=session0001"
+OPTS = {"quiet": True, "no_warnings": True}
+
+
+@pytest.fixture
+def engine(server):
+    engine = DownloadEngine(pool_sessions=True, extractors=[StubYoutubeIE])
+    yield engine
+    engine.close()
+
+
+def fetch(Y, server):
+    with Y.urlopen(f"{server.url}/player") as resp:
+        return resp.read()
+
+
+def test_lease_reuses_and_releases_sessions(engine, server):
+    pool = engine.sessions
+    with pool.lease(OPTS) as first:
+        assert first.extract_info(URL, download=False, process=False)["id"] == "session0001"
+        director, ie = first._request_director, first.get_info_extractor(StubYoutubeIE.ie_key())
+    assert pool.stats()["idle"] == 1
+
+    with pool.lease({**OPTS, "outtmpl": "%(id)s.%(ext)s"}) as second:  # per-lease options don't matter
+        assert second._request_director is director
+        assert second.get_info_extractor(StubYoutubeIE.ie_key()) is ie
+        assert ie._downloader is second
+        assert second.extract_info(URL, download=False, process=False)["id"] == "session0001"
+        fetch(second, server)
+    s = pool.stats()
+    assert (s["leases"], s["created"], s["reused"], s["idle"]) == (2, 1, 1, 1)
+    assert s["requests"] == 1
+
+    with pytest.raises(RuntimeError):
+        with pool.lease(OPTS):
+            raise RuntimeError("cancelled mid-transfer")
+    s = pool.stats()
+    assert (s["discarded"], s["idle"]) == (1, 0)  # closed, not pooled
+    assert s["requests"] == 1  # a retired session's requests still count
+
+
+def test_sessions_keep_their_own_cookies(engine, server, tmp_path):
+    cache = CookieCache()
+    jars = {}
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.txt"
+        path.write_text("# Netscape HTTP Cookie File\n"
+                        f"127.0.0.1\tFALSE\t/\tFALSE\t{int(time.time()) + 3600}\tSID\t{name}\n")
+        jars[name] = cache.jar(AuthOptions(mode="txt", cookies_file=str(path)))
+
+    for name in ("a", "b", "a", "b"):
+        with engine.sessions.lease({**OPTS, COOKIEJAR_PARAM: jars[name]}) as Y:
+            assert Y.cookiejar is jars[name]
+            fetch(Y, server)
+        assert server.cookies[-1] == f"SID={name}"
+    with engine.sessions.lease(OPTS) as Y:
+        fetch(Y, server)
+    assert server.cookies[-1] is None
+    s = engine.sessions.stats()
+    assert (s["created"], s["reused"]) == (3, 2)
+
+
+def test_sessions_keep_their_own_proxy(engine, server):
+    dead = {**OPTS, "proxy": "http://127.0.0.1:9"}  # nothing listens there
+    for opts in (OPTS, dead, OPTS, dead):
+        with engine.sessions.lease(opts) as Y:
+            if "proxy" in opts:
+                with pytest.raises(Exception):
+                    fetch(Y, server)
+            else:
+                assert fetch(Y, server)
+    s = engine.sessions.stats()
+    assert (s["created"], s["reused"]) == (2, 2)
+    assert server.requests == 2  # the proxied session never reached the server
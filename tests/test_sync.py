@@ -0,0 +1,44 @@
+from benchmarks.stubsite import StubChannelIE
+from ytmedia import Job, JobOptions
+from ytmedia.sync import ChannelSync, SyncArchive
+
+CHANNEL = "https://www.youtube.com/@stub"
+
+
+def ids(n, start=0):
+    return [f"sync{i:07d}" for i in range(start, start + n)]
+
+
+def sync(queue, archive, save_dir, **kwargs):
+    job = Job(CHANNEL, kind="mp4", options=JobOptions(save_dir=str(save_dir), quality="720p"))
+    batch = ChannelSync(queue, job, archive=archive, **kwargs).start()
+    assert batch.wait(120)
+    return batch
+
+
+def test_limit_keeps_the_mark_until_the_new_uploads_are_in(queue, tmp_path):
+    archive = SyncArchive(tmp_path / "sync.json")
+    old = ids(3)
+    StubChannelIE.uploads["stub"] = list(old)
+    first = sync(queue, archive, tmp_path)
+    assert first.summary()["done"] == 3
+    assert archive.channel("/@stub/videos")["high_water"] == old[0]
+
+    new = ids(6, start=3)[::-1]  # newest first
+    StubChannelIE.uploads["stub"] = new + old
+    limited = sync(queue, archive, tmp_path, limit=2)
+    assert limited.summary()["done"] == 2
+    state = archive.channel("/@stub/videos")
+    assert state["high_water"] == old[0] and state["partial"]
+
+    rest = sync(queue, archive, tmp_path)
+    s = rest.summary()
+    assert s["done"] == 4 and s["skipped"] == 2
+    assert {url[-11:] for url, _ in rest.skipped} == set(new[:2])
+    state = archive.channel("/@stub/videos")
+    assert state["high_water"] == new[0] and not state["partial"]
+    assert set(new) <= set(state["ids"])
+
+    again = sync(queue, archive, tmp_path)
+    assert again.summary()["entries"] == 0
+    assert again.scanned == 1  # stopped at the new mark
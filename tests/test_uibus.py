@@ -0,0 +1,42 @@
+from ytmedia.uibus import LogRing
+
+
+class Text:
+    """The slice of a Tk Text that LogRing.show uses, on a string."""
+
+    def __init__(self):
+        self.content = ""
+
+    def insert(self, _index, text):
+        self.content += text
+
+    def delete(self, _start, end):
+        drop = int(end.split(".")[0]) - 1
+        self.content = "".join(self.content.splitlines(keepends=True)[drop:])
+
+    def see(self, _index):
+        pass
+
+
+def test_view_matches_the_ring_with_multiline_entries():
+    ring, view = LogRing(max_lines=5), Text()
+    batches = [
+        ["one", "Traceback:\n  File x\nError: two"],
+        ["three", "four"],
+        ["five\nfive b", "six"],  # evicts the traceback: three view lines
+        [f"{n:>4} mp4\n{n:>4} webm" for n in range(8)],  # more than the ring holds at once
+        ["last"],
+    ]
+    for lines in batches:
+        ring.show(view, lines)
+        assert view.content == "".join(f"{line}\n" for line in ring.lines)
+    assert len(ring.lines) == 5 and ring.lines[-1] == "last"
+
+
+def test_spill_keeps_the_whole_log(tmp_path):
+    path = tmp_path / "log.txt"
+    ring, view = LogRing(max_lines=2, spill_path=path), Text()
+    ring.show(view, ["a", "b\nc", "d"])
+    ring.close()
+    assert path.read_text() == "a\nb\nc\nd\n"
+    assert view.content == "b\nc\nd\n"
@@ -0,0 +1,41 @@
+import sys
+import threading
+
+from yt_dlp.utils import Popen
+
+from ytmedia.ytdlp_ext import current_job, track_subprocesses
+
+
+class FakeJob:
+    def __init__(self):
+        self.intermediates = []
+        self.tracked = []
+
+    def track(self, proc):
+        self.tracked.append(proc)
+
+
+def test_popen_is_patched_only_while_tracking():
+    original = Popen.__init__
+    job, other = FakeJob(), FakeJob()
+    inside, leave = threading.Event(), threading.Event()
+
+    def second():
+        with track_subprocesses(other):
+            inside.set()
+            leave.wait(10)
+
+    t = threading.Thread(target=second)
+    with track_subprocesses(job):
+        assert Popen.__init__ is not original
+        t.start()
+        inside.wait(10)
+        assert current_job() is job
+        with Popen([sys.executable, "-c", "pass"]) as proc:
+            proc.wait()
+    assert Popen.__init__ is not original  # the other thread is still inside
+    leave.set()
+    t.join()
+    assert Popen.__init__ is original
+    assert job.tracked == [proc] and other.tracked == []
+    assert current_job() is None
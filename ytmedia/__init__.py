@@ -0,0 +1,38 @@
+"""Headless download engine behind the YouTube → MP4/Audio GUI.
+
+The names below are imported on first use: ``from ytmedia import Job`` doesn't
+load yt-dlp, only the engine and the job queue do.
+"""
+import importlib
+
+_EXPORTS = {
+    "BandwidthManager": "bandwidth",
+    "Batch": "batch",
+    "DownloadEngine": "engine",
+    "InfoCache": "cache",
+    "JobQueue": "jobqueue",
+    "Job": "jobs",
+    "JobCancelled": "jobs",
+    "JobJournal": "journal",
+    "Library": "library",
+    "MetricsExporter": "metrics",
+    "AuthOptions": "options",
+    "JobOptions": "options",
+    "RetryPolicy": "retry",
+    "JobService": "service",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
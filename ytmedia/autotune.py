@@ -0,0 +1,206 @@
+"""Adaptive tuning of ``concurrent_fragment_downloads`` / ``http_chunk_size``.
+
+The tuner measures achieved bytes/sec over successive windows of each stream
+(from the progress hook) and hill-climbs one knob per kind of download, also
+while the stream is still downloading:
+
+- fragmented formats (DASH/HLS): number of concurrent fragment downloads
+- plain HTTP(S) formats: HTTP range chunk size
+
+Observations are remembered per (host, kind) in a small JSON file so later
+jobs start from the best known setting instead of the conservative default.
+"""
+import ipaddress
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from .paths import user_data_dir
+
+FRAGMENT_STEPS = [1, 2, 4, 8, 16]
+CHUNK_STEPS = [256 * 1024 << i for i in range(7)]  # 256 KiB .. 16 MiB
+
+FRAGMENTED_PROTOCOLS = ("http_dash_segments", "m3u8", "m3u8_native", "dash_frag_urls")
+
+# Weight of a new sample in the per-setting moving average
+EWMA_ALPHA = 0.5
+
+
+def host_key(url: str) -> str:
+    """Collapse CDN edge hosts (rr3---sn-abc.googlevideo.com) to their domain."""
+    host = (urlparse(url or "").hostname or "").lower()
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    parts = host.split(".")
+    return ".".join(parts[-2:]) if len(parts) > 2 else host
+
+
+def stream_kind(fmt: dict) -> str:
+    protocol = fmt.get("protocol") or ""
+    if fmt.get("fragments") or any(p in protocol for p in FRAGMENTED_PROTOCOLS):
+        return "fragmented"
+    return "http"
+
+
+class ThroughputTuner:
+    def __init__(
+        self,
+        path=None,
+        max_fragments: int = 8,
+        min_chunk: int = 256 * 1024,
+        max_chunk: int = 10 * 1024 * 1024,
+        window: float = 4.0,
+    ):
+        self.path = Path(path) if path else user_data_dir() / "autotune.json"
+        self.steps = {
+            "fragmented": [n for n in FRAGMENT_STEPS if n <= max_fragments] or [1],
+            "http": [c for c in CHUNK_STEPS if min_chunk <= c <= max_chunk] or [min_chunk],
+        }
+        self.window = window
+        self._lock = threading.Lock()
+        self._memory = self._load()
+
+    # ---------------- Persistence ----------------
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self._memory, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    # ---------------- Tuning ----------------
+    @staticmethod
+    def key(host: str, kind: str) -> str:
+        return f"{host}|{kind}"
+
+    def _trials(self, key: str) -> dict:
+        return {int(v): bps for v, bps in self._memory.get(key, {}).items()}
+
+    def best(self, key: str):
+        """Return (value, bytes_per_sec) of the best measured setting, or (None, 0.0)."""
+        with self._lock:
+            trials = self._trials(key)
+        if not trials:
+            return None, 0.0
+        value = max(trials, key=trials.get)
+        return value, trials[value]
+
+    def suggest(self, key: str) -> int:
+        """Next value to use for key: an untried neighbour of the best setting, else the best."""
+        kind = key.rsplit("|", 1)[-1]
+        steps = self.steps.get(kind, self.steps["http"])
+        with self._lock:
+            trials = self._trials(key)
+        if not trials:
+            return steps[0]
+        best = max(trials, key=trials.get)
+        idx = steps.index(best) if best in steps else 0
+        for n in (idx + 1, idx - 1):  # try going up first, then down
+            if 0 <= n < len(steps) and steps[n] not in trials:
+                return steps[n]
+        return best
+
+    def record(self, key: str, value: int, bps: float):
+        with self._lock:
+            trials = self._memory.setdefault(key, {})
+            old = trials.get(str(value))
+            trials[str(value)] = bps if old is None else (1 - EWMA_ALPHA) * old + EWMA_ALPHA * bps
+            self._save()
+
+    def session(self, log=None):
+        return TuneSession(self, log=log)
+
+
+class _Stream:
+    """One stream's live setting and its current measurement window."""
+
+    def __init__(self, key: str, param: str, value: int):
+        self.key = key
+        self.param = param
+        self.value = value
+        self.t0 = None
+        self.b0 = 0
+        self.finished = False
+
+
+class TuneSession:
+    """Tunes the streams of one job while they download.
+
+    Each stream (format) has its own setting and measurement window; the
+    tuner's per-(host, kind) estimate is what they share, with each other and
+    with later jobs. The downloaders read ``value(fmt)`` before every range or
+    fragment (see ``ytdlp_ext.enable_tuning``), so a new setting applies to
+    the transfer already running: every ``window`` seconds the stream records
+    what it achieved and moves to the tuner's next suggestion.
+    """
+
+    PARAM = {"fragmented": "concurrent_fragment_downloads", "http": "http_chunk_size"}
+
+    def __init__(self, tuner: ThroughputTuner, log=None):
+        self.tuner = tuner
+        self._log = log
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    def _stream(self, fmt: dict) -> _Stream:
+        name = fmt.get("format_id") or fmt.get("url") or ""
+        with self._lock:
+            st = self._streams.get(name)
+            if st is None:
+                kind = stream_kind(fmt)
+                key = self.tuner.key(host_key(fmt.get("url") or fmt.get("manifest_url")), kind)
+                st = self._streams[name] = _Stream(key, self.PARAM[kind], self.tuner.suggest(key))
+            return st
+
+    def prime(self, formats):
+        """Start the formats about to be downloaded from the best-known settings."""
+        for fmt in formats:
+            self._stream(fmt)
+
+    def value(self, fmt: dict) -> int:
+        """The setting to use for fmt's next range or fragment."""
+        return self._stream(fmt).value
+
+    def hook(self, d):
+        status = d.get("status")
+        if status not in ("downloading", "finished"):
+            return
+        st = self._stream(d.get("info_dict") or {})
+        now = time.monotonic()
+        done = d.get("downloaded_bytes") or 0
+        if st.finished:
+            return
+        if st.t0 is None:
+            if status == "downloading":
+                st.t0, st.b0 = now, done
+            return
+
+        elapsed = now - st.t0
+        if status == "downloading" and elapsed < self.tuner.window:
+            return
+        if status == "finished":
+            st.finished = True
+        if elapsed < 0.5 or done <= st.b0:
+            return  # too short to say anything useful
+        bps = (done - st.b0) / elapsed
+        self.tuner.record(st.key, st.value, bps)
+        nxt = self.tuner.suggest(st.key)
+        if self._log:
+            self._log(
+                f"Autotune {st.key}: {st.param}={st.value} → {bps / 1024 / 1024:.2f} MB/s"
+                + (f", next {nxt}" if nxt != st.value and not st.finished else "")
+            )
+        st.value, st.t0, st.b0 = nxt, now, done
@@ -0,0 +1,276 @@
+"""Shared bandwidth budget for every transfer the engine runs.
+
+Each running job gets a ``Flow``; its download paths (yt-dlp's HTTP responses,
+fragments and audio streaming included, and RangedDownloader's connections)
+report every block they receive with ``consume(n)``, which blocks until the
+budget allows it. Bytes are paid for after they arrive, so a read is never cut
+short; the sleep that follows holds the next read back, and TCP flow control
+slows the sender down to match.
+
+- the global cap is a token bucket shared by all flows; when several are
+  waiting, the bytes go out in weighted fair order (start-time fair queuing),
+  so a ``high`` job gets 4x the share of a ``low`` one and nobody starves.
+  A flow busy between two reads (writing, opening the next chunk) keeps its
+  place for ``IDLE_GAP``, or its share would go to whoever was waiting;
+- a flow can have its own cap, a second bucket checked before the global one;
+- caps and priorities can be changed while jobs run (``set_rate``,
+  ``set_flow``); waiting transfers pick up the new values at once.
+
+Rates are bytes per second, 0 = unlimited.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+PRIORITY_WEIGHTS = {"high": 4, "normal": 2, "low": 1}
+BURST_SECONDS = 0.25  # how far ahead of its rate a bucket may run after idling
+RATE_WINDOW = 2.0  # seconds of history behind the reported rates
+IDLE_GAP = 0.2  # a flow that consumed this recently is still contending between its reads
+
+
+def parse_rate(text) -> int:
+    """Parse a rate like ``2M``, ``500K``, ``1.5MB/s`` or ``0`` (unlimited) into bytes/s."""
+    from yt_dlp.utils import parse_bytes
+
+    s = str(text or "0").strip().upper().replace(" ", "")
+    s = s.removesuffix("/S").removesuffix("B") or "0"
+    rate = parse_bytes(s)
+    if rate is None or rate < 0:
+        raise ValueError(f"Not a transfer rate: {text!r} (use e.g. 500K, 2M, 0 for unlimited)")
+    return int(rate)
+
+
+class _Meter:
+    """Bytes seen over the last RATE_WINDOW seconds."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first = self.last = None  # when the first and the latest bytes arrived
+        self.bytes = 0
+        self._samples = deque()  # (t, n)
+        self._recent = 0
+
+    def add(self, n: int, now: float):
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.bytes += n
+        self._samples.append((now, n))
+        self._recent += n
+        self._prune(now)
+
+    def _prune(self, now: float):
+        while self._samples and now - self._samples[0][0] > RATE_WINDOW:
+            self._recent -= self._samples.popleft()[1]
+
+    def rate(self, now: float) -> float:
+        self._prune(now)
+        span = min(RATE_WINDOW, now - self.started)
+        return self._recent / span if span > 0 else 0.0
+
+
+class Flow:
+    """One job's share of the budget: its own cap, its priority class and what it achieved.
+
+    State is guarded by the manager's lock; several threads (fragments, ranged
+    connections) may draw on one flow at once.
+    """
+
+    def __init__(self, manager, key, rate: int = 0, priority: str = "normal"):
+        if priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"Priority must be one of {', '.join(PRIORITY_WEIGHTS)}")
+        self.manager = manager
+        self.key = key
+        self.rate = max(0, int(rate or 0))
+        self.priority = priority
+        self.waited = 0.0  # seconds spent held back by either cap
+        self.finished_at = None
+        self.meter = _Meter()
+        self.aborted = False
+        self._tokens = self.rate * BURST_SECONDS
+        self._stamp = self.meter.started
+        self._vtime = 0.0  # virtual finish tag of its last request (fair queuing)
+        self._last = 0.0  # when it last left consume()
+        self._queued = 0  # threads waiting for the global bucket
+        self._held = 0  # threads waiting on its own cap (not contending for the global one)
+
+    @property
+    def weight(self) -> int:
+        return PRIORITY_WEIGHTS[self.priority]
+
+    @property
+    def bytes(self) -> int:
+        return self.meter.bytes
+
+    def consume(self, n: int):
+        """Account n bytes just received; blocks while this flow or the whole budget is over its cap."""
+        self.manager.consume(self, n)
+
+    def abort(self):
+        """Stop holding this flow back (the job was cancelled); called through Job.track()."""
+        with self.manager._cond:
+            self.aborted = True
+            self.manager._cond.notify_all()
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(self.rate * BURST_SECONDS, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def average(self) -> float:
+        """Mean rate from its first byte to its latest (extraction and post-processing time excluded)."""
+        m = self.meter
+        return m.bytes / (m.last - m.first) if m.first is not None and m.last > m.first else 0.0
+
+    def stats(self, now: float | None = None) -> dict:
+        now = now or time.monotonic()
+        return {
+            "priority": self.priority,
+            "limit": self.rate,
+            "rate": 0.0 if self.finished_at else self.meter.rate(now),
+            "average": self.average(),
+            "bytes": self.bytes,
+            "waited": self.waited,
+        }
+
+
+class BandwidthManager:
+    def __init__(self, rate: int = 0):
+        self.rate = max(0, int(rate or 0))
+        self._cond = threading.Condition()
+        self._tokens = self.rate * BURST_SECONDS
+        self._stamp = time.monotonic()
+        self._vclock = 0.0  # start tag of the last grant; a flow returning from idle starts here
+        self._waiting = []  # heap of (start tag, seq, flow) waiting for the global bucket
+        self._seq = itertools.count()
+        self._flows = {}  # key -> Flow
+        self.meter = _Meter()
+
+    # ---------------- Flows ----------------
+    def flow(self, key, rate: int = 0, priority: str = "normal") -> Flow:
+        """Register a flow (one per running job) under key."""
+        f = Flow(self, key, rate, priority)
+        with self._cond:
+            f._vtime = self._vclock
+            self._flows[key] = f
+        return f
+
+    def release(self, flow: Flow):
+        with self._cond:
+            flow.finished_at = time.monotonic()
+            if self._flows.get(flow.key) is flow:
+                del self._flows[flow.key]
+
+    def get(self, key) -> Flow | None:
+        with self._cond:
+            return self._flows.get(key)
+
+    # ---------------- Live adjustment ----------------
+    def set_rate(self, rate: int):
+        """Change the global cap (0 = unlimited); applies to transfers already running."""
+        with self._cond:
+            self._refill(time.monotonic())
+            self.rate = max(0, int(rate or 0))
+            self._tokens = min(self._tokens, self.rate * BURST_SECONDS)
+            self._cond.notify_all()
+
+    def set_flow(self, key, rate: int | None = None, priority: str | None = None) -> bool:
+        """Change a running flow's cap and/or priority; False if no flow is registered under key."""
+        if priority is not None and priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"Priority must be one of {', '.join(PRIORITY_WEIGHTS)}")
+        with self._cond:
+            f = self._flows.get(key)
+            if f is None:
+                return False
+            if rate is not None:
+                f._refill(time.monotonic())
+                f.rate = max(0, int(rate))
+                f._tokens = min(f._tokens, f.rate * BURST_SECONDS)
+            if priority is not None:
+                f.priority = priority
+            self._cond.notify_all()
+        return True
+
+    # ---------------- Accounting ----------------
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(self.rate * BURST_SECONDS, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def consume(self, flow: Flow, n: int):
+        if n <= 0:
+            return
+        t0 = time.monotonic()
+        with self._cond:
+            flow.meter.add(n, t0)
+            self.meter.add(n, t0)
+            if flow.aborted:
+                return
+            # The flow's own cap: pay now, wait out the debt.
+            if flow.rate > 0:
+                flow._refill(t0)
+                flow._tokens -= n
+                flow._held += 1
+                while flow.rate > 0 and not flow.aborted:
+                    flow._refill(time.monotonic())
+                    if flow._tokens >= 0:
+                        break
+                    self._cond.wait(-flow._tokens / flow.rate)
+                flow._held -= 1
+            # The global cap: wait for the turn, then for the bucket.
+            if self.rate > 0 and not flow.aborted:
+                tag = max(flow._vtime, self._vclock)
+                flow._vtime = tag + n / flow.weight
+                entry = (tag, next(self._seq), flow)
+                heapq.heappush(self._waiting, entry)
+                flow._queued += 1
+                self._cond.notify_all()
+                granted = False
+                while self.rate > 0 and not flow.aborted:
+                    if self._waiting[0] is entry:
+                        now = time.monotonic()
+                        if not self._turn(entry, now):
+                            self._cond.wait(IDLE_GAP)
+                            continue
+                        self._refill(now)
+                        if self._tokens >= 0:
+                            self._tokens -= n
+                            granted = True
+                            break
+                        self._cond.wait(-self._tokens / self.rate)
+                    else:
+                        self._cond.wait()
+                if self._waiting[0] is entry:
+                    heapq.heappop(self._waiting)
+                else:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                flow._queued -= 1
+                if granted:
+                    self._vclock = tag
+                self._cond.notify_all()
+            flow._last = time.monotonic()
+            flow.waited += flow._last - t0
+
+    def _turn(self, entry, now: float) -> bool:
+        """Whether the head of the queue may go: no flow between two reads would come before it."""
+        tag, _, flow = entry
+        return not any(
+            f is not flow and not f._queued and not f._held and not f.aborted
+            and now - f._last < IDLE_GAP and f._vtime < tag
+            for f in self._flows.values()
+        )
+
+    # ---------------- Introspection ----------------
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "limit": self.rate,
+                "rate": self.meter.rate(now),
+                "bytes": self.meter.bytes,
+                "waiting": len(self._waiting),
+                "jobs": {key: f.stats(now) for key, f in self._flows.items()},
+            }
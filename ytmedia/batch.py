@@ -0,0 +1,173 @@
+"""Playlist / channel batches: one job per video, scheduled on a JobQueue as entries are found."""
+import threading
+import time
+from dataclasses import replace
+
+from .jobs import FINAL_STATES, Job, JobCancelled
+
+# Titles YouTube uses for playlist entries that can't be downloaded by anyone
+UNAVAILABLE_TITLES = ("[Private video]", "[Deleted video]", "[Unavailable video]")
+
+
+class Batch:
+    """Fans a playlist/channel job out into per-video jobs on ``queue``.
+
+    Enumeration runs on its own thread and submits each entry as soon as it is
+    found, so the first downloads start while later pages are still loading. At
+    most ``max_pending`` entries are queued or running at a time (default: twice
+    the queue's worker count); enumeration waits for a free slot before going on.
+
+    Every entry job copies the batch job's kind and options (quality ladder,
+    client fallback, auth), and has ``parent`` set to the batch job's id.
+    """
+
+    def __init__(self, queue, job: Job, max_pending: int | None = None, on_done=None):
+        if job.kind == "formats":
+            raise ValueError("List formats needs a single video URL, not a playlist or channel.")
+        self.queue = queue
+        self.job = job
+        self.max_pending = max(1, int(max_pending or queue.max_workers * 2))
+        self._on_done = on_done
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # an entry finished, or cancel() was called
+        self._finished = threading.Event()
+        self._thread = None
+        # Only unfinished entry jobs are kept; finished ones collapse into counters
+        self.pending = {}
+        self.counts = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0}
+        self.failures = []  # (url, error)
+        self.skipped = []  # (url, reason)
+        self._seen = set()
+        queue.subscribe(self._on_queue_event)
+
+    @property
+    def id(self) -> int:
+        return self.job.id
+
+    # ---------------- Scheduling ----------------
+    def start(self):
+        self.job.status = "running"
+        self.job.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._enumerate, name=f"ytmedia-batch-{self.id}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _enumerate(self):
+        engine = self.queue.engine
+        try:
+            entries = engine.iter_entries(self.job)
+            for entry in entries:
+                if self._should_stop(entry):
+                    entries.close()  # stop paging through the rest of the list
+                    break
+                reason = self._skip_reason(entry)
+                if reason:
+                    self.skipped.append((entry["url"] or entry.get("title") or "?", reason))
+                    engine.log(self.job, f"Skipped {entry.get('title') or entry['url']}: {reason}")
+                    continue
+                self._seen.add(entry["id"])
+                with self._changed:
+                    self._changed.wait_for(lambda: len(self.pending) < self.max_pending or self.job.cancel.is_set())
+                self.job.check_cancelled()
+                child = Job(entry["url"], kind=self.job.kind, options=replace(self.job.options), parent=self.id)
+                with self._lock:
+                    self.pending[child.id] = child
+                    self.counts["submitted"] += 1
+                self._on_submitted(child, entry)
+                self.queue.submit(child)
+                if self.job.cancel.is_set():  # cancel() raced with this submit
+                    self.queue.cancel(child.id)
+            engine.log(self.job, f"Found {self.counts['submitted']} video(s), skipped {len(self.skipped)}.")
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self.job.error = str(e)
+            engine.log(self.job, f"ERROR: could not list entries: {e}")
+        # Whatever was submitted still runs to completion (or cancellation)
+        with self._changed:
+            self._changed.wait_for(lambda: not self.pending)
+        self.queue.unsubscribe(self._on_queue_event)
+        self._finish()
+
+    def _skip_reason(self, entry) -> str | None:
+        if not entry.get("url"):
+            return "no URL"
+        if entry.get("id") in self._seen:
+            return "duplicate entry"
+        if entry.get("title") in UNAVAILABLE_TITLES:
+            return entry["title"].strip("[]").lower()
+        if entry.get("availability") == "private":
+            return "private video"
+        return None
+
+    def _should_stop(self, entry) -> bool:
+        """Stop enumerating before this entry (subclasses: incremental sync)."""
+        return False
+
+    def _on_submitted(self, job: Job, entry):
+        pass
+
+    def _on_entry_finished(self, job: Job):
+        pass
+
+    def _on_queue_event(self, kind, job, *payload):
+        if kind != "state" or job.parent != self.id or job.status not in FINAL_STATES:
+            return
+        with self._lock:
+            if self.pending.pop(job.id, None) is None:
+                return
+            self.counts[job.status] += 1
+            if job.status == "failed":
+                self.failures.append((job.url, job.error))
+            self._on_entry_finished(job)
+            self._changed.notify_all()
+
+    def _finish(self):
+        s = self.summary()
+        if self.job.cancel.is_set():
+            self.job.status = "cancelled"
+        elif self.job.error or s["failed"]:
+            self.job.status = "failed"
+            self.job.error = self.job.error or f"{s['failed']} of {s['entries']} entries failed"
+        else:
+            self.job.status = "done"
+        self.job.result = s
+        self.job.finished_at = time.monotonic()
+        self.queue.engine.log(
+            self.job,
+            f"Batch finished: {s['done']} done, {s['skipped']} skipped, {s['failed']} failed, "
+            f"{s['cancelled']} cancelled.",
+        )
+        if self._on_done is not None:
+            self._on_done(self)
+        self._finished.set()
+
+    # ---------------- Control / results ----------------
+    def cancel(self, interrupt: bool = False):
+        """Stop enumerating and cancel every entry that hasn't finished (see JobQueue.cancel for interrupt)."""
+        self.job.request_cancel(interrupt)
+        with self._changed:
+            children = list(self.pending.values())
+            self._changed.notify_all()
+        for child in children:
+            self.queue.cancel(child.id, interrupt=interrupt)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._finished.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._finished.is_set()
+
+    def summary(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            failures = list(self.failures)
+        return {
+            "url": self.job.url,
+            "entries": counts.pop("submitted") + len(self.skipped),
+            **counts,
+            "skipped": len(self.skipped),
+            "failures": failures,
+            "skips": list(self.skipped),
+        }
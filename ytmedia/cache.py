@@ -0,0 +1,179 @@
+"""On-disk cache of extracted info dicts.
+
+Entries are keyed by video ID + player client + auth identity and expire
+shortly before the signed stream URLs inside them do (googlevideo URLs carry
+an ``expire=<unix time>`` parameter). The cache is bounded by entry count and
+total size and evicts least-recently-used entries first.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from .paths import user_cache_dir
+
+# Stop serving an entry this long before its stream URLs expire.
+EXPIRY_MARGIN = 10 * 60
+# TTL for info dicts whose URLs carry no expiry.
+DEFAULT_TTL = 60 * 60
+
+
+def url_expiry(url: str) -> float | None:
+    """Return the ``expire`` timestamp of a signed stream URL, if any."""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    exp = parse_qs(parsed.query).get("expire")
+    if not exp:
+        # Some manifest URLs carry it as a path segment: .../expire/1700000000/...
+        parts = parsed.path.split("/")
+        if "expire" in parts and parts.index("expire") + 1 < len(parts):
+            exp = [parts[parts.index("expire") + 1]]
+    try:
+        return float(exp[0]) if exp else None
+    except ValueError:
+        return None
+
+
+def info_expiry(info: dict, now: float | None = None) -> float:
+    """Wall-clock time after which the cached info must not be used."""
+    now = time.time() if now is None else now
+    stamps = []
+    for f in info.get("formats") or []:
+        for key in ("url", "manifest_url"):
+            ts = url_expiry(f.get(key))
+            if ts:
+                stamps.append(ts)
+    if not stamps:
+        return now + DEFAULT_TTL
+    return min(stamps) - EXPIRY_MARGIN
+
+
+class InfoCache:
+    def __init__(self, directory=None, max_entries: int = 500, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory) if directory else user_cache_dir() / "info"
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(video_id: str, client, auth_identity: str) -> str:
+        raw = f"{video_id}|{client or 'normal'}|{auth_identity}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json.gz"
+
+    def get(self, key: str):
+        """Return the cached info dict for key, or None when missing/expired."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if entry.get("expires_at", 0) <= time.time():
+            self._remove(path)
+            with self._lock:
+                self.expired += 1
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # mtime doubles as the LRU timestamp
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry["info"]
+
+    def expires_at(self, key: str) -> float | None:
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as fh:
+                return json.load(fh).get("expires_at")
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, info: dict):
+        expires_at = info_expiry(info)
+        if expires_at <= time.time():
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        entry = {"stored_at": time.time(), "expires_at": expires_at, "info": info}
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=5) as fh:
+            json.dump(entry, fh)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stores += 1
+        self._evict()
+
+    def invalidate(self, key: str):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for path in self._entries():
+            self._remove(path)
+
+    def _entries(self):
+        try:
+            return list(self.directory.glob("*.json.gz"))
+        except OSError:
+            return []
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        for path in self._entries():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()  # oldest access first
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        sizes = []
+        for path in self._entries():
+            try:
+                sizes.append(path.stat().st_size)
+            except OSError:
+                pass
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "entries": len(sizes),
+                "bytes": sum(sizes),
+            }
@@ -0,0 +1,397 @@
+"""Command line front-end: ``python -m ytmedia <command> URL [URL ...] [options]``."""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+from .bandwidth import BandwidthManager, parse_rate
+from .batch import Batch
+from .cache import InfoCache
+from .clients import ClientStats
+from .cookies import CookieCache
+from .engine import DownloadEngine
+from .jobqueue import JobQueue
+from .jobs import Job
+from .journal import JobJournal
+from .library import Library
+from .metrics import MetricsExporter
+from .options import BROWSERS, EXPORT_TARGETS, PRIORITIES, QUALITIES, AuthOptions, JobOptions
+from .service import JobService
+from .sync import ChannelSync
+from .urls import is_collection_url, is_youtube_url
+
+
+def _print_event(kind, job, *payload):
+    if kind == "log":
+        (text,) = payload
+        print(f"[#{job.id}] {text}", flush=True)
+    elif kind == "state" and job.status in ("failed", "cancelled"):
+        print(f"[#{job.id}] {job.status.upper()}: {job.error or job.url}", file=sys.stderr, flush=True)
+
+
+def _add_rate_arg(p):
+    p.add_argument("--limit-rate", type=parse_rate, default=0, metavar="RATE",
+                   help="cap the total download rate of all jobs, e.g. 500K or 4M (bytes/s)")
+
+
+def _add_metrics_args(p):
+    p.add_argument("--metrics-log", metavar="FILE",
+                   help="append per-job timing records here (default: metrics.jsonl in the data folder)")
+    p.add_argument("--prom", metavar="FILE",
+                   help="keep a Prometheus textfile with job metrics (default: $YTMEDIA_METRICS_PROM)")
+
+
+def _add_job_args(p):
+    p.add_argument("urls", nargs="+", metavar="URL", help="YouTube video, playlist or channel URL(s)")
+    p.add_argument("-j", "--jobs", type=int, default=2, help="how many jobs run at once (default: 2)")
+    _add_rate_arg(p)
+    _add_metrics_args(p)
+    p.add_argument("--job-rate", type=parse_rate, default=0, metavar="RATE", help="cap each job's download rate")
+    p.add_argument("--priority", choices=PRIORITIES, default="normal",
+                   help="share of a capped link when jobs compete (high 4 : normal 2 : low 1)")
+    p.add_argument("-o", "--output", default=".", help="save folder (default: current directory)")
+    p.add_argument("-q", "--quality", choices=sorted(set(QUALITIES.values())), default="best")
+    p.add_argument("--audio-kbps", type=int, default=0, help="minimum preferred audio bitrate, 0 = Auto")
+    p.add_argument("--max-vbr", type=int, default=0, help="max video bitrate in kbps, 0 = Auto")
+    p.add_argument("--reencode", action="store_true", help="re-encode video to --max-vbr with FFmpeg")
+    p.add_argument("--encode-workers", type=int, default=1, metavar="N",
+                   help="with --reencode: encode keyframe-aligned segments on N FFmpeg processes")
+    p.add_argument("--no-android", action="store_true", help="don't retry with the Android client")
+    p.add_argument("--race-clients", action="store_true",
+                   help="extract on the normal and Android clients at once and use whichever works first")
+    p.add_argument("--autotune", action="store_true", help="adapt fragment concurrency / chunk size to the link")
+    p.add_argument("--connections", type=int, default=0, metavar="N",
+                   help="download single-file formats over N parallel ranged connections")
+    p.add_argument("--stream-audio", action="store_true",
+                   help="mp3/wav: encode while downloading instead of after")
+    p.add_argument("--no-cache", action="store_true", help="don't read or write the extraction cache")
+    p.add_argument("--no-library", action="store_true", help="ignore the library index (always download)")
+    p.add_argument("--hardlink", action="store_true",
+                   help="hard-link outputs already saved in another folder instead of downloading again")
+    _add_auth_args(p)
+
+
+def _add_auth_args(p, what=""):
+    auth = p.add_mutually_exclusive_group()
+    auth.add_argument("--cookies", metavar="FILE", help=f"Netscape cookies.txt{what}")
+    auth.add_argument("--browser", choices=BROWSERS, help=f"read cookies from this browser{what}")
+    p.add_argument("--profile", help="browser profile folder (with --browser)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ytmedia", description="Headless YouTube → MP4/MP3/WAV downloader")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("download", "download as MP4"),
+        ("mp3", "export audio as MP3"),
+        ("wav", "export audio as WAV"),
+        ("formats", "list available formats"),
+    ):
+        _add_job_args(sub.add_parser(name, help=help_text))
+
+    export = sub.add_parser("export", help="download once, write several outputs (default: mp4,mp3,wav)")
+    _add_job_args(export)
+    export.add_argument("--targets", default=",".join(EXPORT_TARGETS), help="comma separated: mp4,mp3,wav")
+
+    sync = sub.add_parser("sync", help="download only the uploads that are new since the last sync")
+    _add_job_args(sync)
+    sync.add_argument("--as", dest="kind", choices=["mp4", "mp3", "wav", "export"], default="mp4",
+                      help="what to save for each new upload (default: mp4)")
+    sync.add_argument("--targets", default=",".join(EXPORT_TARGETS), help="with --as export: mp4,mp3,wav")
+    sync.add_argument("--limit", type=int, default=0, metavar="N", help="queue at most N new uploads per channel")
+    sync.add_argument("--mark-only", action="store_true",
+                      help="record the newest upload as already synced without downloading anything")
+
+    resume = sub.add_parser("resume", help="continue the jobs a crashed or interrupted run left unfinished")
+    resume.add_argument("-j", "--jobs", type=int, default=2, help="how many jobs run at once (default: 2)")
+    _add_rate_arg(resume)
+    _add_metrics_args(resume)
+    resume.add_argument("--list", action="store_true", help="only show the unfinished jobs")
+    resume.add_argument("--discard", action="store_true", help="forget the unfinished jobs instead of resuming")
+    resume.add_argument("--no-cache", action="store_true", help="don't read or write the extraction cache")
+    resume.add_argument("--no-library", action="store_true", help="ignore the library index (always download)")
+
+    serve = sub.add_parser("serve", help="run a local HTTP/JSON service that takes and runs jobs (no GUI)")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765, 0 = any free)")
+    serve.add_argument("--token", default=os.environ.get("YTMEDIA_SERVICE_TOKEN"),
+                       help="require 'Authorization: Bearer TOKEN' (default: $YTMEDIA_SERVICE_TOKEN)")
+    serve.add_argument("-o", "--output", default=".",
+                       help="folder jobs save into; a request's save_dir is relative to it (default: .)")
+    serve.add_argument("-j", "--jobs", type=int, default=2, help="how many jobs run at once (default: 2)")
+    _add_auth_args(serve, " (the only cookies requests can use)")
+    _add_rate_arg(serve)
+    _add_metrics_args(serve)
+    serve.add_argument("--resume", action="store_true", help="first resume the jobs an earlier run left unfinished")
+    serve.add_argument("--no-cache", action="store_true", help="don't read or write the extraction cache")
+    serve.add_argument("--no-library", action="store_true", help="ignore the library index (always download)")
+
+    cache = sub.add_parser("cache", help="show or clear the extraction cache")
+    cache.add_argument("action", choices=["stats", "clear"])
+
+    library = sub.add_parser("library", help="show the library index or rebuild it from a folder")
+    library.add_argument("action", choices=["stats", "rebuild"])
+    library.add_argument("folder", nargs="?", help="save folder to scan (rebuild)")
+    return parser
+
+
+def _cache_command(args):
+    cache = InfoCache()
+    if args.action == "clear":
+        cache.clear()
+        print(f"Cleared {cache.directory}")
+        return 0
+    st = cache.stats()
+    print(f"{cache.directory}: {st['entries']} entries, {st['bytes'] / 1024 / 1024:.1f} MB")
+    return 0
+
+
+def _library_command(args):
+    lib = Library()
+    if args.action == "rebuild":
+        if not args.folder:
+            print("Error: library rebuild needs a folder", file=sys.stderr)
+            return 2
+        st = lib.rebuild(args.folder, log=print)
+        print(f"Scanned {st['scanned']} files: {st['known']} known, {st['added']} added, "
+              f"{st['unidentified']} unidentified, {st['removed']} stale entries removed")
+    st = lib.stats()
+    print(f"{lib.path}: {st['entries']} files, {st['bytes'] / 1024 / 1024:.1f} MB")
+    return 0
+
+
+def _describe_record(rec) -> str:
+    where = rec.get("phase") or "queued"
+    if rec.get("format_ids"):
+        where += f" [{rec['format_ids']}]"
+    return f"{rec['kind']:>6}  {where:<24} {rec.get('title') or rec['url']}"
+
+
+def auth_from_args(args) -> AuthOptions:
+    if args.cookies:
+        return AuthOptions(mode="txt", cookies_file=args.cookies)
+    if args.browser:
+        return AuthOptions(mode="browser", browser=args.browser, profile=args.profile)
+    return AuthOptions()
+
+
+def options_from_args(args) -> JobOptions:
+    return JobOptions(
+        save_dir=args.output,
+        quality=args.quality,
+        audio_kbps=args.audio_kbps,
+        max_vbr_kbps=args.max_vbr,
+        reencode=args.reencode,
+        encode_workers=args.encode_workers,
+        try_android=not args.no_android,
+        race_clients=args.race_clients,
+        autotune=args.autotune,
+        ranged_connections=args.connections,
+        stream_audio=args.stream_audio,
+        hardlink=args.hardlink,
+        rate_limit=args.job_rate,
+        priority=args.priority,
+        targets=tuple(t.strip().lower() for t in getattr(args, "targets", "").split(",") if t.strip())
+        or EXPORT_TARGETS,
+        auth=auth_from_args(args),
+    )
+
+
+def _print_result(job):
+    if job.kind == "formats":
+        client, rows = job.result
+        print(f"Available formats for {job.url} ({client} client):")
+        for r in rows:
+            print(r)
+        print("-- end of list --")
+    elif job.kind == "export":
+        for path in job.result.values():
+            print(f"[#{job.id}] Saved {path}")
+    elif job.result == "library":
+        print(f"[#{job.id}] Already downloaded: {', '.join(job.outputs.values())}")
+    elif job.kind == "mp4":
+        print(f"[#{job.id}] Download complete.")
+    else:
+        print(f"[#{job.id}] Saved as {job.kind.upper()}.")
+
+
+def _print_batch_summary(batch):
+    s = batch.summary()
+    print(f"[#{batch.id}] {s['url']}: {s['entries']} entries → {s['done']} done, {s['skipped']} skipped, "
+          f"{s['failed']} failed, {s['cancelled']} cancelled")
+    for url, reason in s["skips"]:
+        print(f"[#{batch.id}]   skipped {url}: {reason}")
+    for url, error in s["failures"]:
+        print(f"[#{batch.id}]   FAILED {url}: {(error or '').splitlines()[0] if error else 'unknown error'}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "cache":
+        return _cache_command(args)
+    if args.command == "library":
+        return _library_command(args)
+
+    journal = JobJournal()
+    if args.command == "serve":
+        return _serve(args, journal)
+    if args.command == "resume":
+        records = journal.unfinished()
+        if args.list or args.discard or not records:
+            for rec in records:
+                print(_describe_record(rec))
+            if args.discard:
+                journal.discard(records)
+                print(f"Discarded {len(records)} unfinished job(s).")
+            elif not records:
+                print("Nothing to resume.")
+            return 0
+        return _run(args, journal, resume=records)
+
+    bad = [u for u in args.urls if not is_youtube_url(u)]
+    if bad:
+        print(f"Error: not a valid YouTube URL: {bad[0]}", file=sys.stderr)
+        return 2
+
+    if args.command == "sync":
+        kind = args.kind
+        bad = [u for u in args.urls if not is_collection_url(u)]
+        if bad:
+            print(f"Error: sync needs a channel or playlist URL: {bad[0]}", file=sys.stderr)
+            return 2
+    else:
+        kind = "mp4" if args.command == "download" else args.command
+    try:
+        options = options_from_args(args)
+        Job(args.urls[0], kind=kind, options=options)  # validate before queueing anything
+        if kind == "formats" and any(is_collection_url(u) for u in args.urls):
+            raise ValueError("formats needs single video URLs, not playlists or channels")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return _run(args, journal, kind=kind, options=options)
+
+
+def _engine(args):
+    return DownloadEngine(
+        cache=None if args.no_cache else InfoCache(),
+        library=None if args.no_library else Library(),
+        client_stats=ClientStats(),
+        cookies=CookieCache(),
+        pool_sessions=True,
+        bandwidth=BandwidthManager(args.limit_rate),
+    )
+
+
+def _serve(args, journal):
+    engine = _engine(args)
+    jq = JobQueue(engine, max_workers=args.jobs, on_event=_print_event)
+    journal.attach(jq)
+    MetricsExporter(args.metrics_log, args.prom).attach(jq)
+    service = JobService(jq, output_dir=args.output, host=args.host, port=args.port, token=args.token,
+                         defaults=JobOptions(auth=auth_from_args(args)))
+    if args.resume:
+        records = journal.unfinished()
+        print(f"Resuming {len(records)} unfinished job(s)…", flush=True)
+        journal.resume(jq, records)
+
+    async def serve():
+        await service.start()
+        print(f"Serving on {service.url} ({args.jobs} worker(s), saving to {service.output_dir})"
+              + (", token required" if service.token else ""), flush=True)
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except (NotImplementedError, AttributeError):
+            pass  # Windows: Ctrl+C only
+        await stop.wait()
+        await service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: can't listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        engine.close()
+        return 2
+    print("Stopping… (run `python -m ytmedia resume` to pick up unfinished jobs)", file=sys.stderr)
+    journal.close()  # interrupted, not cancelled: keep them resumable
+    for batch in service.batches.values():
+        batch.cancel(interrupt=True)
+    jq.shutdown(cancel=True, interrupt=True)
+    engine.close()
+    return 0
+
+
+def _run(args, journal, kind=None, options=None, resume=None):
+    engine = _engine(args)
+    jq = JobQueue(engine, max_workers=args.jobs, on_event=_print_event)
+    journal.attach(jq)
+    MetricsExporter(args.metrics_log, args.prom).attach(jq)
+    jobs, batches = [], []
+    if resume:
+        print(f"Resuming {len(resume)} unfinished job(s)…", flush=True)
+        jobs = journal.resume(jq, resume)
+    for url in [] if resume else args.urls:
+        job = Job(url, kind=kind, options=options)
+        if args.command == "sync":
+            batches.append(ChannelSync(jq, job, limit=args.limit, mark_only=args.mark_only).start())
+        elif is_collection_url(url):
+            batches.append(Batch(jq, job).start())
+        else:
+            jobs.append(jq.submit(job))
+    try:
+        for batch in batches:
+            batch.wait()
+        jq.wait(jobs)
+    except KeyboardInterrupt:
+        print("Cancelling… (run `python -m ytmedia resume` to pick up where this stopped)", file=sys.stderr)
+        journal.close()  # interrupted, not cancelled: keep them resumable
+        for batch in batches:
+            batch.cancel(interrupt=True)
+        jq.shutdown(cancel=True, interrupt=True)
+        engine.close()
+        return 130
+    jq.shutdown()
+    engine.close()
+
+    for job in jobs:
+        if job.status == "done":
+            _print_result(job)
+    for batch in batches:
+        _print_batch_summary(batch)
+    stats = jq.stats()
+    total = len(jq.jobs())
+    if total > 1:
+        print(
+            f"{stats['done']} done, {stats['failed']} failed, {stats['cancelled']} cancelled "
+            f"| {stats['total_bytes'] / 1024 / 1024:.1f} MB @ {stats['average_bps'] / 1024 / 1024:.2f} MB/s"
+        )
+    if engine.cache is not None:
+        cs = engine.cache.stats()
+        print(f"Info cache: {cs['hits']} hit(s), {cs['misses']} miss(es)")
+    ss = engine.sessions.stats()
+    if ss["leases"] > 1:
+        print(f"Sessions: {ss['reused']} of {ss['leases']} reused, {ss['requests']} request(s) over "
+              f"{ss['connections']} connection(s), ~{ss['setup_saved_seconds']:.2f}s setup saved")
+    rates = [j for j in jq.jobs() if j.bandwidth is not None and j.bandwidth.bytes]
+    if rates and (args.limit_rate or any(j.options.rate_limit for j in rates)):
+        print("Bandwidth: " + ", ".join(
+            f"#{j.id} {j.bandwidth.average() / 1024 / 1024:.2f} MB/s ({j.options.priority})" for j in rates
+        ))
+    rs = engine.retry.stats()
+    if rs["tripped"] or rs["slept"] >= 1:
+        print(f"Retries: {rs['slept']:.1f}s of backoff; YouTube throttled {rs['tripped']}x, "
+              f"jobs held {rs['held']:.1f}s in all")
+    ck = engine.cookies.stats()
+    if ck["loads"]:
+        print(f"Cookies: loaded {ck['loads']}x in {ck['load_seconds']:.2f}s, reused {ck['hits']}x")
+    if getattr(args, "race_clients", False):
+        print("Clients: " + ", ".join(
+            f"{name} {st['success_rate']:.0%} ok" + (f", {st['latency']:.1f}s" if st["latency"] is not None else "")
+            for name, st in sorted(engine.client_stats.snapshot().items())
+        ))
+    ok = all(j.status == "done" for j in jobs) and all(b.job.status == "done" for b in batches)
+    return 0 if ok else 1
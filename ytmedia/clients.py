@@ -0,0 +1,83 @@
+"""Per player-client outcome stats, used to decide which client to try first.
+
+For every client (normal, android) the store keeps how many attempts produced
+the requested output, how many failed, and a moving average of the extraction
+time. ``order()`` puts the client most likely to work first, so once the
+Android client has been the one that works for a while, it is tried (or
+raced) first. Kept in ``clients.json`` in the user data folder.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+from .paths import user_data_dir
+
+LATENCY_WEIGHT = 0.3  # weight of the newest sample in the latency moving average
+
+
+def client_name(client) -> str:
+    return client or "normal"
+
+
+class ClientStats:
+    def __init__(self, path=None):
+        self.path = Path(path) if path else user_data_dir() / "clients.json"
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    # ---------------- Persistence ----------------
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self._state, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    # ---------------- Recording ----------------
+    def _entry(self, client) -> dict:
+        return self._state.setdefault(client_name(client), {"ok": 0, "failed": 0, "latency": None})
+
+    def record(self, client, ok: bool):
+        """An attempt on this client produced the output (ok) or gave up on it."""
+        with self._lock:
+            self._entry(client)["ok" if ok else "failed"] += 1
+            self._save()
+
+    def latency(self, client, seconds: float):
+        """Time one extraction on this client took."""
+        with self._lock:
+            e = self._entry(client)
+            prev = e.get("latency")
+            e["latency"] = seconds if prev is None else prev + LATENCY_WEIGHT * (seconds - prev)
+            self._save()
+
+    # ---------------- Ordering ----------------
+    def success_rate(self, client) -> float:
+        """Smoothed share of attempts that worked (0.5 with no data)."""
+        with self._lock:
+            e = self._state.get(client_name(client)) or {}
+        return (e.get("ok", 0) + 1) / (e.get("ok", 0) + e.get("failed", 0) + 2)
+
+    def order(self, clients) -> list:
+        """clients, most likely to work first; the faster one first at equal rates, else the given order."""
+        def key(client):
+            with self._lock:
+                lat = (self._state.get(client_name(client)) or {}).get("latency")
+            return -round(self.success_rate(client), 1), lat if lat is not None else float("inf")
+
+        return sorted(clients, key=key)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {k: dict(v) for k, v in self._state.items()}
+        for e in out.values():
+            e["success_rate"] = (e["ok"] + 1) / (e["ok"] + e["failed"] + 2)
+        return out
@@ -0,0 +1,130 @@
+"""Parsed-cookie cache shared by every attempt and job.
+
+Without it each YoutubeDL instance reads cookies.txt again, and with
+``cookiesfrombrowser`` copies the browser's cookie database and (Chromium)
+decrypts every value on each client × format attempt. ``CookieCache`` loads a
+jar once per auth identity and hands the same jar to all instances. It is
+reloaded when the cookies.txt file or the browser database it came from changes
+on disk (or after ``BROWSER_TTL`` when the database can't be located).
+
+Cookies the server sets during a download land in the shared jar, but unlike
+yt-dlp's own ``cookiefile`` handling they are not written back to cookies.txt.
+
+yt-dlp's cookie module is imported on first use, so a front-end can create the
+cache before yt-dlp has loaded.
+"""
+import os
+import threading
+import time
+
+from .options import AuthOptions
+
+COOKIEJAR_PARAM = "ytmedia_cookiejar"  # YoutubeDL param carrying the shared jar (see DownloadEngine._new_ydl)
+BROWSER_TTL = 10 * 60  # reload browser cookies this often when their database file is unknown
+
+_DB_NAMES = ("Cookies", "cookies.sqlite")
+
+
+def browser_cookie_db(browser: str, profile: str | None) -> str | None:
+    """Path of the cookie database yt-dlp will read for this browser/profile, if it can be found."""
+    from yt_dlp import cookies as ytc
+
+    profile = (profile or "").strip() or None
+    try:
+        if profile and os.path.isdir(profile):
+            found = [os.path.join(root, f) for root, _, files in os.walk(profile) for f in files if f in _DB_NAMES]
+            return max(found, key=lambda p: os.lstat(p).st_mtime, default=None)
+        if browser == "firefox":
+            roots = list(ytc._firefox_browser_dirs())
+            if profile:
+                roots = [os.path.join(r, profile) for r in roots]
+            return ytc._newest(ytc._firefox_cookie_dbs(roots))
+        root = ytc._get_chromium_based_browser_settings(browser)["browser_dir"]
+        if profile:
+            root = os.path.join(root, profile)
+        return ytc._newest(ytc._find_files(root, "Cookies", ytc.YDLLogger()))
+    except Exception:  # yt-dlp internals moved, or no such browser here
+        return None
+
+
+def _stamp(path: str | None):
+    """(mtime, size) of path and its SQLite journal files; None if path is unknown."""
+    if not path:
+        return None
+    stamp = []
+    for p in (path, path + "-journal", path + "-wal"):
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        stamp.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+
+class CookieCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._entries = {}  # auth identity -> {"jar", "source", "stamp", "loaded_at"}
+        self.loads = 0
+        self.hits = 0
+        self.load_seconds = 0.0
+        self.last_load_seconds = None
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def jar(self, auth: AuthOptions, log=None):
+        """The parsed jar for auth (None for anonymous), loading it only when needed.
+
+        Concurrent callers with the same auth wait for a single load.
+        """
+        opts = auth.ydl_opts()
+        if not opts:
+            return None
+        key = auth.identity()
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(entry):
+                self.hits += 1
+                return entry["jar"]
+            from yt_dlp import cookies as ytc
+
+            t0 = time.monotonic()
+            jar = ytc.load_cookies(opts.get("cookiefile"), opts.get("cookiesfrombrowser"), None)
+            took = time.monotonic() - t0
+            if auth.mode == "txt":
+                source = os.path.abspath(auth.cookies_file)
+            else:
+                source = (entry or {}).get("source") or browser_cookie_db(auth.browser, auth.profile)
+            self._entries[key] = {"jar": jar, "source": source, "stamp": _stamp(source), "loaded_at": time.time()}
+            self.loads += 1
+            self.load_seconds += took
+            self.last_load_seconds = took
+        if log is not None:
+            what = "cookies.txt" if auth.mode == "txt" else f"{auth.browser} cookies"
+            log(f"Loaded {len(jar)} {what} in {took:.2f}s")
+        return jar
+
+    @staticmethod
+    def _fresh(entry) -> bool:
+        if entry["stamp"] is None:
+            return time.time() - entry["loaded_at"] < BROWSER_TTL
+        return _stamp(entry["source"]) == entry["stamp"]
+
+    def invalidate(self, auth: AuthOptions | None = None):
+        with self._lock:
+            if auth is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(auth.identity(), None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "loads": self.loads,
+            "hits": self.hits,
+            "load_seconds": self.load_seconds,
+            "last_load_seconds": self.last_load_seconds,
+        }
@@ -0,0 +1,1026 @@
+"""GUI-free download engine: jobs in, progress events out.
+
+Events are delivered through ``on_event(kind, job, *payload)``:
+
+- ``("log", job, text)``      a human readable log line
+- ``("progress", job, frac)`` download progress of the job's current stream, 0.0 .. 1.0
+- ``("phase", job, name, details)`` the job reached extract/download/merge/postprocess;
+  details carry what was resolved on the way (client, format, ``.part`` files)
+
+All per-job state (cancel flag, hook throttling, byte counters) lives on the Job,
+so one engine can run any number of jobs on different threads at once.
+"""
+import copy
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import yt_dlp as ydl
+from yt_dlp.utils import sanitize_filename
+
+from .autotune import ThroughputTuner
+from .bandwidth import BandwidthManager
+from .cache import InfoCache
+from .clients import ClientStats, client_name
+from .cookies import COOKIEJAR_PARAM, CookieCache
+from .ffmpeg import audio_encode_args, probe_media, run_ffmpeg, video_encode_args
+from .jobs import Job, JobCancelled
+from .library import Library, settings_key
+from .metrics import JobMetrics
+from .planner import plan_encode, probe_streams
+from .ranged import RANGES_SUFFIX
+from .retry import FORBIDDEN, NETWORK, THROTTLED, UNAVAILABLE, RetryPolicy, classify
+from .segmented import segmented_encode
+from .sessions import SessionPool
+from .streaming import check_streamable, stream_to_ffmpeg
+from .urls import is_collection_url, video_id
+from .ytdlp_ext import enable_ranged, enable_tuning, track_subprocesses
+
+
+class DownloadEngine:
+    def __init__(self, on_event=None, cache: InfoCache | None = None, tuner: ThroughputTuner | None = None,
+                 library: Library | None = None, client_stats: ClientStats | None = None,
+                 cookies: CookieCache | None = None, pool_sessions: bool = False,
+                 bandwidth: BandwidthManager | None = None, extractors=(), retry: RetryPolicy | None = None):
+        self._listeners = [on_event] if on_event else []
+        self.cache = cache
+        self.tuner = tuner
+        self.library = library
+        self.client_stats = client_stats
+        self.cookies = cookies
+        self.sessions = SessionPool(self._new_ydl) if pool_sessions else None
+        self.bandwidth = bandwidth
+        self.extractors = tuple(extractors)  # extra InfoExtractor classes, tried before yt-dlp's own
+        self.retry = retry or RetryPolicy()  # backoff and the throttle breaker, shared by every job
+        self._lock = threading.Lock()
+
+    # ---------------- Events ----------------
+    def subscribe(self, on_event):
+        """Add another ``on_event(kind, job, *payload)`` listener."""
+        self._listeners.append(on_event)
+
+    def _emit(self, kind: str, job: Job, *payload):
+        for listener in self._listeners:
+            listener(kind, job, *payload)
+
+    def log(self, job: Job, text: str):
+        self._emit("log", job, text)
+
+    def _phase(self, job: Job, phase: str, **details):
+        if phase == job.phase and not details:
+            return
+        job.phase = phase
+        self._emit("phase", job, phase, details)
+
+    # ---------------- Entry point ----------------
+    def run(self, job: Job):
+        """Run a job to completion on the calling thread and return its result.
+
+        Raises RuntimeError when every strategy failed, JobCancelled on cancel.
+        """
+        job.check_cancelled()
+        job.reset_progress()
+        job.metrics = JobMetrics()
+        self._emit("progress", job, 0.0)
+        job.outputs.clear()
+        if job.resume:
+            self._log_resume(job)
+
+        if self.library is not None and job.kind != "formats" and self._from_library(job):
+            job.metrics.close()
+            self._emit("progress", job, 1.0)
+            return job.result
+
+        if self.bandwidth is not None:
+            job.bandwidth = self.bandwidth.flow(job.id, job.options.rate_limit, job.options.priority)
+            job.track(job.bandwidth)
+        try:
+            with track_subprocesses(job):
+                if job.kind == "mp4":
+                    job.result = self._download_worker(job)
+                elif job.kind in ("mp3", "wav"):
+                    job.result = self._audio_worker(job)
+                elif job.kind == "export":
+                    job.result = self._export_worker(job)
+                else:
+                    job.result = self._list_formats_worker(job)
+        except BaseException as e:
+            job.metrics.close(e)
+            if job.cancel.is_set() and not self._keep_partial(job):
+                self._remove_partials(job)
+            raise
+        finally:
+            self.retry.release(job)
+            if job.bandwidth is not None:
+                self._release_bandwidth(job)
+        job.metrics.close()
+        self.log(job, f"Timings: {job.metrics.summary()}")
+        if self.library is not None and job.outputs:
+            self._index_outputs(job)
+        return job.result
+
+    # ---------------- Cancellation ----------------
+    @staticmethod
+    def _keep_partial(job: Job) -> bool:
+        return job.interrupted or job.options.keep_partial
+
+    def _remove_partials(self, job: Job):
+        """Delete what a cancelled job left behind: .part files (with their fragments) and unfinished outputs."""
+        removed = 0
+        for path in dict.fromkeys([*job.partials, *job.intermediates]):
+            folder, name = os.path.split(path)
+            try:
+                names = [n for n in os.listdir(folder or ".")
+                         if n == name or n.startswith((f"{name}-Frag", f"{name}.ytdl", f"{name}{RANGES_SUFFIX}"))]
+            except OSError:
+                continue
+            for n in names:
+                try:
+                    os.remove(os.path.join(folder, n))
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            self.log(job, f"Removed {removed} partial file(s)")
+
+    # ---------------- Bandwidth ----------------
+    def _release_bandwidth(self, job: Job):
+        flow = job.bandwidth
+        self.bandwidth.release(flow)
+        if flow.waited >= 0.5:
+            self.log(job, f"Bandwidth: {flow.bytes / 1024 / 1024:.1f} MB at {flow.average() / 1024 / 1024:.2f} MB/s "
+                          f"({flow.priority} priority, held back {flow.waited:.1f}s)")
+
+    # ---------------- Resume ----------------
+    def _log_resume(self, job: Job):
+        r = job.resume
+        kept = [p for p in r.get("partials") or [] if os.path.exists(p)]
+        size = sum(os.path.getsize(p) for p in kept)
+        text = f"Resuming an interrupted job (had reached: {r.get('phase') or 'queued'}"
+        if r.get("format"):
+            text += f", format {r.get('format_ids') or r['format']}, client={r.get('client') or 'normal'}"
+        self.log(job, text + f"); {len(kept)} partial file(s), {size / 1024 / 1024:.1f} MB kept")
+
+    def _client_order(self, job: Job, attempts=None):
+        """The job's clients (and format ladder) in the order to try them.
+
+        The client most likely to work (per ClientStats) goes first; an interrupted run's
+        client and format, when this job resumes one, go before everything else.
+        """
+        clients = job.options.clients()
+        if self.client_stats is not None:
+            clients = self.client_stats.order(clients)
+        r = job.resume or {}
+        if not r.get("format"):
+            return clients, attempts
+        if r.get("client") in clients:
+            clients = [r["client"]] + [c for c in clients if c != r["client"]]
+        if attempts is not None:
+            attempts = [r["format"]] + [a for a in attempts if a != r["format"]]
+        return clients, attempts
+
+    # ---------------- Library ----------------
+    def _library_kinds(self, job: Job):
+        return list(job.options.targets) if job.kind == "export" else [job.kind]
+
+    def _from_library(self, job: Job) -> bool:
+        """Finish job from the library (no network) if every output it asks for already exists."""
+        vid = video_id(job.url)
+        if not vid:
+            return False
+        o = job.options
+        found = {}
+        for kind in self._library_kinds(job):
+            hit = self.library.locate(vid, kind, settings_key(kind, o), o.save_dir)
+            if hit is None or (hit[0] == "elsewhere" and not o.hardlink):
+                return False
+            found[kind] = hit
+        for kind, (where, path) in found.items():
+            if where == "elsewhere":
+                linked = self.library.link(path, o.save_dir)
+                if linked is None:
+                    return False
+                self.log(job, f"Linked {kind.upper()} from the library: {path}")
+                path = linked
+            else:
+                self.log(job, f"Already in the library: {os.path.basename(path)}")
+            job.outputs[kind] = path
+        job.result = dict(job.outputs) if job.kind == "export" else "library"
+        return True
+
+    def _index_outputs(self, job: Job):
+        vid = video_id(job.url)
+        if not vid:
+            return
+        for kind, path in job.outputs.items():
+            try:
+                self.library.add(vid, kind, settings_key(kind, job.options), path, job.format_ids, job.title)
+            except Exception as e:  # the download itself succeeded; indexing is best effort
+                self.log(job, f"Could not add {os.path.basename(path)} to the library: {e}")
+
+    def _outtmpl(self, job: Job, info) -> str:
+        """%(title)s.%(ext)s in the save folder, plus the video ID when another video already owns that name."""
+        tmpl = "%(title)s.%(ext)s"
+        if self.library is not None and info.get("id"):
+            stem = os.path.join(job.options.save_dir, sanitize_filename(info.get("title") or info["id"]))
+            owner = self.library.owner(stem)
+            if owner and owner != info["id"]:
+                self.log(job, f"Another video ({owner}) is already saved as '{os.path.basename(stem)}'; adding the ID")
+                tmpl = "%(title)s [%(id)s].%(ext)s"
+        return os.path.join(job.options.save_dir, tmpl)
+
+    # ---------------- yt-dlp option builders ----------------
+    def _new_ydl(self, opts, auto_init=True):
+        Y = ydl.YoutubeDL(opts, auto_init=auto_init)
+        for ie in reversed(self.extractors):
+            Y.add_info_extractor(ie())
+            Y._ies = {ie.ie_key(): ie, **Y._ies}  # ahead of the built-in ones (the generic extractor matches any URL)
+        jar = opts.get(COOKIEJAR_PARAM)
+        if jar is not None:
+            Y.__dict__["cookiejar"] = jar  # shadows the cached_property before anything has loaded cookies
+        return Y
+
+    @contextmanager
+    def _ydl(self, opts, job: Job | None = None):
+        """A YoutubeDL for opts (on a pooled session when the engine pools them).
+
+        With job, its HTTP responses are tracked so a cancel breaks off a read in progress,
+        and their reads draw on the job's bandwidth share.
+        """
+        with (self.sessions.lease(opts) if self.sessions is not None else self._new_ydl(opts)) as Y:
+            if job is not None:
+                self._interruptible(Y, job)
+            yield Y
+
+    @staticmethod
+    def _interruptible(Y, job: Job):
+        urlopen = Y.urlopen
+
+        def tracked(req):
+            job.check_cancelled()
+            resp = urlopen(req)
+            job.track(resp)
+            if job.bandwidth is not None:
+                read, consume = resp.read, job.bandwidth.consume
+
+                def metered(amt=None):
+                    data = read(amt)
+                    consume(len(data))
+                    return data
+
+                resp.read = metered
+            return resp
+
+        Y.urlopen = tracked
+
+    def prewarm(self, client=None):
+        """Build a session for client with the YouTube extractor loaded, ahead of the first job.
+
+        yt-dlp registers its extractors when the first YoutubeDL is built; with pooled
+        sessions the session is kept, so the first anonymous job on client adopts it.
+        """
+        opts = {"quiet": True, "no_warnings": True, **self._client_opts(client)}
+        with self._ydl(opts) as Y:
+            Y.get_info_extractor("Youtube")
+
+    def close(self):
+        """Close pooled sessions and their connections."""
+        if self.sessions is not None:
+            self.sessions.close()
+
+    def _auth_opts(self, job: Job) -> dict:
+        """yt-dlp auth options for job: the shared parsed jar when the engine has a CookieCache."""
+        with job.metrics.span("auth", mode=job.options.auth.mode):
+            opts = job.options.auth.ydl_opts()  # raises on a bad cookies.txt
+            if self.cookies is None or not opts:
+                return opts
+            return {COOKIEJAR_PARAM: self.cookies.jar(job.options.auth, log=lambda text: self.log(job, text))}
+
+    def _base_opts(self, job: Job, outtmpl):
+        return {
+            "outtmpl": outtmpl,
+            "noplaylist": True,
+            "merge_output_format": "mp4",
+            "progress_hooks": [lambda d: self._hook(job, d)],
+            "postprocessor_hooks": [lambda d: self._pp_hook(job, d)],
+            "quiet": True,
+            "no_warnings": True,
+            **self.retry.ydl_opts(job),
+            "http_chunk_size": 256 * 1024,
+            "concurrent_fragment_downloads": 1,
+        }
+
+    @staticmethod
+    def _client_opts(client):
+        if client == "android":
+            return {"extractor_args": {"youtube": {"player_client": ["android"]}}}
+        return {}
+
+    # ---------------- Playlists / channels ----------------
+    def iter_entries(self, job: Job):
+        """Yield {"url", "id", "title", "availability"} for each video behind a playlist/channel URL.
+
+        Uses flat, lazy extraction so entries arrive page by page while the caller is
+        already downloading the first ones.
+        """
+        opts = self._base_opts(job, "%(title)s.%(ext)s")
+        opts.update(self._auth_opts(job))
+        opts.update({"noplaylist": False, "extract_flat": "in_playlist", "lazy_playlist": True})
+        with self._ydl(opts, job) as Y:
+            self._hold(job)
+            result = Y.extract_info(job.url, download=False, process=False)
+            yield from self._walk_entries(job, Y, result, depth=0)
+
+    def _walk_entries(self, job: Job, Y, result, depth):
+        job.check_cancelled()
+        # Channel URLs resolve to a tab, and a channel's home page lists its tabs as sub-playlists
+        while result.get("_type") in ("url", "url_transparent") and not video_id(result.get("url") or ""):
+            result = Y.extract_info(result["url"], download=False, process=False, ie_key=result.get("ie_key"))
+        if result.get("_type") != "playlist":
+            if result.get("id") or result.get("url"):
+                yield self._entry(result)
+            return
+        if depth == 0:
+            self.log(job, f"Enumerating {result.get('title') or job.url}…")
+        for entry in result.get("entries") or []:
+            job.check_cancelled()
+            if not entry:
+                continue
+            url = entry.get("url") or entry.get("webpage_url") or ""
+            if entry.get("_type") == "playlist" or (url and not video_id(url) and is_collection_url(url)):
+                if depth < 2:
+                    yield from self._walk_entries(job, Y, entry, depth + 1)
+                continue
+            yield self._entry(entry)
+
+    @staticmethod
+    def _entry(entry):
+        url = entry.get("url") or entry.get("webpage_url") or ""
+        if not video_id(url) and entry.get("id"):
+            url = f"https://www.youtube.com/watch?v={entry['id']}"
+        return {
+            "url": url,
+            "id": entry.get("id") or video_id(url),
+            "title": entry.get("title"),
+            "availability": entry.get("availability"),
+        }
+
+    # ---------------- Extraction / format resolution ----------------
+    def _cache_key(self, job: Job, client):
+        vid = video_id(job.url)
+        if self.cache is None or not vid:
+            return None
+        return self.cache.key(vid, client, job.options.auth.identity())
+
+    def _extract(self, job: Job, client, auth_extra, fresh: bool = False, stop: threading.Event | None = None):
+        """Return (info, from_cache) for this client, extracting at most once.
+
+        Sanitized info dicts are shared through the InfoCache (when the engine has
+        one) until shortly before their signed stream URLs expire. Setting stop makes
+        the extraction give up at its next HTTP request.
+        """
+        key = self._cache_key(job, client)
+        if key and not fresh:
+            info = self.cache.get(key)
+            if info is not None:
+                left = (self.cache.expires_at(key) or time.time()) - time.time()
+                self.log(job, f"Info cache hit (client={client or 'normal'}, valid {left / 60:.0f} more min)")
+                with job.metrics.span("extract", client=client_name(client), cached=True):
+                    job.title = info.get("title")
+                return info, True
+
+        opts = self._base_opts(job, "%(title)s.%(ext)s")
+        opts.update(self._client_opts(client))
+        opts.update(auth_extra)
+        self._hold(job)
+        t0 = time.monotonic()
+        with job.metrics.span("extract", client=client_name(client)), self._ydl(opts, job) as Y:
+            if stop is not None:
+                self._stop_on(Y, stop, job)
+            info = Y.sanitize_info(Y.extract_info(job.url, download=False))
+        took = time.monotonic() - t0
+        self.retry.success(job)
+        self.log(job, f"Extracted info (client={client or 'normal'}) in {took:.2f}s")
+        if self.client_stats is not None:
+            self.client_stats.latency(client, took)
+        job.title = info.get("title")
+        if key:
+            self.cache.put(key, info)
+        return info, False
+
+    @staticmethod
+    def _stop_on(Y, stop: threading.Event, job: Job):
+        """Make Y's HTTP requests raise JobCancelled once stop (or the job's cancel) is set."""
+        urlopen = Y.urlopen
+
+        def guarded(req):
+            if stop.is_set():
+                raise JobCancelled()
+            job.check_cancelled()
+            return urlopen(req)
+
+        Y.urlopen = guarded
+
+    def _hold(self, job: Job):
+        """Wait while the retry breaker holds requests back (YouTube has been answering 429)."""
+        left = self.retry.holding(job)
+        if not left:
+            self.retry.wait(job)  # half open: takes this job's turn
+            return
+        self.log(job, f"YouTube is throttling requests; every job holds back (up to {left:.0f}s)…")
+        with job.metrics.span("throttled"):
+            held = self.retry.wait(job)
+        self.log(job, f"Went on after {held:.1f}s")
+
+    def _drop_cached(self, job: Job, client):
+        key = self._cache_key(job, client)
+        if key:
+            self.cache.invalidate(key)
+
+    @staticmethod
+    def _resolve_format(Y, info, attempts):
+        """Return (selector, chosen_formats) for the first attempt that matches info, or (None, [])."""
+        formats = info.get("formats") or [info]
+        ctx = {
+            "formats": formats,
+            "has_merged_format": any("none" not in (f.get("acodec"), f.get("vcodec")) for f in formats),
+            "incomplete_formats": (all(f.get("vcodec") == "none" for f in formats)
+                                   or all(f.get("acodec") == "none" for f in formats)),
+        }
+        for fmt in attempts:
+            chosen = list(Y.build_format_selector(fmt)(dict(ctx)))
+            if chosen:
+                return fmt, chosen
+        return None, []
+
+    def _download_info(self, job: Job, info, attempts, client, opts, on_resolved=None):
+        """Resolve the ladder against info and download the first match, without re-extracting.
+
+        on_resolved(formats) is called with the selected format dicts before the download starts.
+        """
+        with self._ydl(opts, job) as Y:
+            with job.metrics.span("resolve", client=client_name(client)):
+                fmt, chosen = self._resolve_format(Y, info, attempts)
+                if fmt is None:
+                    raise RuntimeError("Requested format is not available (no selector in the ladder matched).")
+            ids = "+".join(f.get("format_id") or "?" for f in chosen)
+            self.log(job, f"→ Using format: {fmt} [{ids}] (client={client or 'normal'})")
+            job.format_ids = ids
+            job.metrics.format, job.metrics.format_ids = fmt, ids
+            self._phase(job, "download", client=client, format=fmt, format_ids=ids)
+            Y.params["format"] = fmt
+            Y.format_selector = Y.build_format_selector(fmt)
+            if on_resolved is not None:
+                on_resolved([f for c in chosen for f in (c.get("requested_formats") or [c])])
+            if job.options.autotune:
+                self._attach_tuner(job, Y, chosen)
+            if job.options.ranged_connections > 1:
+                enable_ranged(Y, job.options.ranged_connections)
+            info = copy.deepcopy(info)
+            # extract_info() already picked formats with yt-dlp's default selector; left in place, a
+            # single-format pick (audio, progressive) would still be merged from the default's streams
+            info.pop("requested_formats", None)
+            info.pop("requested_downloads", None)
+            self._hold(job)
+            Y.process_ie_result(info, download=True)
+        return fmt
+
+    def _attach_tuner(self, job: Job, Y, chosen):
+        with self._lock:
+            if self.tuner is None:
+                self.tuner = ThroughputTuner()
+        session = self.tuner.session(log=lambda text: self.log(job, text))
+        session.prime([f for c in chosen for f in (c.get("requested_formats") or [c])])
+        enable_tuning(Y, session)
+        Y.add_progress_hook(session.hook)
+
+    # ---------------- yt-dlp runners ----------------
+    def _try_download(self, job: Job, info, attempts, client, auth_extra):
+        o = job.options
+        opts = self._base_opts(job, self._outtmpl(job, info))
+        opts.update(self._client_opts(client))
+        opts.update(auth_extra)
+
+        # Always remux to MP4; a re-encode (if the plan needs one) runs on the final file
+        opts["postprocessors"] = [{"key": "FFmpegVideoRemuxer", "preferedformat": "mp4"}]
+        on_resolved = None
+        if o.reencode:
+            target_kbps = int(o.max_vbr_kbps or 0)
+            if target_kbps <= 0:
+                raise RuntimeError("Set a target bitrate (>0 kbps) when re-encode is enabled.")
+            plan = {}
+
+            def on_resolved(formats):
+                plan["plan"] = plan_encode(formats, target_kbps, info.get("duration"))
+                self.log(job, plan["plan"].describe())
+
+            opts["post_hooks"] = [lambda path: self._apply_encode_plan(job, path, plan["plan"])]
+
+        opts.setdefault("post_hooks", []).append(lambda path: job.outputs.update(mp4=path))
+        return self._download_info(job, info, attempts, client, opts, on_resolved)
+
+    def _apply_encode_plan(self, job: Job, path, plan):
+        """Run the planned FFmpeg work on the downloaded MP4 at path (in place)."""
+        self._phase(job, "postprocess")
+        with job.metrics.span("postprocess", step="encode plan") as span:
+            if plan.needs_probe:
+                # yt-dlp didn't report a bitrate: look at what was actually downloaded
+                probe = probe_media(path)
+                plan = plan_encode(probe_streams(probe), plan.target_kbps, probe["duration"] or plan.duration)
+                self.log(job, plan.describe())
+            span["action"] = plan.action
+            if plan.action == "remux":
+                return
+            o = job.options
+            tmp = os.path.splitext(path)[0] + ".reencode.mp4"
+            t0 = time.monotonic()
+            try:
+                if plan.action == "audio":
+                    run_ffmpeg(["-i", path, "-map", "0:v:0", "-map", "0:a:0?", "-c:v", "copy", *plan.audio_args(),
+                                "-movflags", "+faststart", tmp], job.cancel)
+                elif o.encode_workers > 1:
+                    n = segmented_encode(path, tmp, plan.target_kbps, o.encode_workers, job.cancel,
+                                         log=lambda text: self.log(job, text), duration=plan.duration,
+                                         audio_args=plan.audio_args())
+                    self.log(job, f"Re-encoded {n} segments")
+                else:
+                    self.log(job, f"Re-encoding video to {plan.target_kbps} kbps…")
+                    run_ffmpeg(["-i", path, "-map", "0:v:0", "-map", "0:a:0?", *video_encode_args(plan.target_kbps),
+                                *plan.audio_args(), "-movflags", "+faststart", tmp], job.cancel)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self.log(job, f"FFmpeg {plan.action} step took {time.monotonic() - t0:.1f}s")
+
+    def _try_audio(self, job: Job, info, fmt, codec, client, auth_extra, pref_q):
+        if job.options.stream_audio:
+            try:
+                return self._stream_audio(job, info, fmt, codec, client, auth_extra, pref_q)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                job.check_cancelled()
+                self.log(job, f"Streaming not possible ({e}); downloading first instead.")
+
+        opts = self._base_opts(job, self._outtmpl(job, info))
+        # For audio-only we don't want to force a video merge format
+        opts["merge_output_format"] = None
+        opts.update(self._client_opts(client))
+        opts.update(auth_extra)
+        # Extract & convert to desired audio codec
+        opts["postprocessors"] = [
+            {
+                "key": "FFmpegExtractAudio",
+                "preferredcodec": codec,
+                "preferredquality": pref_q,
+            }
+        ]
+
+        opts["post_hooks"] = [lambda path: job.outputs.update({codec: path})]
+
+        self.log(job, f"→ Audio-only: {fmt} → {codec.upper()} (client={client or 'normal'})")
+        return self._download_info(job, info, [fmt], client, opts)
+
+    def _stream_audio(self, job: Job, info, fmt, codec, client, auth_extra, pref_q):
+        """Pipe the selected audio stream into FFmpeg while it downloads."""
+        opts = self._base_opts(job, self._outtmpl(job, info))
+        opts.update(self._client_opts(client))
+        opts.update(auth_extra)
+        with self._ydl(opts, job) as Y:
+            with job.metrics.span("resolve", client=client_name(client)):
+                sel, chosen = self._resolve_format(Y, info, [fmt])
+                if sel is None:
+                    raise RuntimeError("Requested format is not available.")
+            f = chosen[0]
+            check_streamable(f)
+            job.metrics.format, job.metrics.format_ids = sel, f.get("format_id")
+            output = os.path.splitext(Y.prepare_filename(info))[0] + f".{codec}"
+            self.log(job, f"→ Streaming audio: {sel} [{f.get('format_id')}] → {codec.upper()} (client={client or 'normal'})")
+            self._phase(job, "download", client=client, format=sel, format_ids=f.get("format_id"))
+            self._hold(job)
+            stream_to_ffmpeg(
+                Y, f, output, codec, audio_encode_args(codec, pref_q),
+                progress=lambda d: self._hook(job, d), cancel=job.cancel,
+            )
+        job.outputs[codec] = output
+        return sel
+
+    # ---------------- Workers ----------------
+    def _on_client(self, job: Job, client, auth, action, got=None):
+        """Get info for client (or use got, an (info, cached) pair from a race) and return action(info).
+
+        If the info came from the cache and the action fails, the entry is dropped and
+        the action retried once on a fresh extraction (stale signed URLs fail this way).
+        A throttled attempt is tried again once the retry breaker lets it (RetryPolicy.again).
+        The outcome is counted in the engine's ClientStats.
+        """
+        while True:
+            t0 = time.monotonic()
+            try:
+                result = self._attempt_client(job, client, auth, action, got)
+                break
+            except Exception as e:
+                job.metrics.attempt(client_name(client), False, time.monotonic() - t0, e)
+                job.metrics.abandon(e)  # streams cut short by the failure
+                if job.cancel.is_set():
+                    raise
+                # Throttling isn't this client's fault: once the breaker lets the job go, try it again
+                if self.retry.failed(job, e) == THROTTLED and self.retry.again(job, e):
+                    self.log(job, f"ERROR: {e}")
+                    self.log(job, f"Throttled; trying {client_name(client)} again when YouTube lets up…")
+                    got = None
+                    continue
+                if self.client_stats is not None:
+                    self.client_stats.record(client, False)
+                raise
+        job.metrics.attempt(client_name(client), True, time.monotonic() - t0)
+        if self.client_stats is not None:
+            self.client_stats.record(client, True)
+        return result
+
+    def _attempt_client(self, job: Job, client, auth, action, got):
+        self._phase(job, "extract")
+        info, cached = got or self._extract(job, client, auth)
+        try:
+            return action(info)
+        except Exception as e:
+            # Stale signed URLs fail with 403s or dropped connections; a fresh extraction can't fix the rest
+            if not cached or job.cancel.is_set() or classify(e) not in (FORBIDDEN, NETWORK, None):
+                raise
+            self.log(job, f"ERROR: {e}")
+            self.log(job, "Cached info may be stale, extracting again…")
+            self._drop_cached(job, client)
+            job.metrics.retry("cache")
+        info, _ = self._extract(job, client, auth, fresh=True)
+        return action(info)
+
+    def _race(self, job: Job, clients, auth, attempts, label, errors):
+        """With race_clients, extract on every client at once instead of one after the other.
+
+        Returns (clients, {winner: (info, cached)}): the winner first, then the clients that
+        were stopped before they finished; clients whose extraction failed are dropped and
+        their errors added to errors. Without racing, returns (clients, {}).
+        """
+        if not job.options.race_clients or len(clients) < 2:
+            return clients, {}
+        winner, got, failed = self._race_clients(job, clients, auth, attempts)
+        for client, e in failed.items():
+            errors.append(f"[{client_name(client)}] {label} → {e}")
+        rest = [c for c in clients if c != winner and c not in failed]
+        if winner is None:
+            return rest, {}
+        return [winner, *rest], {winner: got}
+
+    def _race_clients(self, job: Job, clients, auth, attempts):
+        """Extract on every client in parallel and keep the first whose info satisfies attempts.
+
+        Returns (winner, (info, cached), failed) with failed mapping client -> error; winner
+        is None when no client produced usable info. The slower extractions are stopped at
+        their next HTTP request (their info may still land in the cache).
+        """
+        self._phase(job, "extract")
+        results = queue.Queue()
+        stop = threading.Event()
+
+        def run(client):
+            try:
+                info, cached = self._extract(job, client, auth, stop=stop)
+                with self._ydl({"quiet": True, "no_warnings": True}) as Y:
+                    if self._resolve_format(Y, info, attempts)[0] is None:
+                        raise RuntimeError("Requested format is not available (no selector in the ladder matched).")
+                results.put((client, (info, cached), None))
+            except Exception as e:
+                results.put((client, None, e))
+
+        self.log(job, f"Racing clients: {', '.join(client_name(c) for c in clients)}")
+        t0 = time.monotonic()
+        for client in clients:
+            threading.Thread(target=run, args=(client,), daemon=True,
+                             name=f"ytmedia-race-{job.id}-{client_name(client)}").start()
+        failed = {}
+        try:
+            while len(failed) < len(clients):
+                try:
+                    client, got, err = results.get(timeout=0.2)
+                except queue.Empty:
+                    job.check_cancelled()
+                    continue
+                if got is not None:
+                    self.log(job, f"Client {client_name(client)} won in {time.monotonic() - t0:.2f}s")
+                    return client, got, failed
+                failed[client] = err
+                job.metrics.attempt(client_name(client), False, time.monotonic() - t0, err)
+                self.log(job, f"ERROR: [{client_name(client)}] {err}")
+                if not job.cancel.is_set():
+                    self.retry.failed(job, err)
+                    if self.client_stats is not None:
+                        self.client_stats.record(client, False)
+            job.check_cancelled()
+            return None, None, failed
+        finally:
+            stop.set()
+
+    def _hopeless(self, job: Job, error) -> bool:
+        """Whether error rules out every other client too (the video itself is gone or blocked)."""
+        if classify(error) != UNAVAILABLE:
+            return False
+        self.log(job, "The video itself is unavailable; not trying other clients.")
+        return True
+
+    def _download_worker(self, job: Job):
+        auth = self._auth_opts(job)
+        clients, attempts = self._client_order(job, job.options.format_attempts())
+        errors = []
+        clients, raced = self._race(job, clients, auth, attempts, " | ".join(attempts), errors)
+        for client in clients:
+            job.check_cancelled()
+            try:
+                fmt = self._on_client(
+                    job, client, auth, lambda info: self._try_download(job, info, attempts, client, auth),
+                    got=raced.get(client),
+                )
+                self._emit("progress", job, 1.0)
+                return fmt
+            except Exception as e:
+                job.check_cancelled()  # a killed FFmpeg or cut connection fails with its own error
+                msg = str(e)
+                errors.append(f"[{client or 'normal'}] {' | '.join(attempts)} → {msg}")
+                self.log(job, f"ERROR: {msg}")
+                if self._hopeless(job, e):
+                    break
+
+        joined = "\n\n".join(errors[-6:]) if errors else "Unknown error"
+        raise RuntimeError(f"All strategies failed. Last errors:\n\n{joined}")
+
+    def _audio_worker(self, job: Job):
+        codec = job.kind
+        auth = self._auth_opts(job)
+        fmt = job.options.audio_format()
+        # WAV is lossless, the bitrate preference only affects stream selection
+        pref_q = job.options.preferred_quality() if codec == "mp3" else "0"
+        clients, _ = self._client_order(job)
+        errors = []
+        clients, raced = self._race(job, clients, auth, [fmt], codec.upper(), errors)
+        for client in clients:
+            job.check_cancelled()
+            try:
+                self._on_client(
+                    job, client, auth, lambda info: self._try_audio(job, info, fmt, codec, client, auth, pref_q),
+                    got=raced.get(client),
+                )
+                self._emit("progress", job, 1.0)
+                return fmt
+            except Exception as e:
+                job.check_cancelled()
+                msg = str(e)
+                errors.append(f"[{client or 'normal'}] {codec.upper()} → {msg}")
+                self.log(job, f"ERROR: {msg}")
+                if self._hopeless(job, e):
+                    break
+
+        joined = "\n\n".join(errors[-6:]) if errors else "Unknown error"
+        raise RuntimeError(f"{codec.upper()} extraction failed. Last errors:\n\n{joined}")
+
+    # ---------------- Fan-out export ----------------
+    def _export_streams(self, Y, info, job: Job):
+        """Pick (video, audio) format dicts covering every target; either may be None."""
+        o = job.options
+        video = audio = None
+        if "mp4" in o.targets:
+            fmt, chosen = self._resolve_format(Y, info, o.format_attempts())
+            if fmt is None:
+                raise RuntimeError("Requested format is not available (no selector in the ladder matched).")
+            parts = chosen[0].get("requested_formats") or [chosen[0]]
+            video = parts[0]
+            audio = parts[1] if len(parts) > 1 else None
+            if audio is None and video.get("acodec") not in (None, "none"):
+                audio = video  # progressive format: audio targets reuse its audio track
+        if audio is None and set(o.targets) & {"mp3", "wav"}:
+            fmt, chosen = self._resolve_format(Y, info, [o.audio_format()])
+            if fmt is None:
+                raise RuntimeError("No audio format available.")
+            audio = chosen[0]
+        return video, audio
+
+    def _try_export(self, job: Job, info, client, auth_extra):
+        o = job.options
+        # Keyed by job.key so a resumed export finds the streams it had already fetched
+        workdir = os.path.join(o.save_dir, f".ytmedia-{info.get('id', 'job')}-{job.key[:8]}")
+        opts = self._base_opts(job, os.path.join(workdir, "%(id)s.f%(format_id)s.%(ext)s"))
+        opts["merge_output_format"] = None
+        opts.update(self._client_opts(client))
+        opts.update(auth_extra)
+
+        try:
+            with self._ydl(opts, job) as Y, job.metrics.span("resolve", client=client_name(client)):
+                video, audio = self._export_streams(Y, info, job)
+                out_base = os.path.splitext(
+                    Y.prepare_filename(info, outtmpl=self._outtmpl(job, info))
+                )[0]
+            streams = [f for f in (video, audio) if f is not None]
+            ids = list(dict.fromkeys(f["format_id"] for f in streams))
+            # "a,b" downloads each stream on its own (no merge) into the work dir
+            self._download_info(job, info, [",".join(ids)], client, opts)
+
+            path = lambda f: os.path.join(workdir, f"{info['id']}.f{f['format_id']}.{f['ext']}")
+            plan = None
+            if o.reencode and "mp4" in o.targets and video is not None:
+                plan = plan_encode(streams, int(o.max_vbr_kbps), info.get("duration"))
+                if plan.needs_probe:
+                    probe = probe_media(path(video))
+                    plan = plan_encode(probe_streams(probe), plan.target_kbps, probe["duration"] or plan.duration)
+                self.log(job, plan.describe())
+            tasks = {t: self._export_args(job, t, video and path(video), audio and path(audio), plan)
+                     for t in o.targets}
+            outputs = {t: f"{out_base}.{t}" for t in o.targets}
+
+            self._phase(job, "postprocess")
+            self.log(job, f"Encoding {', '.join(t.upper() for t in o.targets)} from local streams…")
+            # Write next to the target and rename, so an existing (possibly hard-linked) file is replaced, not rewritten
+            parts = {t: os.path.join(workdir, f"out.{t}") for t in o.targets}
+            def encode(t, args):
+                with job.metrics.span("postprocess", step=f"FFmpeg {t}"):
+                    run_ffmpeg([*args, parts[t]], job.cancel)
+
+            with ThreadPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1)) as pool:
+                futures = [pool.submit(encode, t, args) for t, args in tasks.items()]
+                for fut in futures:
+                    fut.result()
+            for t in o.targets:
+                os.replace(parts[t], outputs[t])
+                self.log(job, f"Saved {t.upper()}: {os.path.basename(outputs[t])}")
+            job.outputs.update(outputs)
+        except BaseException:
+            if not (job.cancel.is_set() and self._keep_partial(job)):
+                shutil.rmtree(workdir, ignore_errors=True)
+            raise
+        shutil.rmtree(workdir, ignore_errors=True)
+        return outputs
+
+    def _export_args(self, job: Job, target, video_path, audio_path, plan=None):
+        """FFmpeg input/codec args (without the output path) producing one target."""
+        o = job.options
+        if target == "mp4":
+            if video_path == audio_path or audio_path is None:
+                args = ["-i", video_path, "-map", "0:v:0", "-map", "0:a:0?"]
+            else:
+                args = ["-i", video_path, "-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+            if plan is not None and plan.action == "video":
+                args += video_encode_args(plan.target_kbps)
+            else:
+                args += ["-c:v", "copy"]
+            audio_args = plan.audio_args() if plan is not None else ["-c:a", "copy"]
+            return args + [*audio_args, "-movflags", "+faststart"]
+        if audio_path is None:
+            raise RuntimeError(f"No audio stream for {target.upper()}.")
+        pref_q = o.preferred_quality() if target == "mp3" else "0"
+        return ["-i", audio_path, "-vn", "-map", "0:a:0", *audio_encode_args(target, pref_q)]
+
+    def _export_worker(self, job: Job):
+        """Download the needed streams once and produce every target in job.options.targets."""
+        auth = self._auth_opts(job)
+        if job.options.reencode and int(job.options.max_vbr_kbps or 0) <= 0:
+            raise RuntimeError("Set a target bitrate (>0 kbps) when re-encode is enabled.")
+        o = job.options
+        clients, _ = self._client_order(job)
+        errors = []
+        usable = o.format_attempts() if "mp4" in o.targets else [o.audio_format()]
+        clients, raced = self._race(job, clients, auth, usable, "+".join(o.targets), errors)
+        for client in clients:
+            job.check_cancelled()
+            try:
+                outputs = self._on_client(job, client, auth, lambda info: self._try_export(job, info, client, auth),
+                                          got=raced.get(client))
+                self._emit("progress", job, 1.0)
+                return outputs
+            except Exception as e:
+                if job.cancel.is_set():
+                    raise
+                msg = str(e)
+                errors.append(f"[{client or 'normal'}] {'+'.join(job.options.targets)} → {msg}")
+                self.log(job, f"ERROR: {msg}")
+                if self._hopeless(job, e):
+                    break
+
+        joined = "\n\n".join(errors[-6:]) if errors else "Unknown error"
+        raise RuntimeError(f"Export failed. Last errors:\n\n{joined}")
+
+    def _list_formats_worker(self, job: Job):
+        """Return (client_name, rows) where rows are printable format lines."""
+        auth = self._auth_opts(job)
+
+        info = None
+        used_client = "normal"
+        clients = [None, "android"]
+        if self.client_stats is not None:
+            clients = self.client_stats.order(clients)
+        if job.options.race_clients:
+            winner, got, failed = self._race_clients(job, clients, auth, ["all"])
+            if winner is not None:
+                return client_name(winner), format_rows(got[0])
+            clients = [c for c in clients if c not in failed]
+
+        for client in clients:
+            job.check_cancelled()
+            t0 = time.monotonic()
+            try:
+                info, _ = self._extract(job, client, auth)
+                used_client = client or "normal"
+                job.metrics.attempt(used_client, True, time.monotonic() - t0)
+                break
+            except Exception as e:
+                job.check_cancelled()
+                job.metrics.attempt(client_name(client), False, time.monotonic() - t0, e)
+                self.retry.failed(job, e)
+                self.log(job, f"List formats failed on {client or 'normal'}: {e}")
+                if self._hopeless(job, e):
+                    break
+
+        if not info:
+            raise RuntimeError("Could not fetch format list with provided auth.")
+
+        return used_client, format_rows(info)
+
+    def _hook(self, job: Job, d):
+        # Runs inside the downloader thread
+        job.check_cancelled()
+
+        status = d.get("status")
+        now = time.monotonic()
+
+        if status == "downloading":
+            total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+            done = d.get("downloaded_bytes") or 0
+            frac = (done / total) if total else 0.0
+            job.update_stream(done, total, d.get("speed"))
+            if done:
+                self.retry.success(job)  # media is flowing
+            tmp = d.get("tmpfilename")
+            if tmp and tmp not in job.partials:
+                job.partials.append(tmp)
+                self._phase(job, "download", partials=list(job.partials))
+            name = d.get("filename") or tmp
+            if name:
+                job.metrics.begin(("download", name.removesuffix(".part")), "download",
+                                  stream=os.path.basename(name.removesuffix(".part")),
+                                  format_id=(d.get("info_dict") or {}).get("format_id"))
+
+            # Throttle UI updates
+            if now - job.hook_last_ts >= 0.2:
+                job.hook_last_ts = now
+                self._emit("progress", job, frac)
+
+                pct = int(frac * 100) if total else -1
+                if pct != -1 and pct != job.last_pct_logged:
+                    job.last_pct_logged = pct
+                    spd = d.get("speed")
+                    eta = d.get("eta")
+                    txt = f"Downloading… {pct:d}%"
+                    if spd:
+                        txt += f" @ {spd / 1024 / 1024:.2f} MB/s"
+                    if eta:
+                        txt += f" | ETA {eta}s"
+                    self.log(job, txt)
+
+        elif status == "finished":
+            job.finish_stream(d.get("downloaded_bytes") or d.get("total_bytes") or 0)
+            if d.get("filename"):
+                job.metrics.end(("download", d["filename"]), bytes=d.get("downloaded_bytes") or 0)
+            # downloaded_bytes is missing when yt-dlp found the file already complete (not ours to delete)
+            if d.get("filename") and "downloaded_bytes" in d and d["filename"] not in job.intermediates:
+                job.intermediates.append(d["filename"])
+            self.log(job, "Merging / processing…")
+
+    def _pp_hook(self, job: Job, d):
+        name = d.get("postprocessor")
+        if d.get("status") == "started":
+            phase = "merge" if name == "Merger" else "postprocess"
+            self._phase(job, phase)
+            job.metrics.begin(("pp", name), phase, step=name)
+        elif d.get("status") == "finished":
+            job.metrics.end(("pp", name))
+
+
+def format_rows(info):
+    """Render the formats of an info dict as fixed-width table rows."""
+    rows = []
+    for f in (info.get("formats") or []):
+        if not f.get("format_id"):
+            continue
+        h = f.get("height") or ""
+        fps = f.get("fps") or ""
+        v = f.get("vcodec") or ""
+        a = f.get("acodec") or ""
+        ext = f.get("ext") or ""
+        abr = f.get("abr") or ""
+        tbr = f.get("tbr") or ""
+        rows.append(
+            f"{f['format_id']:>6} | {ext:>4} | h={str(h):>4} | fps={str(fps):>3} | "
+            f"v={v[:12]:<12} | a={a[:9]:<9} | abr={str(abr):>4} | tbr={str(tbr):>5}"
+        )
+    return rows
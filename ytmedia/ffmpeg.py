@@ -0,0 +1,125 @@
+"""Thin helpers for running FFmpeg directly (outside yt-dlp's post-processors)."""
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+from .jobs import JobCancelled
+
+
+def ffmpeg_path() -> str:
+    path = shutil.which("ffmpeg")
+    if not path:
+        raise RuntimeError("FFmpeg not found in PATH (required for merging / re-encode / audio export).")
+    return path
+
+
+def run_ffmpeg(args, cancel: threading.Event | None = None, poll: float = 0.1):
+    """Run ``ffmpeg -hide_banner -y <args>``; kill it if cancel is set.
+
+    Raises RuntimeError with the tail of FFmpeg's stderr when it fails.
+    """
+    cmd = [ffmpeg_path(), "-hide_banner", "-nostdin", "-loglevel", "error", "-y", *map(str, args)]
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.extend(proc.stderr), daemon=True)
+    reader.start()
+    while proc.poll() is None:
+        if cancel is not None and cancel.is_set():
+            proc.kill()
+            proc.wait()
+            raise JobCancelled()
+        time.sleep(poll)
+    reader.join(timeout=1.0)
+    if proc.returncode != 0:
+        tail = b"".join(stderr[-5:]).decode("utf-8", "replace").strip()
+        raise RuntimeError(f"FFmpeg failed ({proc.returncode}): {tail or 'no output'}")
+
+
+def probe_media(path: str) -> dict:
+    """Duration and per-stream codec / bitrate parsed from ``ffmpeg -i`` (ffprobe isn't always installed).
+
+    Returns {"duration": seconds or None, "streams": [{"type": "video"|"audio", "codec": str, "kbps": int|None}],
+    "tags": {name: value}} (container and stream metadata, first value wins).
+    """
+    proc = subprocess.run([ffmpeg_path(), "-hide_banner", "-nostdin", "-i", path],
+                          stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    text = proc.stderr.decode("utf-8", "replace")
+    duration = None
+    m = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", text)
+    if m:
+        duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+    streams = []
+    tags = {}
+    for line in text.splitlines():
+        tag = re.match(r"^\s{4,}(\w+)\s*: (.*)$", line)
+        if tag:
+            tags.setdefault(tag.group(1).lower(), tag.group(2).strip())
+        m = re.search(r"Stream #\d+:\d+.*?: (Video|Audio): (\w+)", line)
+        if m:
+            rate = re.search(r"(\d+) kb/s", line)
+            streams.append({"type": m.group(1).lower(), "codec": m.group(2), "kbps": int(rate.group(1)) if rate else None})
+    return {"duration": duration, "streams": streams, "tags": tags}
+
+
+class FFmpegPipe:
+    """An FFmpeg process reading its input from stdin (``-i pipe:0``)."""
+
+    def __init__(self, args):
+        cmd = [ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-y", *map(str, args)]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self._stderr = []
+        self._reader = threading.Thread(target=lambda: self._stderr.extend(self.proc.stderr), daemon=True)
+        self._reader.start()
+
+    def write(self, data: bytes):
+        try:
+            self.proc.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            self.proc.wait()
+            self._raise()
+
+    def finish(self):
+        """Close stdin, wait for FFmpeg to flush the output and raise if it failed."""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.wait()
+        if self.proc.returncode != 0:
+            self._raise()
+
+    def kill(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+    def _raise(self):
+        self._reader.join(timeout=1.0)
+        tail = b"".join(self._stderr[-5:]).decode("utf-8", "replace").strip()
+        raise RuntimeError(f"FFmpeg failed ({self.proc.returncode}): {tail or 'no output'}")
+
+
+def audio_encode_args(codec: str, pref_q: str):
+    """FFmpeg audio encoder args matching yt-dlp's FFmpegExtractAudio for the same preferredquality."""
+    if codec == "wav":
+        return ["-c:a", "pcm_s16le"]
+    if codec == "mp3":
+        q = (pref_q or "0").upper()
+        if q.endswith("K"):
+            return ["-c:a", "libmp3lame", "-b:a", f"{q[:-1]}k"]
+        return ["-c:a", "libmp3lame", "-q:a", q]
+    raise ValueError(f"Unsupported audio codec: {codec}")
+
+
+def video_encode_args(target_kbps: int):
+    """libx264 args for re-encoding to a target video bitrate (audio handled separately)."""
+    return [
+        "-c:v", "libx264",
+        "-b:v", f"{target_kbps}k",
+        "-maxrate", f"{target_kbps}k",
+        "-bufsize", f"{target_kbps * 2}k",
+        "-pix_fmt", "yuv420p",
+        "-preset", "medium",
+    ]
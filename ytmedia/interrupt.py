@@ -0,0 +1,56 @@
+"""Interrupting what a cancelled job is blocked on.
+
+A job's thread can sit in a socket read on a stalled connection (until the
+socket timeout) or wait on an FFmpeg post-processor for minutes; neither calls
+back into the engine, so the cancel flag alone isn't seen. ``Job.track()``
+registers such resources and ``Job.request_cancel()`` passes each to
+``abort()``: network responses get their socket shut down (the blocked read
+returns at once and yt-dlp's retry goes through the job's guarded ``urlopen``,
+which raises JobCancelled), subprocesses are killed, and anything with an
+``abort()`` method (RangedDownloader) is asked to stop.
+"""
+import socket
+import subprocess
+
+# Attributes leading from a yt-dlp / http.client / urllib3 response to its socket
+_SOCKET_PATH = ("fp", "_fp", "raw", "_sock", "sock", "_connection")
+
+
+def find_socket(obj, depth: int = 6):
+    """The socket under a response object, if it can be reached."""
+    if isinstance(obj, socket.socket):
+        return obj
+    if obj is None or depth == 0:
+        return None
+    for attr in _SOCKET_PATH:
+        sock = find_socket(getattr(obj, attr, None), depth - 1)
+        if sock is not None:
+            return sock
+    return None
+
+
+def abort(resource):
+    """Interrupt a tracked resource: kill a subprocess, shut down a response's socket, or call its abort()."""
+    if isinstance(resource, subprocess.Popen):
+        if resource.poll() is None:
+            resource.kill()
+        return
+    if callable(getattr(resource, "abort", None)):
+        resource.abort()
+        return
+    sock = find_socket(resource)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # already closed
+
+
+def ffmpeg_output(args) -> str | None:
+    """Output path of an ``ffmpeg ... <output>`` command line (what a killed run leaves behind)."""
+    if not isinstance(args, (list, tuple)) or len(args) < 2 or "ffmpeg" not in str(args[0]).lower():
+        return None
+    out = str(args[-1])
+    if out.startswith("file:"):
+        out = out[len("file:"):]
+    return None if out == "-" or out.startswith(("http://", "https://", "pipe:")) else out
@@ -0,0 +1,151 @@
+"""Bounded multi-job queue in front of the DownloadEngine."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .engine import DownloadEngine
+from .jobs import JOB_STATES, Job, JobCancelled
+
+
+class JobQueue:
+    """Runs submitted jobs on a bounded thread pool.
+
+    Engine events are forwarded to ``on_event`` unchanged; in addition the queue
+    emits ``("state", job)`` whenever a job changes status.
+    """
+
+    def __init__(self, engine=None, max_workers: int = 2, on_event=None):
+        self._listeners = [on_event] if on_event is not None else []
+        self.engine = engine or DownloadEngine()
+        self.engine.subscribe(self._emit)
+        self.max_workers = max(1, int(max_workers))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ytmedia-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._futures = {}
+        self._created = time.monotonic()
+
+    def subscribe(self, on_event):
+        """Add another ``on_event(kind, job, *payload)`` listener."""
+        self._listeners = [*self._listeners, on_event]  # copied: _emit may be iterating the old list
+
+    def unsubscribe(self, on_event):
+        """Remove a listener added with subscribe()."""
+        self._listeners = [fn for fn in self._listeners if fn != on_event]
+
+    def _emit(self, kind, job, *payload):
+        for listener in self._listeners:
+            listener(kind, job, *payload)
+
+    def _set_status(self, job: Job, status: str):
+        job.status = status
+        self._emit("state", job)
+
+    # ---------------- Submission ----------------
+    def submit(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._set_status(job, "queued")
+            self._futures[job.id] = self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job):
+        if job.cancel.is_set():
+            self._set_status(job, "cancelled")
+            return
+        job.started_at = time.monotonic()
+        self._set_status(job, "running")
+        try:
+            self.engine.run(job)
+            status = "done"
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            job.error = str(e)
+            status = "cancelled" if job.cancel.is_set() else "failed"
+        job.finished_at = time.monotonic()
+        job.speed = 0.0
+        if status == "cancelled" and job.cancel_requested_at is not None:
+            job.cancel_latency = max(0.0, job.finished_at - job.cancel_requested_at)
+            self.engine.log(job, f"Stopped {job.cancel_latency:.2f}s after cancel")
+        self._set_status(job, status)
+
+    # ---------------- Control ----------------
+    def cancel(self, job_id: int | None = None, interrupt: bool = False):
+        """Cancel one job, or every unfinished job when job_id is None.
+
+        interrupt: stopping to resume later (shutdown), so partial files are kept whatever the job's policy.
+        """
+        with self._lock:
+            targets = [self._jobs[job_id]] if job_id is not None else list(self._jobs.values())
+        for job in targets:
+            if job.done:
+                continue
+            job.request_cancel(interrupt)
+            fut = self._futures.get(job.id)
+            if fut is not None and fut.cancel():
+                # Never started: the pool won't call _run, so finish it here.
+                job.finished_at = time.monotonic()
+                self._set_status(job, "cancelled")
+
+    def set_max_workers(self, n: int):
+        """Change the concurrency limit. Running jobs finish on the old pool; new ones use the new limit."""
+        n = max(1, int(n))
+        with self._lock:
+            if n == self.max_workers:
+                return
+            old, self.max_workers = self._pool, n
+            self._pool = ThreadPoolExecutor(max_workers=n, thread_name_prefix="ytmedia-job")
+            # Re-home jobs that had not started yet so they honour the new limit.
+            for job_id, fut in list(self._futures.items()):
+                if fut.cancel():
+                    self._futures[job_id] = self._pool.submit(self._run, self._jobs[job_id])
+        old.shutdown(wait=False)
+
+    def wait(self, jobs=None, timeout: float | None = None):
+        """Block until the given jobs (default: all submitted) are finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in list(jobs or self.jobs()):
+            fut = self._futures.get(job.id)
+            if fut is None:
+                continue
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                fut.result(timeout=left)
+            except Exception:
+                pass
+
+    def shutdown(self, cancel: bool = False, interrupt: bool = False):
+        if cancel:
+            self.cancel(interrupt=interrupt)
+        self._pool.shutdown(wait=True, cancel_futures=cancel)
+
+    # ---------------- Introspection ----------------
+    def get(self, job_id: int) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active(self):
+        return [j for j in self.jobs() if not j.done]
+
+    def stats(self) -> dict:
+        """Aggregate view across jobs: counts per state and throughput in bytes/sec."""
+        jobs = self.jobs()
+        counts = {s: 0 for s in JOB_STATES}
+        for j in jobs:
+            counts[j.status] += 1
+        running = [j for j in jobs if j.status == "running"]
+        latencies = [j.cancel_latency for j in jobs if j.cancel_latency is not None]
+        total_bytes = sum(j.downloaded_bytes for j in jobs)
+        elapsed = max(1e-6, time.monotonic() - self._created)
+        return {
+            **counts,
+            "current_bps": sum(j.speed for j in running),
+            "total_bytes": total_bytes,
+            "average_bps": total_bytes / elapsed,
+            "progress": (sum(j.progress for j in running) / len(running)) if running else 0.0,
+            "cancel_latency_max": max(latencies, default=None),
+        }
@@ -0,0 +1,133 @@
+"""Job objects handed to the DownloadEngine."""
+import itertools
+import threading
+import time
+import uuid
+import weakref
+from dataclasses import dataclass, field
+
+from .interrupt import abort
+from .metrics import JobMetrics
+from .options import EXPORT_TARGETS, PRIORITIES, JobOptions
+
+JOB_KINDS = ("mp4", "mp3", "wav", "export", "formats")
+
+# queued -> running -> done | failed | cancelled
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+FINAL_STATES = ("done", "failed", "cancelled")
+
+_job_ids = itertools.count(1)
+
+
+class JobCancelled(RuntimeError):
+    def __init__(self):
+        super().__init__("Cancelled")
+
+
+@dataclass
+class Job:
+    url: str
+    kind: str = "mp4"  # mp4|mp3|wav|export|formats
+    options: JobOptions = field(default_factory=JobOptions)
+    id: int = field(default_factory=lambda: next(_job_ids))
+    cancel: threading.Event = field(default_factory=threading.Event)
+    status: str = "queued"
+    result: object = None
+    error: str | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+    parent: int | None = None  # id of the playlist/channel job this entry came from
+    key: str = field(default_factory=lambda: uuid.uuid4().hex)  # stable across restarts (JobJournal)
+
+    # How far the job got: extract|download|merge|postprocess, and the .part files it is writing
+    phase: str | None = None
+    partials: list = field(default_factory=list)
+    intermediates: list = field(default_factory=list)  # finished streams and FFmpeg outputs not yet final
+    resume: dict | None = None  # journal record of an interrupted run of this job
+
+    # What was fetched and written (for the library index)
+    title: str | None = None
+    format_ids: str | None = None
+    outputs: dict = field(default_factory=dict)  # kind -> path
+
+    # Progress of the stream currently downloading (a job may fetch video + audio)
+    progress: float = 0.0
+    speed: float = 0.0
+    stream_bytes: int = 0
+    completed_bytes: int = 0
+
+    # Progress hook throttling state
+    hook_last_ts: float = 0.0
+    last_pct_logged: int = -1
+
+    # Its share of the engine's BandwidthManager (a Flow) from the time it starts running
+    bandwidth: object = None
+
+    # Phase timings, attempts and retries of its latest run (see metrics.py)
+    metrics: JobMetrics = field(default_factory=JobMetrics, repr=False)
+
+    # Cancellation: when it was asked for, how long the job took to stop, and what to interrupt
+    cancel_requested_at: float | None = None
+    cancel_latency: float | None = None
+    interrupted: bool = False  # cancelled to be resumed later: partial files are always kept
+    _tracked: weakref.WeakSet = field(default_factory=weakref.WeakSet, repr=False)
+    _tracked_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        if self.kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {self.kind}")
+        if self.kind == "export":
+            bad = [t for t in self.options.targets if t not in EXPORT_TARGETS]
+            if bad or not self.options.targets:
+                raise ValueError(f"Export targets must be some of {', '.join(EXPORT_TARGETS)}")
+        if self.options.priority not in PRIORITIES:
+            raise ValueError(f"Priority must be one of {', '.join(PRIORITIES)}")
+
+    def check_cancelled(self):
+        if self.cancel.is_set():
+            raise JobCancelled()
+
+    def request_cancel(self, interrupt: bool = False):
+        """Set the cancel flag and interrupt whatever the job is blocked on (see track())."""
+        with self._tracked_lock:
+            if not self.cancel.is_set():
+                self.cancel_requested_at = time.monotonic()
+                self.interrupted = interrupt
+            self.cancel.set()
+            tracked = list(self._tracked)
+        for resource in tracked:
+            abort(resource)
+
+    def track(self, resource):
+        """Register a network response or subprocess to interrupt if the job is cancelled."""
+        with self._tracked_lock:
+            self._tracked.add(resource)
+            cancelled = self.cancel.is_set()
+        if cancelled:
+            abort(resource)
+
+    def reset_progress(self):
+        self.progress = 0.0
+        self.speed = 0.0
+        self.stream_bytes = 0
+        self.completed_bytes = 0
+        self.hook_last_ts = 0.0
+        self.last_pct_logged = -1
+
+    def update_stream(self, done: int, total: int, speed):
+        self.stream_bytes = done
+        self.progress = (done / total) if total else 0.0
+        self.speed = float(speed or 0.0)
+
+    def finish_stream(self, size: int):
+        self.completed_bytes += size
+        self.stream_bytes = 0
+        self.speed = 0.0
+
+    @property
+    def downloaded_bytes(self) -> int:
+        return self.completed_bytes + self.stream_bytes
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATES
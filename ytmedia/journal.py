@@ -0,0 +1,211 @@
+"""Crash-safe job journal, so unfinished jobs survive a crash or a closed window.
+
+Every job on a JobQueue the journal is attached to gets a record in
+``journal.jsonl`` in the user data folder: URL, kind and options (auth mode
+included), then, as the engine reports them, the phase it reached
+(extract/download/merge/postprocess), the player client and format that worked
+and the ``.part`` files being written. Each change is appended as one JSON line
+and fsynced, so a killed process loses at most the line it was writing.
+Finished jobs are dropped the next time the journal is opened.
+
+After a restart ``unfinished()`` lists the jobs that never finished and
+``resume()`` queues them again under the same key: the recorded client and
+format are tried first, yt-dlp continues the ``.part`` files where they
+stopped, and streams that were already complete are not fetched again.
+"""
+import json
+import os
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import asdict, fields
+from pathlib import Path
+
+from .jobs import FINAL_STATES, Job
+from .options import AuthOptions, JobOptions
+from .paths import user_data_dir
+
+# What an interrupted run had got to, handed to the engine as Job.resume
+RESUME_KEYS = ("phase", "client", "format", "format_ids", "partials")
+
+# Tells this process's records apart from a dead one's that had the same PID (containers restart at low PIDs);
+# a live process that got a dead one's PID is told apart by its start time (pid_started)
+_RUN_ID = uuid.uuid4().hex
+
+
+def options_to_dict(options: JobOptions) -> dict:
+    return asdict(options)
+
+
+def options_from_dict(d: dict) -> JobOptions:
+    """Inverse of options_to_dict; ignores keys this version doesn't know."""
+    known = {f.name for f in fields(JobOptions)}
+    d = {k: v for k, v in (d or {}).items() if k in known}
+    auth_known = {f.name for f in fields(AuthOptions)}
+    auth = {k: v for k, v in (d.pop("auth", None) or {}).items() if k in auth_known}
+    if "targets" in d:
+        d["targets"] = tuple(d["targets"])
+    return JobOptions(**d, auth=AuthOptions(**auth))
+
+
+def _process_started(pid):
+    """When process pid started, in the OS's own units (comparable only with itself), or None if unknown."""
+    try:
+        pid = int(pid)
+        if os.name == "nt":
+            import ctypes
+
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+            if not handle:
+                return None
+            times = [ctypes.c_ulonglong() for _ in range(4)]  # creation, exit, kernel, user (FILETIMEs)
+            ok = kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in times))
+            kernel32.CloseHandle(handle)
+            return times[0].value if ok else None
+        if os.path.isdir("/proc"):
+            with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as fh:
+                return int(fh.read().rpartition(")")[2].split()[19])  # starttime, in clock ticks since boot
+        out = subprocess.run(["ps", "-o", "lstart=", "-p", str(pid)], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, ValueError, IndexError, AttributeError, subprocess.SubprocessError):
+        return None
+
+
+_STARTED = _process_started(os.getpid())
+
+
+def _pid_alive(pid, started=None) -> bool:
+    """True if another process with this PID is running (and, given its start time, is the same process)."""
+    if not pid or pid == os.getpid():
+        return False
+    if os.name == "nt":
+        # os.kill() would terminate the process on Windows; ask for its exit code instead
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, int(pid))  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        alive = bool(ok) and code.value == 259  # STILL_ACTIVE
+    else:
+        try:
+            os.kill(int(pid), 0)
+            alive = True
+        except PermissionError:
+            alive = True  # exists, owned by someone else
+        except OSError:
+            alive = False
+    if alive and started is not None:
+        now = _process_started(pid)
+        return now is None or now == started  # a different start time: the PID was reused
+    return alive
+
+
+class JobJournal:
+    def __init__(self, path=None):
+        self.path = Path(path) if path else user_data_dir() / "journal.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._records = self._load()  # key -> merged record, unfinished jobs only
+        self._compact()
+
+    # ---------------- Persistence ----------------
+    def _load(self) -> dict:
+        records = {}
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    if isinstance(rec, dict) and rec.get("key"):
+                        records.setdefault(rec["key"], {}).update(rec)
+        except OSError:
+            pass
+        return {k: r for k, r in records.items() if r.get("status") not in FINAL_STATES and r.get("url")}
+
+    def _compact(self):
+        """Rewrite the file with one line per unfinished job."""
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                for rec in self._records.values():
+                    fh.write(json.dumps(rec, sort_keys=True) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+
+    def _append(self, key: str, changes: dict):
+        rec = {"key": key, **changes}
+        with self._lock:
+            if rec.get("status") in FINAL_STATES:
+                self._records.pop(key, None)
+            else:
+                self._records.setdefault(key, {}).update(rec)
+            # Reopened per write so a compaction by another process never strands our lines
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(rec, sort_keys=True) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    # ---------------- Recording ----------------
+    def attach(self, queue):
+        """Record every job on queue (its state changes and the engine's phase events)."""
+        queue.subscribe(self._on_event)
+        return self
+
+    def close(self):
+        """Stop recording. Call before cancelling jobs on shutdown so they stay resumable."""
+        self._closed = True
+
+    def _on_event(self, kind, job: Job, *payload):
+        if self._closed or job.kind == "formats":
+            return
+        if kind == "state":
+            if job.status == "queued":
+                self._append(job.key, {
+                    "url": job.url, "kind": job.kind, "options": options_to_dict(job.options),
+                    "status": "queued", "pid": os.getpid(), "pid_started": _STARTED, "run": _RUN_ID,
+                    "queued_at": time.time(),
+                })
+            else:
+                self._append(job.key, {"status": job.status})
+        elif kind == "phase":
+            phase, details = payload
+            self._append(job.key, {"phase": phase, "title": job.title, **details})
+
+    # ---------------- Resuming ----------------
+    def unfinished(self) -> list:
+        """Records of jobs that were queued or running when their process went away (oldest first)."""
+        with self._lock:
+            records = [dict(r) for r in self._records.values()]
+        # Skip jobs of this process and of other instances that are still running
+        records = [r for r in records
+                   if r.get("run") != _RUN_ID and not _pid_alive(r.get("pid"), r.get("pid_started"))]
+        return sorted(records, key=lambda r: r.get("queued_at") or 0)
+
+    def resume(self, queue, records=None) -> list:
+        """Queue the unfinished jobs (or the given records) again; returns the new Jobs."""
+        jobs = []
+        for rec in self.unfinished() if records is None else records:
+            try:
+                job = Job(rec["url"], kind=rec["kind"], options=options_from_dict(rec.get("options")),
+                          key=rec["key"], resume={k: rec.get(k) for k in RESUME_KEYS})
+            except (KeyError, TypeError, ValueError):
+                self.discard([rec])  # written by an incompatible version
+                continue
+            job.title = rec.get("title")
+            jobs.append(queue.submit(job))
+        return jobs
+
+    def discard(self, records=None):
+        """Forget unfinished jobs (all of them by default) without resuming."""
+        for rec in self.unfinished() if records is None else records:
+            self._append(rec["key"], {"status": "cancelled"})
@@ -0,0 +1,208 @@
+"""Local library index: what has already been saved, and where.
+
+A small SQLite database (``library.sqlite3`` in the user data folder) with one
+row per output file, keyed by video ID, output kind (mp4/mp3/wav) and the
+encode settings that shaped it. The engine consults it before any network
+work, so asking for something that is already on disk returns at once, and can
+hard-link an identical output kept in another folder instead of downloading it
+again. ``rebuild(folder)`` re-indexes an existing save folder.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .ffmpeg import probe_media
+from .paths import user_data_dir
+from .urls import video_id
+
+MEDIA_EXTS = ("mp4", "mp3", "wav")
+ANY_SETTINGS = "*"  # rows found by rebuild(): settings unknown, good for any request of that kind
+
+_ID_IN_NAME_RE = re.compile(r"\[([0-9A-Za-z_-]{11})\]")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    video_id   TEXT NOT NULL,
+    kind       TEXT NOT NULL,
+    settings   TEXT NOT NULL,
+    format_ids TEXT,
+    path       TEXT NOT NULL UNIQUE,
+    stem       TEXT NOT NULL,
+    size       INTEGER,
+    mtime      REAL,
+    sha256     TEXT,
+    title      TEXT,
+    added_at   REAL
+);
+CREATE INDEX IF NOT EXISTS outputs_key ON outputs (video_id, kind, settings);
+CREATE INDEX IF NOT EXISTS outputs_stem ON outputs (stem);
+CREATE INDEX IF NOT EXISTS outputs_hash ON outputs (sha256);
+"""
+
+
+def settings_key(kind: str, options) -> str:
+    """The options that change what an output of this kind contains, as a stable string."""
+    if kind == "mp4":
+        vbr = int(options.max_vbr_kbps or 0)
+        enc = f"enc{vbr}" if options.reencode else "copy"
+        return f"q={options.quality};a={int(options.audio_kbps or 0)};v={vbr};{enc}"
+    if kind == "mp3":
+        return f"a={int(options.audio_kbps or 0)};q={options.preferred_quality()}"
+    return f"a={int(options.audio_kbps or 0)}"
+
+
+def file_sha256(path, block: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Library:
+    def __init__(self, path=None):
+        self.path = Path(path) if path else user_data_dir() / "library.sqlite3"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+        self.hits = 0
+        self.links = 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _query(self, sql, args=()):
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    # ---------------- Lookups ----------------
+    def _alive(self, row) -> bool:
+        """True if the row's file is still there unchanged; drops the row otherwise."""
+        try:
+            st = os.stat(row["path"])
+        except OSError:
+            self._query("DELETE FROM outputs WHERE path = ?", (row["path"],))
+            return False
+        return st.st_size == row["size"]
+
+    def find(self, vid: str, kind: str, settings: str):
+        """Existing outputs for this request (any folder), newest first."""
+        rows = self._query(
+            "SELECT * FROM outputs WHERE video_id = ? AND kind = ? AND settings IN (?, ?) ORDER BY added_at DESC",
+            (vid, kind, settings, ANY_SETTINGS),
+        )
+        return [dict(r) for r in rows if self._alive(r)]
+
+    def locate(self, vid: str, kind: str, settings: str, save_dir: str):
+        """("here", path) if save_dir already has a matching output, ("elsewhere", path) if
+        another folder does, else None."""
+        rows = self.find(vid, kind, settings)
+        folder = os.path.abspath(save_dir)
+        for row in rows:
+            if os.path.dirname(row["path"]) == folder:
+                self.hits += 1
+                return "here", row["path"]
+        return ("elsewhere", rows[0]["path"]) if rows else None
+
+    def link(self, src: str, save_dir: str) -> str | None:
+        """Hard-link the indexed output src into save_dir; returns the new path or None."""
+        rows = self._query("SELECT * FROM outputs WHERE path = ?", (os.path.abspath(src),))
+        if not rows:
+            return None
+        row = rows[0]
+        dst = os.path.join(os.path.abspath(save_dir), os.path.basename(src))
+        if os.path.exists(dst):
+            return None  # a different file already has that name
+        try:
+            os.link(src, dst)
+        except OSError:
+            return None  # other filesystem, or links not supported
+        self.add(row["video_id"], row["kind"], row["settings"], dst, row["format_ids"], row["title"],
+                 sha256=row["sha256"])
+        self.links += 1
+        return dst
+
+    def owner(self, stem: str) -> str | None:
+        """Video ID whose output uses this path minus extension, if any."""
+        rows = self._query("SELECT video_id, path, size FROM outputs WHERE stem = ?", (os.path.abspath(stem),))
+        for row in rows:
+            if self._alive(row):
+                return row["video_id"]
+        return None
+
+    # ---------------- Updates ----------------
+    def add(self, vid: str, kind: str, settings: str, path: str, format_ids=None, title=None, sha256=None):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        digest = sha256 or file_sha256(path)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (vid, kind, settings, format_ids, path, os.path.splitext(path)[0], st.st_size, st.st_mtime,
+                 digest, title, time.time()),
+            )
+
+    def rebuild(self, folder, log=None) -> dict:
+        """Index the media files under folder.
+
+        Known files (same hash) keep their settings and just get their path
+        updated; new ones are identified by a ``[video id]`` in the file name or a
+        YouTube URL in the container tags, and indexed with ANY_SETTINGS.
+        """
+        log = log or (lambda text: None)
+        folder = os.path.abspath(folder)
+        stats = {"scanned": 0, "known": 0, "added": 0, "unidentified": 0, "removed": 0}
+        for row in self._query("SELECT * FROM outputs WHERE path LIKE ?", (folder.rstrip(os.sep) + os.sep + "%",)):
+            if not self._alive(row):
+                stats["removed"] += 1
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]  # skip the engine's work folders
+            for name in files:
+                ext = os.path.splitext(name)[1][1:].lower()
+                if ext not in MEDIA_EXTS or name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                stats["scanned"] += 1
+                st = os.stat(path)
+                same = self._query("SELECT 1 FROM outputs WHERE path = ? AND size = ? AND mtime = ?",
+                                   (path, st.st_size, st.st_mtime))
+                if same:
+                    stats["known"] += 1
+                    continue
+                digest = file_sha256(path)
+                known = self._query("SELECT * FROM outputs WHERE sha256 = ? ORDER BY added_at DESC", (digest,))
+                if known:
+                    k = known[0]
+                    self.add(k["video_id"], k["kind"], k["settings"], path, k["format_ids"], k["title"], sha256=digest)
+                    stats["known"] += 1
+                    continue
+                vid = self._identify(path, name)
+                if not vid:
+                    stats["unidentified"] += 1
+                    log(f"Can't tell which video {name} is; not indexed")
+                    continue
+                self.add(vid, ext, ANY_SETTINGS, path, title=os.path.splitext(name)[0], sha256=digest)
+                stats["added"] += 1
+        return stats
+
+    @staticmethod
+    def _identify(path, name) -> str | None:
+        m = _ID_IN_NAME_RE.search(name)
+        if m:
+            return m.group(1)
+        try:
+            tags = probe_media(path)["tags"]
+        except RuntimeError:  # no FFmpeg
+            return None
+        return video_id(" ".join(tags.get(k, "") for k in ("purl", "comment", "description", "synopsis")))
+
+    def stats(self) -> dict:
+        (row,) = self._query("SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS bytes FROM outputs")
+        return {"entries": row["n"], "bytes": row["bytes"], "hits": self.hits, "links": self.links}
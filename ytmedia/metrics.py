@@ -0,0 +1,291 @@
+"""Per-job timings and counters, kept as JSON lines and a Prometheus textfile.
+
+Every job carries a ``JobMetrics`` (``job.metrics``, fresh for each run) that
+the engine fills in as the job goes:
+
+- spans: ``auth`` (auth options and cookie jar), ``extract`` per client (cache
+  hits included, flagged ``cached``), ``resolve`` (format selection), one
+  ``download`` per stream with its bytes, ``merge``, and one ``postprocess``
+  per yt-dlp post-processor or FFmpeg step. Each span has its offset from the
+  start of the run, its duration, and the error that ended it, if any;
+- attempts: one per player client tried, with its outcome, and the client,
+  format and format ids that won;
+- retries: yt-dlp's own (``http``, ``fragment``, ``extractor``,
+  ``file_access``), counted through its ``retry_sleep_functions`` hook, and
+  the engine's (``cache``: a stale cached extraction done again), with the
+  seconds of backoff they slept. Time spent held back because YouTube was
+  throttling (see retry.py) is a ``throttled`` span.
+
+``JobMetrics.record(job)`` is the structured result. ``MetricsExporter``,
+attached to a JobQueue, appends each finished job's record to
+``metrics.jsonl`` in the user data folder and, when given a path, rewrites a
+Prometheus text-format file (atomically, for node_exporter's textfile
+collector) with counters and histograms summed over this process's jobs.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .paths import user_data_dir
+
+PHASES = ("auth", "throttled", "extract", "resolve", "download", "merge", "postprocess")
+RETRY_KINDS = ("http", "fragment", "extractor", "file_access")  # yt-dlp's retry_sleep_functions keys
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)  # seconds, for the histograms
+
+
+class JobMetrics:
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.started = time.time()
+        self.spans = []  # finished spans, in the order they ended
+        self.attempts = []  # {"client", "ok", "seconds", "error"}
+        self.retries = {}  # kind -> count
+        self.backoff = 0.0  # seconds slept before retries
+        self.client = None  # the client, format and streams that produced the output
+        self.format = None
+        self.format_ids = None
+        self.finished = None  # seconds from t0, once close()d
+        self._open = {}  # key -> span begun in one callback, ended in another
+        self._lock = threading.Lock()
+
+    # ---------------- Recording ----------------
+    @contextmanager
+    def span(self, phase: str, **details):
+        """Time the block as a span; yields the span dict so the block can add details (bytes, ...)."""
+        s = self._new(phase, details)
+        try:
+            yield s
+        except BaseException as e:
+            s["error"] = _error_text(e)
+            raise
+        finally:
+            self._finish(s)
+
+    def begin(self, key, phase: str, **details):
+        """Start a span that ends in a later callback (end(key)); a key already open is left alone."""
+        with self._lock:
+            if key not in self._open:
+                self._open[key] = self._new(phase, details)
+
+    def end(self, key, error=None, **details):
+        """End the span begun under key; False if there is none."""
+        with self._lock:
+            s = self._open.pop(key, None)
+        if s is None:
+            return False
+        s.update(details)
+        if error is not None:
+            s["error"] = _error_text(error)
+        self._finish(s)
+        return True
+
+    def _new(self, phase, details):
+        return {"phase": phase, "start": time.monotonic() - self.t0, **details}
+
+    def _finish(self, s):
+        s["seconds"] = time.monotonic() - self.t0 - s["start"]
+        with self._lock:
+            self.spans.append(s)
+
+    def attempt(self, client: str, ok: bool, seconds: float, error=None):
+        with self._lock:
+            self.attempts.append({"client": client, "ok": ok, "seconds": round(seconds, 3),
+                                  "error": None if ok else _error_text(error)})
+            if ok:
+                self.client = client
+
+    def retry(self, kind: str, n: int = 0):
+        """Count a retry. Fits yt-dlp's retry_sleep_functions: returns None, so no sleep is added."""
+        with self._lock:
+            self.retries[kind] = self.retries.get(kind, 0) + 1
+
+    def abandon(self, error=None):
+        """End the spans still open (streams cut off by an error or a cancel) with error."""
+        with self._lock:
+            keys = list(self._open)
+        for key in keys:
+            self.end(key, error=error or "not finished")
+
+    def close(self, error=None):
+        """End the run."""
+        self.abandon(error)
+        with self._lock:
+            if self.finished is None:
+                self.finished = time.monotonic() - self.t0
+
+    # ---------------- Reporting ----------------
+    def totals(self) -> dict:
+        """phase -> seconds, over every span of that phase (parallel streams add up), in PHASES order."""
+        out = {}
+        with self._lock:
+            for s in self.spans:
+                out[s["phase"]] = out.get(s["phase"], 0.0) + s["seconds"]
+        return {p: out.pop(p) for p in PHASES if p in out} | out
+
+    def downloaded(self) -> int:
+        with self._lock:
+            return sum(s.get("bytes") or 0 for s in self.spans if s["phase"] == "download")
+
+    def summary(self) -> str:
+        """One line for the job's log, e.g. 'extract 0.8s, download 3.1s (12.3 MB), merge 0.2s'."""
+        parts = []
+        for phase, seconds in self.totals().items():
+            text = f"{phase} {seconds:.2f}s"
+            if phase == "download":
+                text += f" ({self.downloaded() / 1024 / 1024:.1f} MB)"
+            parts.append(text)
+        retries = sum(self.retries.values())
+        if retries:
+            parts.append(f"{retries} retr{'y' if retries == 1 else 'ies'}"
+                         + (f" ({self.backoff:.1f}s backoff)" if self.backoff >= 0.05 else ""))
+        return ", ".join(parts)
+
+    def record(self, job) -> dict:
+        """The job's structured metrics record (what MetricsExporter writes)."""
+        with self._lock:
+            spans = [{k: round(v, 4) if isinstance(v, float) else v for k, v in s.items()} for s in self.spans]
+            attempts = [dict(a) for a in self.attempts]
+            retries = dict(self.retries)
+        fallbacks = max(0, len(attempts) - 1)
+        if fallbacks:
+            retries["client"] = fallbacks
+        return {
+            "key": job.key,
+            "id": job.id,
+            "url": job.url,
+            "kind": job.kind,
+            "status": job.status,
+            "error": job.error,
+            "title": job.title,
+            "started": self.started,
+            "seconds": round(self.finished or 0.0, 4),  # 0: cancelled before it ran
+            "client": self.client,
+            "format": self.format,
+            "format_ids": self.format_ids,
+            "bytes": self.downloaded(),
+            "phases": {k: round(v, 4) for k, v in self.totals().items()},
+            "attempts": attempts,
+            "retries": retries,
+            "backoff": round(self.backoff, 4),
+            "spans": spans,
+        }
+
+
+def _error_text(e) -> str:
+    """First line of an error (the engine's messages go on with every strategy's error)."""
+    lines = str(e).strip().splitlines()
+    return lines[0] if lines else type(e).__name__
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsExporter:
+    def __init__(self, path=None, prom_path=None):
+        """path: the JSONL log (default: metrics.jsonl in the user data folder; False for none).
+        prom_path: the Prometheus textfile to keep up to date (default: $YTMEDIA_METRICS_PROM, if set)."""
+        self.path = None if path is False else Path(path) if path else user_data_dir() / "metrics.jsonl"
+        prom_path = prom_path or os.environ.get("YTMEDIA_METRICS_PROM")
+        self.prom_path = Path(prom_path) if prom_path else None
+        for p in (self.path, self.prom_path):
+            if p is not None:
+                p.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.jobs = {}  # (kind, status) -> count
+        self.bytes = {}  # kind -> bytes
+        self.attempts = {}  # (client, outcome) -> count
+        self.retries = {}  # kind -> count
+        self.phases = {}  # phase -> _Histogram of per-job totals
+        self.durations = {}  # kind -> _Histogram of job run times
+        self.last_finished = 0.0
+
+    def attach(self, queue):
+        """Export every job on queue once it finishes."""
+        queue.subscribe(self._on_event)
+        return self
+
+    def _on_event(self, kind, job, *payload):
+        if kind == "state" and job.done:
+            self.add(job.metrics.record(job))
+
+    def add(self, rec: dict):
+        """Count one job's record and write it out."""
+        with self._lock:
+            key = (rec["kind"], rec["status"])
+            self.jobs[key] = self.jobs.get(key, 0) + 1
+            self.bytes[rec["kind"]] = self.bytes.get(rec["kind"], 0) + rec["bytes"]
+            for a in rec["attempts"]:
+                k = (a["client"], "ok" if a["ok"] else "failed")
+                self.attempts[k] = self.attempts.get(k, 0) + 1
+            for k, n in rec["retries"].items():
+                self.retries[k] = self.retries.get(k, 0) + n
+            for phase, seconds in rec["phases"].items():
+                self.phases.setdefault(phase, _Histogram()).observe(seconds)
+            self.durations.setdefault(rec["kind"], _Histogram()).observe(rec["seconds"])
+            self.last_finished = time.time()
+            if self.path is not None:
+                with open(self.path, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(rec, sort_keys=True) + "\n")
+            if self.prom_path is not None:
+                self._write_prom()
+
+    # ---------------- Prometheus text format ----------------
+    def prometheus(self) -> str:
+        with self._lock:
+            return self._prometheus()
+
+    def _prometheus(self) -> str:
+        out = []
+
+        def family(name, kind, help_text):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, label, hists):
+            for value, h in sorted(hists.items()):
+                for bound, n in zip(BUCKETS, h.counts):
+                    out.append(f'{name}_bucket{{{label}="{value}",le="{bound}"}} {n}')
+                out.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {h.count}')
+                out.append(f'{name}_sum{{{label}="{value}"}} {h.sum:.6f}')
+                out.append(f'{name}_count{{{label}="{value}"}} {h.count}')
+
+        family("ytmedia_jobs_total", "counter", "Jobs finished, by kind and final status.")
+        for (kind, status), n in sorted(self.jobs.items()):
+            out.append(f'ytmedia_jobs_total{{kind="{kind}",status="{status}"}} {n}')
+        family("ytmedia_job_duration_seconds", "histogram", "Run time of finished jobs, by kind.")
+        histogram("ytmedia_job_duration_seconds", "kind", self.durations)
+        family("ytmedia_phase_seconds", "histogram", "Time a job spent in each phase (its spans summed).")
+        histogram("ytmedia_phase_seconds", "phase", self.phases)
+        family("ytmedia_downloaded_bytes_total", "counter", "Media bytes downloaded, by job kind.")
+        for kind, n in sorted(self.bytes.items()):
+            out.append(f'ytmedia_downloaded_bytes_total{{kind="{kind}"}} {n}')
+        family("ytmedia_client_attempts_total", "counter", "Player client attempts, by outcome.")
+        for (client, outcome), n in sorted(self.attempts.items()):
+            out.append(f'ytmedia_client_attempts_total{{client="{client}",outcome="{outcome}"}} {n}')
+        family("ytmedia_retries_total", "counter", "Retries, by what was retried.")
+        for kind, n in sorted(self.retries.items()):
+            out.append(f'ytmedia_retries_total{{kind="{kind}"}} {n}')
+        family("ytmedia_last_job_finished_timestamp_seconds", "gauge", "When the last job finished.")
+        out.append(f"ytmedia_last_job_finished_timestamp_seconds {self.last_finished:.3f}")
+        return "\n".join(out) + "\n"
+
+    def _write_prom(self):
+        # Written next to the target and renamed, so the collector never reads half a file
+        tmp = self.prom_path.with_name(f".{self.prom_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self._prometheus())
+        os.replace(tmp, self.prom_path)
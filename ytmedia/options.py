@@ -0,0 +1,156 @@
+"""Explicit job options and the yt-dlp format selector builders.
+
+Everything in here used to be read straight out of Tk variables on the GUI; the
+engine only ever sees these plain objects.
+"""
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Display label -> quality key used by JobOptions
+QUALITIES = {
+    "Best (auto)": "best",
+    "720p progressive bias": "720p",
+    "1080p": "1080p",
+    "1440p": "1440p",
+    "2160p (4K)": "2160p",
+}
+
+# Audio bitrate choices (minimum preferred bitrate for selecting bestaudio)
+AUDIO_BITRATES = [
+    "Auto",
+    "≥64 kbps",
+    "≥96 kbps",
+    "≥128 kbps",
+    "≥160 kbps",
+    "≥192 kbps",
+    "≥256 kbps",
+    "≥320 kbps",
+]
+
+# Max slider value (in kbps) for video bitrate filter
+MAX_VBR_KBPS = 25000  # 25 Mbps
+
+TARGET_HEIGHT = {"1080p": 1080, "1440p": 1440, "2160p": 2160}
+
+BROWSERS = ["chrome", "edge", "opera", "brave", "vivaldi", "chromium", "firefox"]
+
+AUDIO_CODECS = ("mp3", "wav")
+
+EXPORT_TARGETS = ("mp4", "mp3", "wav")
+
+PRIORITIES = ("high", "normal", "low")  # share of a capped link: 4 : 2 : 1
+
+
+def abr_from_label(label: str) -> int:
+    """Turn an AUDIO_BITRATES label ("≥192 kbps") into kbps; "Auto" -> 0."""
+    digits = "".join(ch for ch in (label or "") if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+@dataclass
+class AuthOptions:
+    mode: str = "none"  # none|txt|browser
+    cookies_file: str | None = None
+    browser: str = BROWSERS[0]
+    profile: str | None = None
+
+    def ydl_opts(self) -> dict:
+        """Return the yt-dlp options for this auth mode (raises on a bad cookies.txt)."""
+        if self.mode == "txt":
+            if not self.cookies_file or not Path(self.cookies_file).exists():
+                raise RuntimeError("Pick a valid cookies.txt file.")
+            return {"cookiefile": self.cookies_file}
+        if self.mode == "browser":
+            prof = (self.profile or "").strip() or None
+            return {"cookiesfrombrowser": (self.browser, prof, None, None)}
+        return {}
+
+    def identity(self) -> str:
+        """Stable string naming "who" the requests are made as (used in cache keys)."""
+        if self.mode == "txt":
+            return f"txt:{os.path.abspath(self.cookies_file or '')}"
+        if self.mode == "browser":
+            return f"browser:{self.browser}:{(self.profile or '').strip()}"
+        return "none"
+
+
+@dataclass
+class JobOptions:
+    save_dir: str = "."
+    quality: str = "best"  # one of QUALITIES.values()
+    audio_kbps: int = 0  # minimum preferred audio bitrate, 0 = Auto
+    max_vbr_kbps: int = 0  # [tbr<=X] filter / re-encode target, 0 = Auto
+    reencode: bool = False
+    try_android: bool = True  # try the Android client after normal fails
+    race_clients: bool = False  # with try_android: extract on both clients at once, keep the first usable one
+    autotune: bool = False  # adapt fragment concurrency / chunk size to measured throughput
+    ranged_connections: int = 0  # >1: fetch single-file formats over this many parallel range requests
+    targets: tuple = EXPORT_TARGETS  # outputs produced by an "export" job
+    encode_workers: int = 1  # >1: re-encode in keyframe-aligned segments on this many FFmpeg processes
+    hardlink: bool = False  # link an identical output from another folder instead of downloading again
+    stream_audio: bool = False  # MP3/WAV: pipe the audio stream into FFmpeg while it downloads
+    keep_partial: bool = False  # on cancel keep .part/intermediate files (interrupted jobs always keep them)
+    rate_limit: int = 0  # this job's own cap in bytes/sec, 0 = none (the engine's global cap still applies)
+    priority: str = "normal"  # one of PRIORITIES: its share when jobs compete for a capped link
+    auth: AuthOptions = field(default_factory=AuthOptions)
+
+    def clients(self):
+        return [None, "android"] if self.try_android else [None]
+
+    def audio_primary(self):
+        """Return the primary bestaudio selector string."""
+        return f"ba[abr>={self.audio_kbps}]" if self.audio_kbps > 0 else "ba"
+
+    def vbr_filter(self):
+        """Return a yt-dlp filter like [tbr<=X] for video bitrate, or '' for Auto.
+        tbr is in kbps and is available on most formats (separate video streams included)."""
+        v = int(self.max_vbr_kbps or 0)
+        return f"[tbr<={v}]" if v > 0 else ""
+
+    def format_attempts(self):
+        """The ordered list of format selectors tried for an MP4 download."""
+        audio_primary = self.audio_primary()
+        vfilt = self.vbr_filter()
+        if self.quality == "best":
+            v = f"bestvideo*{vfilt}"
+            if audio_primary != "ba":
+                return [f"({v}+{audio_primary})/({v}+ba)/best{vfilt}"]
+            return [f"{v}+ba/best{vfilt}"]
+        if self.quality == "720p":
+            return [fmt_720_with_vbr(vfilt)]
+        if self.quality not in TARGET_HEIGHT:
+            raise RuntimeError(f"Unknown quality: {self.quality}")
+        return height_attempts(TARGET_HEIGHT[self.quality], audio_primary, vfilt)
+
+    def audio_format(self):
+        audio_primary = self.audio_primary()
+        return f"{audio_primary}/ba" if audio_primary != "ba" else "ba"
+
+    def preferred_quality(self):
+        """Return yt-dlp/FFmpegExtractAudio preferredquality.
+
+        yt-dlp's --audio-quality accepts either:
+        - a VBR quality number from 0 (best) to 10 (worst), or
+        - an explicit bitrate like 128K (CBR/ABR depending on codec/ffmpeg).
+        """
+        return f"{self.audio_kbps}K" if self.audio_kbps > 0 else "0"
+
+
+def height_attempts(target_h: int, audio_primary: str, vfilt: str):
+    # Prefer separate video+audio, then fallback to a combined format at that height
+    v_exact = f"bv*[height={target_h}]{vfilt}"
+    v_leq = f"bv*[height<={target_h}]{vfilt}"
+
+    if audio_primary != "ba":
+        exact = f"({v_exact}+{audio_primary})/({v_exact}+ba)/b[height={target_h}]{vfilt}"
+        leq = f"({v_leq}+{audio_primary})/({v_leq}+ba)/b[height<={target_h}]{vfilt}"
+    else:
+        exact = f"{v_exact}+ba/b[height={target_h}]{vfilt}"
+        leq = f"{v_leq}+ba/b[height<={target_h}]{vfilt}"
+    return [exact, leq]
+
+
+def fmt_720_with_vbr(vfilt: str):
+    # Progressive bias path @<=720p, apply tbr filter if set
+    return f"best[height<=720][ext=mp4]{vfilt}/best[height<=720]{vfilt}"
@@ -0,0 +1,30 @@
+"""Per-user cache/data folders (no third-party dependency)."""
+import os
+import sys
+from pathlib import Path
+
+APP_NAME = "ytmedia"
+
+
+def user_cache_dir() -> Path:
+    override = os.environ.get("YTMEDIA_CACHE_DIR")
+    if override:
+        return Path(override)
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+        return Path(base) / APP_NAME / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / APP_NAME
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / APP_NAME
+
+
+def user_data_dir() -> Path:
+    override = os.environ.get("YTMEDIA_DATA_DIR")
+    if override:
+        return Path(override)
+    if os.name == "nt":
+        base = os.environ.get("APPDATA") or Path.home() / "AppData" / "Roaming"
+        return Path(base) / APP_NAME
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Application Support" / APP_NAME
+    return Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share") / APP_NAME
@@ -0,0 +1,100 @@
+"""Decide how much FFmpeg work a re-encode job actually needs.
+
+Re-encoding a stream that is already at or under the target bitrate and
+already plays in an MP4 only burns CPU. The planner looks at the selected
+formats (or, when yt-dlp didn't report bitrates, at the downloaded file) and
+picks the cheapest action that still meets the target:
+
+- ``remux``: stream copy into MP4, nothing encoded
+- ``audio``: copy the video, transcode only the audio to AAC
+- ``video``: full libx264 re-encode of the video
+"""
+from dataclasses import dataclass
+
+# Codec prefixes (yt-dlp vcodec/acodec, or FFmpeg codec names) that can be stream-copied into an MP4.
+MP4_VIDEO_CODECS = ("avc1", "avc3", "h264", "hev1", "hvc1", "hevc", "h265", "av01", "av1")
+MP4_AUDIO_CODECS = ("mp4a", "aac", "mp3", "ac-3", "ac3", "ec-3", "eac3")
+AAC_KBPS = 160  # audio transcode bitrate when the source doesn't report one
+
+
+def _codec(value) -> str | None:
+    if not value or value == "none":
+        return None
+    return str(value).lower()
+
+
+def _compatible(codec, prefixes) -> bool:
+    return codec is not None and codec.startswith(prefixes)
+
+
+@dataclass
+class EncodePlan:
+    action: str  # "remux" | "audio" | "video"
+    reason: str
+    target_kbps: int
+    video_kbps: float | None = None
+    audio_kbps: float | None = None
+    duration: float | None = None
+    transcode_audio: bool = False  # audio codec can't be copied into MP4
+
+    @property
+    def needs_probe(self) -> bool:
+        """True if the decision had to assume a re-encode because the bitrate was unknown."""
+        return self.action == "video" and self.video_kbps is None
+
+    def audio_args(self):
+        """FFmpeg audio args for the output: copy, or AAC at about the source bitrate."""
+        if not self.transcode_audio:
+            return ["-c:a", "copy"]
+        return ["-c:a", "aac", "-b:a", f"{int(min(self.audio_kbps or AAC_KBPS, 320))}k"]
+
+    def describe(self) -> str:
+        length = ""
+        if self.duration:
+            m, s = divmod(int(self.duration), 60)
+            length = f" over {m}:{s:02d}"
+        if self.action == "video":
+            return f"Encode plan: full re-encode to {self.target_kbps} kbps ({self.reason})"
+        saved = f"skips a libx264 pass{length}"
+        if self.video_kbps:
+            saved += f"; video stays at {self.video_kbps:.0f} kbps"
+        what = "stream copy" if self.action == "remux" else "copy video, transcode audio to AAC"
+        return f"Encode plan: {what} ({self.reason}) — {saved}"
+
+
+def plan_encode(formats, target_kbps: int, duration: float | None = None) -> EncodePlan:
+    """Plan from format dicts (yt-dlp's, or probe_streams() output)."""
+    video = next((f for f in formats if _codec(f.get("vcodec"))), None)
+    audio = next((f for f in formats if _codec(f.get("acodec"))), None)
+    vcodec = _codec(video and video.get("vcodec"))
+    acodec = _codec(audio and audio.get("acodec"))
+    vkbps = video and (video.get("vbr") or video.get("tbr"))
+    akbps = audio and audio.get("abr")
+    audio_bad = acodec is not None and not _compatible(acodec, MP4_AUDIO_CODECS)
+
+    def plan(action, reason):
+        return EncodePlan(action, reason, target_kbps, vkbps or None, akbps or None, duration, audio_bad)
+
+    if video is None:
+        return plan("video", "no video stream information")
+    if not _compatible(vcodec, MP4_VIDEO_CODECS):
+        return plan("video", f"{vcodec} is not MP4-compatible")
+    if not vkbps:
+        return plan("video", "source bitrate unknown")
+    if vkbps > target_kbps:
+        return plan("video", f"{vcodec} at {vkbps:.0f} kbps is above the target")
+    reason = f"{vcodec} at {vkbps:.0f} kbps ≤ {target_kbps} kbps target"
+    if audio_bad:
+        return plan("audio", f"{reason}; {acodec} audio needs AAC")
+    return plan("remux", reason)
+
+
+def probe_streams(probe: dict):
+    """Turn ffmpeg.probe_media() output into format-like dicts for plan_encode()."""
+    rows = []
+    for s in probe.get("streams") or []:
+        if s["type"] == "video":
+            rows.append({"vcodec": s["codec"], "vbr": s["kbps"]})
+        elif s["type"] == "audio":
+            rows.append({"acodec": s["codec"], "abr": s["kbps"]})
+    return rows
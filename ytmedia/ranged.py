@@ -0,0 +1,363 @@
+"""Multi-connection ranged downloader for single-file (non-fragmented) formats.
+
+A known-size file is split into byte ranges that a small pool of worker
+threads fetch in parallel, each over its own keep-alive connection, into a
+preallocated file. A failed range is retried on its own from the byte where it
+stopped; the rest of the download carries on. Finished ranges are listed in a
+``<file>.ranges`` sidecar, so a download that was stopped (or killed) picks up
+the missing ranges of its file instead of starting over. Progress is reported with the
+same dict shape yt-dlp hands to progress hooks, so ``DownloadEngine._hook``
+works unchanged.
+"""
+import http.client
+import os
+import queue
+import ssl
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from .interrupt import abort
+
+BLOCK_SIZE = 64 * 1024
+MIN_RANGE_SIZE = 256 * 1024
+MAX_REDIRECTS = 5
+RANGES_SUFFIX = ".ranges"  # sidecar: the file size, then one "start end" line per finished range
+
+
+class RangeNotSupported(RuntimeError):
+    pass
+
+
+class RangeHTTPError(RuntimeError):
+    """The server answered with an error status (what retry.classify looks at)."""
+
+    def __init__(self, status: int, message: str, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Connection:
+    """One reusable HTTP(S) connection to the (possibly redirected) download URL."""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+        self._conn = None
+
+    def _open(self):
+        parts = urlsplit(self.url)
+        if parts.scheme == "https":
+            self._conn = http.client.HTTPSConnection(
+                parts.hostname, parts.port, timeout=self.timeout, context=ssl.create_default_context()
+            )
+        else:
+            self._conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=self.timeout)
+
+    def request(self, headers: dict):
+        """GET the URL, following redirects; returns an open HTTPResponse."""
+        for _ in range(MAX_REDIRECTS + 1):
+            if self._conn is None:
+                self._open()
+            parts = urlsplit(self.url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            try:
+                self._conn.request("GET", path, headers=headers)
+                resp = self._conn.getresponse()
+            except (OSError, http.client.HTTPException):
+                self.close()
+                raise
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+                resp.read()
+                new_url = urljoin(self.url, resp.getheader("Location"))
+                if urlsplit(new_url)[:2] != parts[:2]:
+                    self.close()
+                self.url = new_url
+                continue
+            return resp
+        raise RuntimeError("Too many redirects")
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+    def abort(self):
+        """Unblock a read in progress on another thread."""
+        conn = self._conn
+        if conn is not None:
+            abort(conn)
+
+
+class RangedDownloader:
+    def __init__(
+        self,
+        connections: int = 4,
+        range_size: int = 4 * 1024 * 1024,
+        retries: int = 5,
+        timeout: float = 20.0,
+        headers: dict | None = None,
+        progress=None,
+        cancel: threading.Event | None = None,
+        throttle=None,
+        retry_sleep=None,
+    ):
+        """range_size may be a callable, asked for the size of each range as it is cut (a tuner's live setting).
+
+        throttle(n), if given, is called with each block received (a bandwidth Flow's consume).
+
+        retry_sleep(n), if given, backs off before a range's retry n (0-based) and may raise to give up
+        (a RetryPolicy's sleep); by default it waits 0.5s, doubling up to 8s.
+        """
+        self.connections = max(1, int(connections))
+        self.range_size = range_size if callable(range_size) else max(BLOCK_SIZE, int(range_size))
+        self.retries = retries
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.progress = progress
+        self.cancel = cancel or threading.Event()
+        self.throttle = throttle
+        self.retry_sleep = retry_sleep
+        self.range_retries = 0
+
+        self._lock = threading.Lock()
+        self._done = 0
+        self._error = None
+        self._conns = set()
+        self._gaps = []  # [first byte not yet cut into a range, end of the gap (exclusive)]
+        self._resumed = 0  # bytes already on disk when the download started
+        self._step = None
+        self._sidecar = None
+
+    def abort(self):
+        """Stop the download now: set cancel and break off the reads in progress."""
+        self.cancel.set()
+        with self._lock:
+            conns = list(self._conns)
+        for conn in conns:
+            conn.abort()
+
+    # ---------------- Probe ----------------
+    def probe(self, url: str):
+        """Return (final_url, size) using a 1-byte range request; raises RangeNotSupported."""
+        conn = _Connection(url, self.timeout)
+        with self._lock:
+            self._conns.add(conn)
+        try:
+            resp = conn.request({**self.headers, "Range": "bytes=0-0"})
+            if resp.status >= 400:
+                resp.read()
+                raise RangeHTTPError(resp.status, f"HTTP {resp.status} {resp.reason}", resp.getheader("Retry-After"))
+            if resp.status != 206:
+                raise RangeNotSupported(f"Server answered {resp.status} to a range request")  # body left unread
+            resp.read()
+            total = (resp.getheader("Content-Range") or "").rpartition("/")[2]
+            if not total.isdigit():
+                raise RangeNotSupported("Server did not report the file size")
+            return conn.url, int(total)
+        finally:
+            with self._lock:
+                self._conns.discard(conn)
+            conn.close()
+
+    # ---------------- Download ----------------
+    def download(self, url: str, filename: str, resume: bool = True) -> int:
+        """Download url into filename (preallocated to its size). Returns the byte count.
+
+        With resume, a filename left by an earlier run for the same size keeps the ranges its sidecar lists.
+        """
+        # The probe is authoritative: format filesizes from extractors can be estimates.
+        url, size = self.probe(url)
+
+        finished = self._finished_ranges(filename, size) if resume else None
+        if finished is None:
+            finished = []
+            with open(filename, "wb") as fh:
+                fh.truncate(size)
+            with open(filename + RANGES_SUFFIX, "w", encoding="utf-8") as fh:
+                fh.write(f"{size}\n")
+
+        if not callable(self.range_size):
+            # Several ranges per connection so fast connections pick up the slack of slow ones.
+            self._step = max(MIN_RANGE_SIZE, min(self.range_size, -(-size // (self.connections * 4))))
+        pending = queue.Queue()  # ranges to retry; new ones are cut as workers ask (_take)
+
+        self._gaps = _gaps(finished, size)
+        self._resumed = size - sum(stop - start for start, stop in self._gaps)
+        self._done = self._resumed
+        self._error = None
+        t0 = time.monotonic()
+        workers = [
+            threading.Thread(target=self._worker, args=(url, filename, pending), daemon=True)
+            for _ in range(min(self.connections, -(-(size - self._resumed) // MIN_RANGE_SIZE)) or 1)
+        ]
+        self._sidecar = open(filename + RANGES_SUFFIX, "a", encoding="utf-8")
+        for w in workers:
+            w.start()
+
+        last_report = 0.0
+        try:
+            while any(w.is_alive() for w in workers):
+                time.sleep(0.05)
+                now = time.monotonic()
+                if self.progress and now - last_report >= 0.2:
+                    last_report = now
+                    self._report(filename, size, t0, now)
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            for w in workers:
+                w.join()
+            self._sidecar.close()
+
+        if self._error is not None:
+            raise self._error
+        if self.cancel.is_set():
+            raise RuntimeError("Cancelled")
+        os.remove(filename + RANGES_SUFFIX)
+        if self.progress:
+            self._report(filename, size, t0, time.monotonic())
+        return size
+
+    @staticmethod
+    def _finished_ranges(filename, size):
+        """The [start, end] ranges an earlier run finished in filename, or None to start over."""
+        try:
+            if os.path.getsize(filename) != size:
+                return None
+            with open(filename + RANGES_SUFFIX, encoding="utf-8") as fh:
+                lines = fh.read().splitlines()
+        except OSError:
+            return None
+        if not lines or lines[0] != str(size):
+            return None
+        finished = []
+        for line in lines[1:]:
+            parts = line.split()
+            if len(parts) == 2 and all(p.isdigit() for p in parts):  # a line cut short by a kill is skipped
+                finished.append((int(parts[0]), int(parts[1])))
+        return finished
+
+    def _mark(self, start, end):
+        """Record [start, end] as on disk (its bytes are flushed first)."""
+        with self._lock:
+            self._sidecar.write(f"{start} {end}\n")
+            self._sidecar.flush()
+
+    def _report(self, filename, size, t0, now):
+        with self._lock:
+            done = self._done
+        elapsed = max(1e-6, now - t0)
+        speed = (done - self._resumed) / elapsed
+        self.progress({
+            "status": "downloading",
+            "downloaded_bytes": done,
+            "total_bytes": size,
+            "filename": filename,
+            "tmpfilename": filename,
+            "elapsed": elapsed,
+            "speed": speed,
+            "eta": int((size - done) / speed) if speed else None,
+        })
+
+    def _worker(self, url, filename, pending):
+        conn = _Connection(url, self.timeout)
+        with self._lock:
+            self._conns.add(conn)
+        try:
+            with open(filename, "r+b") as fh:
+                while not self.cancel.is_set() and self._error is None:
+                    rng = self._take(pending)
+                    if rng is None:
+                        return
+                    try:
+                        self._fetch(conn, fh, rng)
+                    except Exception as e:
+                        conn.close()
+                        rng[3] += 1
+                        with self._lock:
+                            self.range_retries += 1
+                        # 4xx answers (throttled, forbidden, gone) won't change on a retry: fail, let the caller decide
+                        final = 400 <= getattr(e, "status", 0) < 500
+                        if final or rng[3] > self.retries or self.cancel.is_set():
+                            self._error = self._error or (e if final else RuntimeError(
+                                f"Range {rng[0]}-{rng[1]} failed after {rng[3]} attempts: {e}"
+                            ))
+                            return
+                        try:
+                            self._pause(rng[3] - 1)
+                        except Exception as stop:
+                            self._error = self._error or stop
+                            return
+                        pending.put(rng)
+        finally:
+            with self._lock:
+                self._conns.discard(conn)
+            conn.close()
+
+    def _take(self, pending):
+        """A range to retry, else the next one cut from the rest of the file, else None."""
+        try:
+            return pending.get_nowait()
+        except queue.Empty:
+            pass
+        step = self._step or max(MIN_RANGE_SIZE, int(self.range_size()))
+        with self._lock:
+            if not self._gaps:
+                return None
+            gap = self._gaps[0]
+            start = gap[0]
+            end = min(start + step, gap[1]) - 1  # under the lock: another worker may cut the next range right after
+            gap[0] = end + 1
+            if gap[0] >= gap[1]:
+                self._gaps.pop(0)
+        # [start, end] inclusive, next byte to fetch, attempts so far
+        return [start, end, start, 0]
+
+    def _pause(self, n: int):
+        if self.retry_sleep is not None:
+            self.retry_sleep(n)
+        else:
+            time.sleep(min(0.5 * 2 ** n, 8.0))
+
+    def _fetch(self, conn: _Connection, fh, rng):
+        start, end, pos, _ = rng
+        resp = conn.request({**self.headers, "Range": f"bytes={pos}-{end}"})
+        if resp.status != 206:
+            resp.read()
+            raise RangeHTTPError(resp.status, f"HTTP {resp.status} for range {pos}-{end}",
+                                 resp.getheader("Retry-After"))
+        fh.seek(pos)
+        while pos <= end:
+            if self.cancel.is_set():
+                conn.close()
+                return
+            block = resp.read(min(BLOCK_SIZE, end - pos + 1))
+            if not block:
+                raise RuntimeError(f"Connection closed at byte {pos} of range {start}-{end}")
+            fh.write(block)
+            pos += len(block)
+            rng[2] = pos
+            with self._lock:
+                self._done += len(block)
+            if self.throttle is not None:
+                self.throttle(len(block))
+        fh.flush()
+        self._mark(start, end)
+
+
+def _gaps(finished, size):
+    """The [start, stop) spans of 0..size not covered by the finished [start, end] ranges."""
+    gaps, pos = [], 0
+    for start, end in sorted(finished):
+        if start > pos:
+            gaps.append([pos, start])
+        pos = max(pos, end + 1)
+    if pos < size:
+        gaps.append([pos, size])
+    return gaps
@@ -0,0 +1,264 @@
+"""One retry policy for every attempt of every job: what failed, how long to back off, when to stop.
+
+- ``classify(error)`` sorts a failure into ``throttled`` (HTTP 429, "too many
+  requests"), ``forbidden`` (403, sign-in and bot checks, private or
+  members-only videos: cookies or another client may help), ``unavailable``
+  (the video is removed, blocked or not out yet: nothing will help),
+  ``format`` (nothing in the quality ladder: another client may list other
+  formats) or ``network`` (timeouts, resets, DNS, 5xx); None for anything else
+- yt-dlp's own retries (HTTP, fragments, extractor API calls, file access)
+  and RangedDownloader's per-range retries sleep through ``sleep``: full-jitter
+  exponential backoff, ``random(0, min(cap, base * 2**n))``, cut short by a
+  cancel, with at most ``budget`` seconds of it per job run
+- the engine tells the policy about every failed client attempt. A
+  ``throttled`` one opens the breaker shared by all jobs: for ``cooldown``
+  seconds (or the server's Retry-After) no job starts a request (``wait``).
+  After that it is half open: one job at a time goes ahead until one gets
+  through, which closes it. Every trip in a row doubles the cool-down, up to
+  ``max_cooldown``; ``cooldown=0`` turns the breaker off. A throttled attempt
+  is tried again on the same client (``again``, up to ``throttle_retries``
+  times per job run) instead of using up the job's fallback clients
+"""
+import random
+import re
+import threading
+import time
+
+from .jobs import JobCancelled
+from .metrics import RETRY_KINDS
+
+THROTTLED, FORBIDDEN, UNAVAILABLE, FORMAT, NETWORK = "throttled", "forbidden", "unavailable", "format", "network"
+ERROR_CLASSES = (THROTTLED, FORBIDDEN, UNAVAILABLE, FORMAT, NETWORK)
+
+# Checked in this order against the error text (lower case) when no HTTP status says it
+_PATTERNS = (
+    (THROTTLED, r"http(?: error)? 429|too many requests|rate[- ]limit"),
+    (UNAVAILABLE, r"video (?:is )?unavailable|has been removed|no longer available|account .*terminated"
+                  r"|not available in your country|copyright claim|live event will begin|premieres in"),
+    (FORBIDDEN, r"http(?: error)? 403|\bforbidden\b|sign in to confirm|not a bot|private video|members[- ]only"
+                r"|confirm your age|login required"),
+    (FORMAT, r"requested format is not available|no selector in the ladder matched|no audio format available"
+             r"|no video formats found"),
+    (NETWORK, r"http(?: error)? 5\d\d|timed? ?out|connection (?:reset|refused|aborted)|remote end closed"
+              r"|temporary failure|name or service not known|network is unreachable|incompleteread"
+              r"|incomplete read|unexpected eof"),
+)
+_STATUS_CLASSES = {429: THROTTLED, 403: FORBIDDEN, 401: FORBIDDEN, 404: UNAVAILABLE, 410: UNAVAILABLE}
+POLL = 0.2  # seconds between cancel checks while held by the breaker
+
+
+def _chain(error):
+    """error and the errors behind it (yt-dlp wraps them in DownloadError/ExtractorError)."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, "exc_info", None)
+        error = (getattr(error, "cause", None) or (exc_info[1] if isinstance(exc_info, tuple) else None)
+                 or error.__cause__ or error.__context__)
+
+
+def http_status(error) -> int | None:
+    """The HTTP status behind error (yt-dlp's HTTPError, RangedDownloader's), if any."""
+    for e in _chain(error):
+        status = getattr(e, "status", None)
+        if isinstance(status, int) and 400 <= status < 600:
+            return status
+    return None
+
+
+def retry_after(error) -> float | None:
+    """Seconds from a Retry-After header on the response behind error."""
+    for e in _chain(error):
+        value = getattr(e, "retry_after", None)
+        response = getattr(e, "response", None)
+        if value is None and response is not None:
+            value = (getattr(response, "headers", None) or {}).get("Retry-After")
+        try:
+            if value is not None:
+                return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass  # an HTTP date: not worth parsing
+    return None
+
+
+def classify(error) -> str | None:
+    """One of ERROR_CLASSES for a failed attempt, or None."""
+    if error is None or isinstance(error, JobCancelled):
+        return None
+    status = http_status(error)
+    if status in _STATUS_CLASSES:
+        return _STATUS_CLASSES[status]
+    if status is not None and status >= 500:
+        return NETWORK
+    text = " ".join(str(e) for e in _chain(error)).lower()
+    for kind, pattern in _PATTERNS:
+        if re.search(pattern, text):
+            return kind
+    if any(isinstance(e, (TimeoutError, ConnectionError)) for e in _chain(error)):
+        return NETWORK
+    return None
+
+
+class RetryPolicy:
+    def __init__(self, retries: int = 10, fragment_retries: int = 10, extractor_retries: int = 3,
+                 base: float = 0.5, cap: float = 15.0, budget: float = 120.0, timeout: float = 20.0,
+                 cooldown: float = 10.0, max_cooldown: float = 300.0, probe_timeout: float = 60.0,
+                 throttle_retries: int = 4, seed=None):
+        self.retries = retries
+        self.fragment_retries = fragment_retries
+        self.extractor_retries = extractor_retries
+        self.base = base  # backoff before retry n: random(0, min(cap, base * 2**n)) seconds
+        self.cap = cap
+        self.budget = budget  # seconds of backoff a job run may spend before its attempt gives up
+        self.timeout = timeout  # socket timeout for every request
+        self.cooldown = cooldown  # breaker: first hold after a throttled answer (0 = no breaker)
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout  # half open: a job that got through but hasn't reported for this long
+        self.throttle_retries = throttle_retries
+        self._rng = random.Random(seed)
+        self._cond = threading.Condition()
+        self.state = "closed"
+        self.open_until = 0.0
+        self.trips = 0  # in a row, since the breaker last closed
+        self._probe = None  # (job id, since) let through while half open
+        self.counts = {}  # error class -> failed attempts
+        self.tripped = 0
+        self.held = 0.0  # seconds jobs spent held by the breaker, summed
+        self.slept = 0.0  # seconds of retry backoff, summed
+
+    # ---------------- Backoff ----------------
+    def delay(self, n: int) -> float:
+        """Backoff before retry n (0-based): full jitter, so jobs retrying together spread out."""
+        with self._cond:
+            return self._rng.uniform(0, min(self.cap, self.base * 2 ** n))
+
+    def ydl_opts(self, job) -> dict:
+        """yt-dlp retry options whose sleeps go through this policy (and count in job.metrics)."""
+        return {
+            "retries": self.retries,
+            "fragment_retries": self.fragment_retries,
+            "extractor_retries": self.extractor_retries,
+            "socket_timeout": self.timeout,
+            "retry_sleep_functions": {k: (lambda n, k=k: self.sleep(job, k, n)) for k in RETRY_KINDS},
+        }
+
+    def sleep(self, job, kind: str, n: int = 0):
+        """Back off before yt-dlp's retry n of kind. Sleeps here (a cancel cuts it short) and returns None.
+
+        Raises RuntimeError once the job has spent its budget: the attempt fails instead of retrying on.
+        """
+        job.metrics.retry(kind, n)
+        d = self.delay(n)
+        if job.metrics.backoff + d > self.budget:
+            raise RuntimeError(f"Gave up retrying ({kind}): {job.metrics.backoff:.0f}s of backoff spent, "
+                               f"budget {self.budget:.0f}s")
+        with self._cond:  # fragment threads of one job back off at once
+            job.metrics.backoff += d
+            self.slept += d
+        job.cancel.wait(d)
+        job.check_cancelled()
+        self.wait(job)
+
+    # ---------------- Breaker ----------------
+    def failed(self, job, error) -> str | None:
+        """Count a failed attempt and return its class; a throttled one opens the breaker."""
+        kind = classify(error)
+        now = time.monotonic()
+        with self._cond:
+            self.counts[kind or "other"] = self.counts.get(kind or "other", 0) + 1
+            if kind == THROTTLED and self.cooldown > 0:
+                if self.state != "open":  # jobs failing together trip it once
+                    self.trips += 1
+                    self.tripped += 1
+                    hold = self.cooldown * 2 ** (self.trips - 1)
+                    hold = min(self.max_cooldown, max(hold, retry_after(error) or 0))
+                    self.state = "open"
+                    self.open_until = now + hold
+                    self._probe = None
+                    self._cond.notify_all()
+            elif self.state == "half_open" and self._probe is not None and self._probe[0] == job.id:
+                self._close()  # an answer that wasn't a throttle: the others may go
+        return kind
+
+    def again(self, job, error) -> bool:
+        """Whether to repeat an attempt that was throttled (counts it as a ``throttled`` retry if so)."""
+        if self.cooldown <= 0 or classify(error) != THROTTLED:
+            return False
+        if job.metrics.retries.get(THROTTLED, 0) >= self.throttle_retries:
+            return False
+        job.metrics.retry(THROTTLED)
+        return True
+
+    def success(self, job):
+        """A request got through (info extracted, media flowing); closes a half-open breaker."""
+        if self.state == "closed":
+            return
+        with self._cond:
+            if self.state == "half_open" and (self._probe is None or self._probe[0] == job.id):
+                self._close()
+
+    def release(self, job):
+        """job makes no more requests (finished, failed, cancelled): if it was the half-open probe, pick another."""
+        if self.state == "closed":
+            return
+        with self._cond:
+            if self._probe is not None and self._probe[0] == job.id:
+                self._probe = None
+                self._cond.notify_all()
+
+    def _close(self):
+        self.state = "closed"
+        self.trips = 0
+        self._probe = None
+        self._cond.notify_all()
+
+    def holding(self, job) -> float:
+        """Seconds wait(job) would hold job for now (at most; 0 = it would go straight on)."""
+        if self.state == "closed":
+            return 0.0
+        now = time.monotonic()
+        with self._cond:
+            if self.state == "open" and now < self.open_until:
+                return self.open_until - now
+            if self.state == "half_open" and self._probe is not None and self._probe[0] != job.id:
+                return max(0.0, self.probe_timeout - (now - self._probe[1]))
+        return 0.0
+
+    def wait(self, job) -> float:
+        """Block while the breaker holds job back; returns the seconds held. Raises JobCancelled on cancel."""
+        if self.state == "closed":
+            return 0.0
+        t0 = time.monotonic()
+        with self._cond:
+            while True:
+                job.check_cancelled()
+                now = time.monotonic()
+                if self.state == "closed":
+                    break
+                if self.state == "open":
+                    if now >= self.open_until:
+                        self.state = "half_open"
+                        self._probe = None
+                        continue
+                    left = self.open_until - now
+                elif self._probe is None or self._probe[0] == job.id or now - self._probe[1] > self.probe_timeout:
+                    self._probe = (job.id, now)
+                    break
+                else:
+                    left = self.probe_timeout - (now - self._probe[1])
+                self._cond.wait(min(left, POLL))
+            held = time.monotonic() - t0
+            self.held += held
+        return held
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "state": self.state,
+                "open_for": max(0.0, self.open_until - time.monotonic()) if self.state == "open" else 0.0,
+                "tripped": self.tripped,
+                "held": self.held,
+                "slept": self.slept,
+                "failures": dict(self.counts),
+            }
@@ -0,0 +1,88 @@
+"""Segmented re-encode: split at keyframes, encode the pieces in parallel, join losslessly.
+
+A single libx264 pass over a long video keeps only part of the machine busy.
+Here the video stream is cut (stream copy, so only at keyframes) into a few
+segments per worker, each segment is encoded by its own FFmpeg process with
+the same bitrate targets, and the results are concatenated with the concat
+demuxer (no second encode) together with the original audio.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from .ffmpeg import probe_media, run_ffmpeg, video_encode_args
+from .jobs import JobCancelled
+
+SEGMENTS_PER_WORKER = 3
+MIN_SEGMENT_SECONDS = 2.0
+
+
+def media_duration(path: str) -> float:
+    """Container duration in seconds; 0.0 if FFmpeg can't tell."""
+    return probe_media(path)["duration"] or 0.0
+
+
+def segmented_encode(src: str, dst: str, target_kbps: int, workers: int,
+                     cancel: threading.Event | None = None, log=None, duration: float | None = None,
+                     audio_args=("-c:a", "copy")) -> int:
+    """Re-encode src's video to target_kbps into dst (MP4, +faststart), audio per audio_args.
+
+    Returns the number of segments encoded.
+    """
+    log = log or (lambda text: None)
+    workers = max(1, int(workers))
+    duration = duration or media_duration(src)
+    seg_time = max(MIN_SEGMENT_SECONDS, duration / (workers * SEGMENTS_PER_WORKER)) if duration else 10.0
+    # Split the available cores between the parallel encoders
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    workdir = tempfile.mkdtemp(prefix=".ytmedia-seg-", dir=os.path.dirname(os.path.abspath(dst)))
+    try:
+        run_ffmpeg([
+            "-i", src, "-map", "0:v:0", "-c", "copy",
+            "-f", "segment", "-segment_time", f"{seg_time:.3f}", "-reset_timestamps", "1",
+            os.path.join(workdir, "src%05d.mkv"),
+        ], cancel)
+        sources = sorted(f for f in os.listdir(workdir) if f.startswith("src"))
+        if not sources:
+            raise RuntimeError("FFmpeg produced no segments to encode.")
+        log(f"Re-encoding {len(sources)} segments with {workers} workers…")
+
+        encoded = [os.path.join(workdir, "enc" + name[3:]) for name in sources]
+        # Own stop flag: one failed segment aborts its siblings without marking the job cancelled
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {
+                pool.submit(run_ffmpeg, [
+                    "-i", os.path.join(workdir, name), "-an",
+                    *video_encode_args(target_kbps), "-threads", threads, out,
+                ], stop)
+                for name, out in zip(sources, encoded)
+            }
+            futures = list(pending)
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_EXCEPTION)
+                if (cancel is not None and cancel.is_set()) or any(f.exception() for f in done):
+                    stop.set()
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    break
+        if cancel is not None and cancel.is_set():
+            raise JobCancelled()
+        for fut in futures:
+            err = fut.exception()
+            if err is not None and not isinstance(err, JobCancelled):
+                raise err
+
+        listing = os.path.join(workdir, "concat.txt")
+        with open(listing, "w", encoding="utf-8") as fh:
+            for path in encoded:
+                fh.write("file '{}'\n".format(path.replace("'", r"'\''")))
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", listing, "-i", src,
+            "-map", "0:v:0", "-map", "1:a:0?", "-c:v", "copy", *audio_args, "-movflags", "+faststart", dst,
+        ], cancel)
+        return len(sources)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
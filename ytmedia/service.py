@@ -0,0 +1,504 @@
+"""Local HTTP/JSON job service: the engine without the GUI, driven by other programs.
+
+``python -m ytmedia serve`` puts a JobQueue behind a small HTTP/1.1 server on
+asyncio (standard library only). One event loop serves any number of clients;
+the downloads themselves run on the queue's bounded worker pool, never on the
+loop. Requests and responses are JSON; errors are ``{"error": "..."}`` with a
+4xx/5xx status.
+
+- ``POST /jobs`` with ``{"url", "kind", "options"}`` → 201 and the job.
+  ``kind`` is mp4 (default) | mp3 | wav | export | formats; ``options`` are
+  JobOptions fields, the GUI's controls: quality, audio_kbps, max_vbr_kbps,
+  reencode, try_android, targets, priority, rate_limit, ... Fields left out
+  keep the service's defaults; ``save_dir`` is relative to the service's
+  output folder. ``auth`` can only pick the cookies the service was started
+  with (``serve --cookies/--browser``) or ``{"mode": "none"}``: a client never
+  names a file or browser profile of its own. A playlist or channel URL
+  becomes a batch: each video is a job whose ``parent`` is the batch's id;
+  finished batches are forgotten after ``BATCH_RETENTION`` seconds
+- ``GET /jobs`` (``?status=``, ``?kind=``, ``?parent=`` filter) and
+  ``GET /jobs/ID``: status, phase, progress, speed, outputs, error; a finished
+  job adds its metrics record, a batch its summary
+- ``GET /jobs/ID/events``: Server-Sent Events (``snapshot`` first, then
+  ``log``, ``progress``, ``phase`` and ``state``) for the job, or a batch and
+  its entries, until it finishes. ``GET /events`` streams every job's
+- ``POST /jobs/ID/cancel`` (or ``DELETE /jobs/ID``) cancels
+- ``GET /jobs/ID/files/KIND`` sends a finished output (mp4, mp3, wav)
+- ``GET /stats``: queue counts and throughput, the retry breaker, sessions,
+  bandwidth and the service's own counters; ``GET /health``
+
+It listens on 127.0.0.1 unless told otherwise. With a token every request
+needs ``Authorization: Bearer <token>``.
+"""
+import asyncio
+import json
+import mimetypes
+import os
+import re
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from .batch import Batch
+from .jobs import Job
+from .journal import options_from_dict, options_to_dict
+from .options import EXPORT_TARGETS, PRIORITIES, QUALITIES, JobOptions
+from .urls import is_collection_url, is_youtube_url
+
+MAX_HEADER = 64 * 1024
+MAX_BODY = 1024 * 1024
+EVENT_BACKLOG = 1000  # events held per streaming client; beyond that its log/progress events are dropped
+IDLE_SECONDS = 15.0  # keep-alive connections idle this long are closed; event streams get a comment line
+FILE_CHUNK = 256 * 1024
+BATCH_RETENTION = 3600.0  # seconds a finished batch stays listed (its entry jobs are the queue's)
+# Largest value a request may give an integer option (each one is a thread or a process per job)
+OPTION_LIMITS = {"ranged_connections": 16, "encode_workers": 16}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def job_view(job: Job, full: bool = False) -> dict:
+    """What the service tells clients about a job."""
+    v = {
+        "id": job.id,
+        "key": job.key,
+        "url": job.url,
+        "kind": job.kind,
+        "status": job.status,
+        "phase": job.phase,
+        "title": job.title,
+        "parent": job.parent,
+        "progress": round(job.progress, 4),
+        "speed": job.speed,
+        "downloaded_bytes": job.downloaded_bytes,
+        "format_ids": job.format_ids,
+        "outputs": dict(job.outputs),
+        "error": job.error,
+    }
+    if full:
+        v["options"] = options_to_dict(job.options)
+        if job.done:
+            v["metrics"] = job.metrics.record(job)
+        if job.kind == "formats" and job.status == "done" and job.result:
+            client, rows = job.result
+            v["formats"] = {"client": client, "rows": rows}
+    return v
+
+
+class _Subscriber:
+    def __init__(self, job_id=None):
+        self.job_id = job_id  # None: every job
+        self.events = asyncio.Queue(EVENT_BACKLOG)
+        self.dropped = 0
+
+
+class JobService:
+    def __init__(self, queue, output_dir: str = ".", host: str = "127.0.0.1", port: int = 8765,
+                 token: str | None = None, defaults: JobOptions | None = None):
+        """defaults: the options a request's fields are applied to (save_dir is replaced by output_dir);
+        their auth is the only one requests may use."""
+        self.queue = queue
+        self.output_dir = os.path.abspath(output_dir)
+        self.host = host
+        self.port = port
+        self.token = token or None
+        self.defaults = options_to_dict(defaults or JobOptions())
+        self.batches = {}  # batch job id -> Batch
+        self.connections = 0
+        self.requests = 0
+        self.dropped_events = 0
+        self._subscribers = set()
+        self._loop = None
+        self._server = None
+        self._routes = [
+            ("GET", r"/health", self._health),
+            ("GET", r"/stats", self._stats),
+            ("GET", r"/jobs", self._list),
+            ("POST", r"/jobs", self._submit),
+            ("GET", r"/jobs/(\d+)", self._get),
+            ("DELETE", r"/jobs/(\d+)", self._cancel),
+            ("POST", r"/jobs/(\d+)/cancel", self._cancel),
+            ("GET", r"/jobs/(\d+)/events", self._job_events),
+            ("GET", r"/events", self._all_events),
+            ("GET", r"/jobs/(\d+)/files/(\w+)", self._file),
+        ]
+        queue.subscribe(self._on_event)
+
+    # ---------------- Lifecycle ----------------
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._client, self.host, self.port, limit=MAX_HEADER)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # ---------------- Events (worker threads → loop) ----------------
+    def _on_event(self, kind, job, *payload):
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        ev = {"event": kind, "job": job.id, "parent": job.parent, "at": time.time()}
+        if kind == "log":
+            ev["text"] = payload[0]
+        elif kind == "progress":
+            ev.update(progress=round(payload[0], 4), speed=job.speed, downloaded_bytes=job.downloaded_bytes)
+        elif kind == "phase":
+            ev.update(phase=payload[0], details=payload[1])
+        elif kind == "state":
+            ev.update(status=job.status, error=job.error, outputs=dict(job.outputs))
+        try:
+            loop.call_soon_threadsafe(self._publish, ev)
+        except RuntimeError:
+            pass  # the loop has closed (shutting down)
+
+    def _publish(self, ev):
+        for sub in self._subscribers:
+            if sub.job_id is not None and sub.job_id not in (ev["job"], ev["parent"]):
+                continue
+            if sub.events.full():
+                if ev["event"] in ("log", "progress"):
+                    sub.dropped += 1
+                    self.dropped_events += 1
+                    continue
+                sub.events.get_nowait()  # phase and state changes are never dropped: make room
+                sub.dropped += 1
+                self.dropped_events += 1
+            sub.events.put_nowait(ev)
+
+    # ---------------- HTTP ----------------
+    async def _client(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    req = await asyncio.wait_for(self._read_request(reader), IDLE_SECONDS)
+                except HTTPError as e:
+                    await self._send(writer, e.status, {"error": e.message}, keep=False)
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                method, path, query, headers, body = req
+                self.requests += 1
+                keep = headers.get("connection", "").lower() != "close"
+                try:
+                    self._authorize(headers)
+                    handler, args = self._route(method, path)
+                    result = await handler(writer, query, body, *args)
+                except HTTPError as e:
+                    result = (e.status, {"error": e.message})
+                except ConnectionError:
+                    break
+                except Exception as e:
+                    result = (500, {"error": f"{type(e).__name__}: {e}"})
+                if result is None:
+                    break  # the handler streamed its own response and is done with the connection
+                status, payload, *extra = result
+                await self._send(writer, status, payload, keep, *extra)
+                if not keep:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request header too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        if "transfer-encoding" in headers:
+            raise HTTPError(501, "Chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Bad Content-Length")
+        if length > MAX_BODY:
+            raise HTTPError(413, f"Request body over {MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return method.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), headers, body
+
+    async def _send(self, writer, status: int, payload, keep: bool = True, headers=None):
+        body = json.dumps(payload).encode()
+        head = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep else 'close'}",
+            *(f"{k}: {v}" for k, v in (headers or {}).items()),
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    def _authorize(self, headers):
+        if self.token and headers.get("authorization") != f"Bearer {self.token}":
+            raise HTTPError(401, "Missing or wrong bearer token")
+
+    def _route(self, method, path):
+        allowed = []
+        for m, pattern, handler in self._routes:
+            match = re.fullmatch(pattern, path)
+            if match:
+                if m == method:
+                    return handler, [int(g) if g.isdigit() else g for g in match.groups()]
+                allowed.append(m)
+        if allowed:
+            raise HTTPError(405, f"{method} not allowed here (use {', '.join(allowed)})")
+        raise HTTPError(404, f"No such endpoint: {path}")
+
+    # ---------------- Endpoints ----------------
+    async def _health(self, writer, query, body):
+        return 200, {"ok": True}
+
+    async def _stats(self, writer, query, body):
+        engine = self.queue.engine
+        out = {
+            "queue": self.queue.stats(),
+            "workers": self.queue.max_workers,
+            "service": {
+                "connections": self.connections,
+                "requests": self.requests,
+                "streams": len(self._subscribers),
+                "dropped_events": self.dropped_events,
+            },
+        }
+        out["retry"] = engine.retry.stats()
+        if engine.sessions is not None:
+            out["sessions"] = engine.sessions.stats()
+        if engine.bandwidth is not None:
+            out["bandwidth"] = engine.bandwidth.stats()
+        return 200, out
+
+    async def _list(self, writer, query, body):
+        self._forget_batches()
+        jobs = self.queue.jobs() + [b.job for b in self.batches.values()]
+        for field in ("status", "kind"):
+            if field in query:
+                jobs = [j for j in jobs if getattr(j, field) in query[field]]
+        if "parent" in query:
+            parents = {int(p) for p in query["parent"] if p.isdigit()}
+            jobs = [j for j in jobs if j.parent in parents]
+        return 200, {"jobs": [job_view(j) for j in sorted(jobs, key=lambda j: j.id)]}
+
+    async def _submit(self, writer, query, body):
+        try:
+            req = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, f"Body is not JSON: {e}")
+        if not isinstance(req, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        unknown = set(req) - {"url", "kind", "options"}
+        if unknown:
+            raise HTTPError(400, f"Unknown field(s): {', '.join(sorted(unknown))}")
+        url = req.get("url")
+        if not isinstance(url, str) or not is_youtube_url(url):
+            raise HTTPError(400, "url must be a YouTube video, playlist or channel URL")
+        options = self._options(req.get("options") or {})
+        try:
+            job = Job(url, kind=req.get("kind") or "mp4", options=options)
+            if is_collection_url(url):
+                self._forget_batches()
+                batch = Batch(self.queue, job, on_done=self._batch_done)
+                self.batches[job.id] = batch
+                batch.start()
+            else:
+                self.queue.submit(job)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return 201, job_view(job, full=True), {"Location": f"/jobs/{job.id}"}
+
+    def _options(self, given) -> JobOptions:
+        """JobOptions from the service defaults with a request's fields applied (type-checked)."""
+        if not isinstance(given, dict):
+            raise HTTPError(400, "options must be an object")
+        d = json.loads(json.dumps(self.defaults))  # a deep copy
+        d["save_dir"] = self.output_dir
+        for key, value in given.items():
+            if key not in d:
+                raise HTTPError(400, f"Unknown option: {key}")
+            if key == "auth":
+                d["auth"] = self._auth(value)
+            elif key == "save_dir":
+                d["save_dir"] = self._save_dir(value)
+            else:
+                d[key] = _checked(key, value, d[key])
+        if d["quality"] not in QUALITIES.values():
+            raise HTTPError(400, f"quality must be one of {', '.join(dict.fromkeys(QUALITIES.values()))}")
+        if d["priority"] not in PRIORITIES:
+            raise HTTPError(400, f"priority must be one of {', '.join(PRIORITIES)}")
+        if any(t not in EXPORT_TARGETS for t in d["targets"]):
+            raise HTTPError(400, f"targets must be taken from {', '.join(EXPORT_TARGETS)}")
+        return options_from_dict(d)
+
+    def _auth(self, value) -> dict:
+        """The service's own auth, or none: a request may restate its fields but not change them."""
+        enabled = self.defaults["auth"]
+        if not isinstance(value, dict) or set(value) - set(enabled):
+            raise HTTPError(400, f"auth takes {', '.join(enabled)}")
+        if value.get("mode") == "none":
+            return {**enabled, "mode": "none"}
+        for key, given in value.items():
+            ours = enabled[key]
+            if key == "cookies_file" and isinstance(given, str) and ours:
+                given, ours = os.path.realpath(given), os.path.realpath(ours)
+            if given != ours:
+                raise HTTPError(403, "auth: only the cookies the service was started with can be used "
+                                     f"({'serve --cookies/--browser' if enabled['mode'] == 'none' else enabled['mode']})")
+        return dict(enabled)
+
+    def _save_dir(self, value) -> str:
+        if not isinstance(value, str):
+            raise HTTPError(400, "save_dir must be a string")
+        path = os.path.realpath(os.path.join(self.output_dir, value))
+        if os.path.commonpath([path, os.path.realpath(self.output_dir)]) != os.path.realpath(self.output_dir):
+            raise HTTPError(400, "save_dir must be inside the service's output folder")
+        return path
+
+    def _find(self, job_id: int) -> Job:
+        job = self.queue.get(job_id)
+        if job is None and job_id in self.batches:
+            job = self.batches[job_id].job
+        if job is None:
+            raise HTTPError(404, f"No job {job_id}")
+        return job
+
+    async def _get(self, writer, query, body, job_id):
+        job = self._find(job_id)
+        v = job_view(job, full=True)
+        if job_id in self.batches:
+            v.pop("metrics", None)  # its entries have theirs
+            v["batch"] = self.batches[job_id].summary()
+        return 200, v
+
+    async def _cancel(self, writer, query, body, job_id):
+        job = self._find(job_id)
+        if job_id in self.batches:
+            self.batches[job_id].cancel()
+        else:
+            self.queue.cancel(job_id)
+        return 200, job_view(job)
+
+    def _batch_done(self, batch):
+        self._on_event("state", batch.job)
+
+    def _forget_batches(self):
+        """Drop batches that finished more than BATCH_RETENTION seconds ago (on the loop, like every lookup)."""
+        cutoff = time.monotonic() - BATCH_RETENTION
+        for job_id, batch in list(self.batches.items()):
+            if batch.done and (batch.job.finished_at or 0) < cutoff:
+                del self.batches[job_id]
+
+    async def _file(self, writer, query, body, job_id, kind):
+        job = self._find(job_id)
+        path = job.outputs.get(kind)
+        if job.status != "done" or not path:
+            raise HTTPError(409 if not job.done else 404, f"Job {job_id} has no finished {kind} output")
+        try:
+            fh = open(path, "rb")
+        except OSError as e:
+            raise HTTPError(410, f"Output is gone: {e}")
+        loop = asyncio.get_running_loop()
+        with fh:
+            size = os.fstat(fh.fileno()).st_size
+            name = os.path.basename(path).encode("ascii", "replace").decode().replace('"', "'")
+            head = [
+                "HTTP/1.1 200 OK",
+                f"Content-Type: {mimetypes.guess_type(path)[0] or 'application/octet-stream'}",
+                f"Content-Length: {size}",
+                f'Content-Disposition: attachment; filename="{name}"',
+                "Connection: close",
+            ]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+            while True:
+                chunk = await loop.run_in_executor(None, fh.read, FILE_CHUNK)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+        return None
+
+    async def _job_events(self, writer, query, body, job_id):
+        job = self._find(job_id)  # a batch's job is final once every entry is
+        return await self._stream(writer, _Subscriber(job_id), [job_view(job, full=True)], lambda: job.done)
+
+    async def _all_events(self, writer, query, body):
+        return await self._stream(writer, _Subscriber(), [job_view(j) for j in self.queue.active()], lambda: False)
+
+    async def _stream(self, writer, sub, snapshot, finished):
+        """Send Server-Sent Events to one client until finished() (or the client goes away)."""
+        self._subscribers.add(sub)  # before the snapshot, so nothing falls in between
+        try:
+            writer.write(("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                          "Connection: close\r\n\r\n").encode())
+            writer.write(_sse("snapshot", {"jobs": snapshot}))
+            await writer.drain()
+            while not finished():
+                try:
+                    ev = await asyncio.wait_for(sub.events.get(), IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                else:
+                    writer.write(_sse(ev["event"], ev))
+                await writer.drain()
+            while not sub.events.empty():  # what arrived along with the last state change
+                ev = sub.events.get_nowait()
+                writer.write(_sse(ev["event"], ev))
+            writer.write(_sse("end", {"dropped": sub.dropped}))
+            await writer.drain()
+        finally:
+            self._subscribers.discard(sub)
+        return None
+
+
+def _checked(key, value, default):
+    """value if it has the type of the option's default (lists for tuples) and is in range, else HTTPError(400)."""
+    if isinstance(default, bool):
+        ok = isinstance(value, bool)
+    elif isinstance(default, int):
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    elif isinstance(default, (list, tuple)):
+        ok = isinstance(value, list) and all(isinstance(v, str) for v in value)
+    else:
+        ok = isinstance(value, str)
+    if not ok:
+        raise HTTPError(400, f"Option {key} must be {type(default).__name__}, got {json.dumps(value)}")
+    if isinstance(default, int) and not isinstance(default, bool):
+        limit = OPTION_LIMITS.get(key)
+        if value < 0 or (limit is not None and value > limit):
+            raise HTTPError(400, f"Option {key} must be from 0 to {limit}" if limit is not None
+                            else f"Option {key} must be 0 or more")
+    return value
+
+
+def _sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
@@ -0,0 +1,197 @@
+"""Pool of reusable YoutubeDL sessions.
+
+A new YoutubeDL registers all ~1,800 extractor classes (tens of milliseconds),
+starts with fresh extractor instances (so the YouTube extractor loads its player
+code again) and builds a new network stack with no open connections. The engine
+creates several per job: extraction and download, for every client and attempt.
+
+A *session* is the reusable part of an instance: its extractor table and
+instances, its request director (with the keep-alive connections of yt-dlp's
+``requests`` handler, when that is installed) and its cookie jar. Sessions are
+pooled by the options that shape them (player client, auth, network settings).
+``lease(opts)`` builds a light YoutubeDL for the per-job options (output
+template, hooks, post-processors, format) and adopts an idle matching session.
+A session goes back to the pool only when the lease ends normally; after an
+error (a cancel mid-transfer included) it is closed.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from .cookies import COOKIEJAR_PARAM
+
+# YoutubeDL params baked into a session (request director, extractors); everything else is per lease
+SESSION_PARAMS = (
+    "extractor_args", "http_headers", "cookiefile", "cookiesfrombrowser", COOKIEJAR_PARAM, "proxy",
+    "socket_timeout", "source_address", "nocheckcertificate", "legacyserverconnect", "impersonate",
+    "compat_opts", "client_certificate", "client_certificate_key", "client_certificate_password",
+)
+MAX_IDLE = 4  # idle sessions kept per key
+IDLE_SECONDS = 120  # servers drop idle keep-alive connections long before this matters
+
+
+def session_key(opts) -> str:
+    parts = {}
+    for k in SESSION_PARAMS:
+        v = opts.get(k)
+        if v is not None:
+            parts[k] = id(v) if k == COOKIEJAR_PARAM else v
+    return json.dumps(parts, sort_keys=True, default=repr)
+
+
+class _Session:
+    def __init__(self, Y, key, lock):
+        self.key = key
+        self.ies = Y._ies
+        self.ie_instances = Y._ies_instances
+        self.director = Y._request_director
+        self.cookiejar = Y.cookiejar
+        self.requests = 0
+        self.idle_since = None
+        send = self.director.send
+
+        def counted(req):
+            with lock:  # the pool's: stats() sums these while other threads send
+                self.requests += 1
+            return send(req)
+
+        self.director.send = counted
+
+    def adopt(self, Y):
+        Y._ies = dict(self.ies)
+        for key, ie in self.ie_instances.items():
+            ie.set_downloader(Y)
+            Y._ies_instances[key] = ie  # over the fresh ones the factory added for the engine's own extractors
+        Y.__dict__["cookiejar"] = self.cookiejar
+        Y.__dict__["_request_director"] = self.director
+
+    def release(self, Y):
+        """Take the session back from Y before Y.close() would close its director."""
+        self.ie_instances = Y._ies_instances
+        Y.__dict__.pop("_request_director", None)
+
+    def connections(self) -> int | None:
+        """Connections the requests handler opened so far; None without it (urllib: one per request)."""
+        rh = self.director.handlers.get("Requests")
+        if rh is None:
+            return None
+        try:
+            return sum(
+                pools[k].num_connections
+                for _, session in rh._InstanceStoreMixin__instances
+                for adapter in session.adapters.values()
+                for pools in (adapter.poolmanager.pools,)
+                for k in pools.keys()
+            )
+        except AttributeError:  # handler internals changed
+            return None
+
+    def close(self):
+        self.director.close()
+
+
+class SessionPool:
+    def __init__(self, factory, max_idle: int = MAX_IDLE, idle_seconds: float = IDLE_SECONDS):
+        """factory(opts, auto_init=True) builds a YoutubeDL (DownloadEngine._new_ydl)."""
+        self._factory = factory
+        self.max_idle = max_idle
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._idle = {}  # key -> [_Session]
+        self.leases = 0
+        self.reused = 0
+        self.created = 0
+        self.discarded = 0
+        self.new_seconds = 0.0  # building a YoutubeDL with its own session
+        self.reuse_seconds = 0.0  # building one that adopts a pooled session
+        self._closed_requests = 0
+        self._closed_connections = 0
+
+    def _checkout(self, key):
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key) or []
+            while idle:
+                s = idle.pop()
+                if now - s.idle_since < self.idle_seconds:
+                    return s
+                self._retire(s)
+        return None
+
+    def _checkin(self, s: _Session):
+        s.idle_since = time.monotonic()
+        with self._lock:
+            idle = self._idle.setdefault(s.key, [])
+            idle.append(s)
+            while len(idle) > self.max_idle:
+                self._retire(idle.pop(0))
+
+    def _retire(self, s: _Session):
+        self._closed_requests += s.requests
+        conns = s.connections()
+        self._closed_connections += s.requests if conns is None else conns
+        s.close()
+
+    @contextmanager
+    def lease(self, opts):
+        """A YoutubeDL for opts, entered, on a pooled session when one matches."""
+        key = session_key(opts)
+        opts = dict(opts)  # YoutubeDL fills in defaults (http_headers, ...): keep the caller's dict keyed as it was
+        t0 = time.monotonic()
+        session = self._checkout(key)
+        if session is not None:
+            Y = self._factory(opts, auto_init=False)
+            session.adopt(Y)
+        else:
+            Y = self._factory(opts)
+            session = _Session(Y, key, self._lock)
+        took = time.monotonic() - t0
+        with self._lock:
+            self.leases += 1
+            if session.idle_since is None:
+                self.created += 1
+                self.new_seconds += took
+            else:
+                self.reused += 1
+                self.reuse_seconds += took
+        try:
+            with Y:
+                try:
+                    yield Y
+                finally:
+                    session.release(Y)
+        except BaseException:
+            with self._lock:
+                self.discarded += 1
+                self._retire(session)
+            raise
+        self._checkin(session)
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for s in idle:
+                    self._retire(s)
+            self._idle.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = [s for idle in self._idle.values() for s in idle]
+            requests = self._closed_requests + sum(s.requests for s in sessions)
+            connections = self._closed_connections
+            for s in sessions:
+                conns = s.connections()
+                connections += s.requests if conns is None else conns
+            avg_new = self.new_seconds / self.created if self.created else 0.0
+            avg_reuse = self.reuse_seconds / self.reused if self.reused else 0.0
+            return {
+                "leases": self.leases,
+                "reused": self.reused,
+                "created": self.created,
+                "discarded": self.discarded,
+                "idle": len(sessions),
+                "requests": requests,
+                "connections": connections,
+                "setup_saved_seconds": max(0.0, (avg_new - avg_reuse) * self.reused),
+            }
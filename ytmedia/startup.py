@@ -0,0 +1,107 @@
+"""Deferred engine start-up for front-ends that want their window up first.
+
+Importing yt-dlp (which the engine needs) and building the first YoutubeDL
+(which registers every extractor) take a good part of a second, several on a
+slow machine. ``EngineLoader`` does both on a background thread: it imports
+yt-dlp, builds the engine through the caller's factory and prewarms a pooled
+session with the YouTube extractor. ``get()`` hands the engine over, waiting
+only if that hasn't finished yet.
+
+``StartupTimer`` collects the timings for a one-line report, and appends them
+as a JSON line to ``YTMEDIA_STARTUP_LOG`` when that is set, so regressions show
+up when comparing runs.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    def __init__(self, t0: float | None = None):
+        """t0: time.perf_counter() at process start (default: now)."""
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.marks = {}  # name -> seconds since t0
+        self.spans = {}  # name -> seconds taken
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> float:
+        at = time.perf_counter() - self.t0
+        with self._lock:
+            self.marks[name] = at
+        return at
+
+    @contextmanager
+    def span(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.spans[name] = time.perf_counter() - t
+
+    def report(self) -> str:
+        with self._lock:
+            marks = ", ".join(f"{k} {v:.2f}s" for k, v in self.marks.items())
+            spans = ", ".join(f"{k} {v:.2f}s" for k, v in self.spans.items())
+        return f"{marks} ({spans})" if spans else marks
+
+    def write(self, path=None):
+        """Append the timings as a JSON line to path (default: $YTMEDIA_STARTUP_LOG, if set)."""
+        path = path or os.environ.get("YTMEDIA_STARTUP_LOG")
+        if not path:
+            return
+        with self._lock:
+            rec = {"at": time.time(), "marks": dict(self.marks), "spans": dict(self.spans)}
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(rec) + "\n")
+
+
+class EngineLoader:
+    def __init__(self, factory, timer: StartupTimer | None = None, prewarm: bool = True, on_ready=None):
+        """factory() builds the DownloadEngine; on_ready(loader) is called on the loader thread when done."""
+        self.factory = factory
+        self.timer = timer or StartupTimer()
+        self.prewarm = prewarm
+        self.on_ready = on_ready
+        self.engine = None
+        self.error = None  # building the engine failed (get() raises it)
+        self.prewarm_error = None  # prewarming failed (the engine works, the first job pays the set-up)
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ytmedia-startup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            with self.timer.span("yt-dlp import"):
+                import yt_dlp  # the bulk of the engine's import time, timed on its own
+            with self.timer.span("engine"):
+                self.engine = self.factory()
+            if self.prewarm:
+                with self.timer.span("prewarm"):
+                    try:
+                        self.engine.prewarm()
+                    except Exception as e:
+                        self.prewarm_error = e
+        except Exception as e:
+            self.error = e
+        finally:
+            self.timer.mark("engine ready")
+            self._ready.set()
+            if self.on_ready is not None:
+                self.on_ready(self)
+
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def get(self, timeout: float | None = None):
+        """The engine, once built and warmed up; raises what went wrong, or TimeoutError."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError("The engine is still loading")
+        if self.error is not None:
+            raise self.error
+        return self.engine
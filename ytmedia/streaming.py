@@ -0,0 +1,114 @@
+"""Audio export that pipes the downloaded bytes straight into FFmpeg.
+
+Instead of writing the whole bestaudio file to disk and converting it
+afterwards, the stream is fetched in sequential Range chunks and every block is
+handed to FFmpeg's stdin as it arrives, so the encode finishes shortly after
+the last byte does.
+"""
+import os
+import struct
+import time
+
+from yt_dlp.networking import Request
+
+from .ffmpeg import FFmpegPipe
+from .jobs import JobCancelled
+
+STREAM_CHUNK = 10 * 1024 * 1024  # per Range request, like yt-dlp's YouTube chunking
+BLOCK_SIZE = 64 * 1024
+
+# Output muxer per codec: the output is written to a .part file, so FFmpeg can't guess it.
+MUXERS = {"mp3": "mp3", "wav": "wav"}
+
+
+class NotStreamable(RuntimeError):
+    pass
+
+
+def check_streamable(fmt: dict):
+    if fmt.get("protocol") not in ("http", "https") or fmt.get("fragments"):
+        raise NotStreamable(f"protocol {fmt.get('protocol')} is not a single HTTP stream")
+    if fmt.get("vcodec") not in (None, "none"):
+        raise NotStreamable("format is not audio-only")
+
+
+def check_mp4_head(head: bytes):
+    """An MP4/M4A can only be decoded from a pipe if its moov box precedes the media data."""
+    pos = 0
+    while pos + 8 <= len(head):
+        size, box = struct.unpack(">I4s", head[pos:pos + 8])
+        if box in (b"moov", b"moof"):
+            return
+        if box == b"mdat":
+            raise NotStreamable("moov atom is at the end of the file")
+        if size == 1 and pos + 16 <= len(head):
+            size = struct.unpack(">Q", head[pos + 8:pos + 16])[0]
+        if size < 8:
+            return
+        pos += size
+
+
+def stream_to_ffmpeg(Y, fmt: dict, output: str, codec: str, codec_args, progress=None, cancel=None) -> int:
+    """Fetch fmt through Y's HTTP stack, encode on the fly into output; returns bytes read."""
+    check_streamable(fmt)
+    headers = dict(fmt.get("http_headers") or {})
+    total = fmt.get("filesize") or 0
+    tmp = f"{output}.part"
+    is_mp4 = fmt.get("ext") in ("m4a", "mp4")
+    pipe = None
+    done = 0
+    t0 = time.monotonic()
+    try:
+        while True:
+            end = done + STREAM_CHUNK - 1
+            resp = Y.urlopen(Request(fmt["url"], headers={**headers, "Range": f"bytes={done}-{end}"}))
+            ranged = resp.status == 206
+            if ranged:
+                size = (resp.headers.get("Content-Range") or "").rpartition("/")[2]
+                total = int(size) if size.isdigit() else total
+            got = 0
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise JobCancelled()
+                block = resp.read(BLOCK_SIZE)
+                if not block:
+                    break
+                if pipe is None:
+                    if is_mp4:
+                        check_mp4_head(block)
+                    pipe = FFmpegPipe(["-i", "pipe:0", "-vn", "-map", "0:a:0", *codec_args, "-f", MUXERS[codec], tmp])
+                pipe.write(block)
+                got += len(block)
+                done += len(block)
+                if progress:
+                    elapsed = max(1e-6, time.monotonic() - t0)
+                    speed = done / elapsed
+                    progress({
+                        "status": "downloading",
+                        "downloaded_bytes": done,
+                        "total_bytes": total or None,
+                        "filename": output,
+                        "tmpfilename": tmp,
+                        "elapsed": elapsed,
+                        "speed": speed,
+                        "eta": int((total - done) / speed) if total and speed else None,
+                    })
+            resp.close()
+            if not ranged or got == 0 or (total and done >= total):
+                break
+        if pipe is None:
+            raise NotStreamable("server returned no data")
+        pipe.finish()
+    except BaseException:
+        if pipe is not None:
+            pipe.kill()
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    os.replace(tmp, output)
+    if progress:
+        progress({"status": "finished", "downloaded_bytes": done, "total_bytes": done, "filename": output,
+                  "elapsed": time.monotonic() - t0})
+    return done
@@ -0,0 +1,184 @@
+"""Incremental channel / playlist sync.
+
+A channel's uploads tab lists videos newest first. A sync walks that list
+lazily and stops at the first video it already has (the channel's high-water
+mark), or after a short run of already-archived IDs in case the high-water
+video was deleted or the order shifted. Only the new uploads are queued, and
+older pages of a 10k-video channel are never requested.
+
+Per channel the archive keeps the high-water ID plus a bounded list of recently
+archived IDs in ``sync.json`` in the user data folder, so its size does not
+grow with the channel. A sync cut short by ``limit`` leaves the mark where it
+was and flags the channel as partly synced: the next sync walks past what is
+already archived, down to the old mark, instead of stopping at the first few.
+"""
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from .batch import Batch
+from .jobs import Job
+from .paths import user_data_dir
+
+RECENT_IDS = 500  # archived IDs remembered per channel
+STOP_AFTER = 5  # consecutive archived IDs that end a sync when the high-water mark wasn't seen
+
+_CHANNEL_ROOT_RE = re.compile(r"^/(?:@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)/?$")
+
+
+def channel_key(url: str) -> str:
+    parsed = urlparse(url)
+    key = parsed.path.rstrip("/").lower()
+    if "list=" in (parsed.query or ""):
+        key += "?" + parsed.query
+    return key
+
+
+def uploads_url(url: str) -> str:
+    """A channel's root page lists Videos, Shorts and Live one after another; sync its Videos tab."""
+    parsed = urlparse(url)
+    if _CHANNEL_ROOT_RE.match(parsed.path or ""):
+        return parsed._replace(path=parsed.path.rstrip("/") + "/videos").geturl()
+    return url
+
+
+class SyncArchive:
+    def __init__(self, path=None, recent: int = RECENT_IDS):
+        self.path = Path(path) if path else user_data_dir() / "sync.json"
+        self.recent = recent
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    # ---------------- Persistence ----------------
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self._state, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    # ---------------- Channels ----------------
+    def channel(self, key: str) -> dict:
+        """{"high_water": id | None, "ids": [...newest first], "synced_at": ts | None, "partial": bool} (a copy)."""
+        with self._lock:
+            ch = self._state.get(key) or {}
+            return {"high_water": ch.get("high_water"), "ids": list(ch.get("ids") or []),
+                    "synced_at": ch.get("synced_at"), "partial": bool(ch.get("partial"))}
+
+    def add(self, key: str, video_id: str):
+        with self._lock:
+            ch = self._state.setdefault(key, {"high_water": None, "ids": []})
+            if video_id not in ch["ids"]:
+                ch["ids"].insert(0, video_id)
+                del ch["ids"][self.recent:]
+            self._save()
+
+    def mark(self, key: str, high_water: str | None, partial: bool = False):
+        """Record a sync. partial: it stopped before reaching the old mark, which is kept."""
+        with self._lock:
+            ch = self._state.setdefault(key, {"high_water": None, "ids": []})
+            if partial:
+                ch["partial"] = True
+            else:
+                if high_water:
+                    ch["high_water"] = high_water
+                ch.pop("partial", None)
+            ch["synced_at"] = time.time()
+            self._save()
+
+
+class ChannelSync(Batch):
+    """A Batch that only queues uploads newer than what the archive already has.
+
+    ``limit`` caps how many new videos one sync queues (useful for the first sync
+    of a large channel); ``mark_only`` records the current newest upload as the
+    high-water mark without downloading anything.
+    """
+
+    def __init__(self, queue, job: Job, archive: SyncArchive | None = None, limit: int = 0,
+                 mark_only: bool = False, **kwargs):
+        job.url = uploads_url(job.url)
+        super().__init__(queue, job, **kwargs)
+        self.archive = archive or SyncArchive()
+        self.key = channel_key(job.url)
+        state = self.archive.channel(self.key)
+        self.high_water = state["high_water"]
+        self._known = set(state["ids"])
+        self.partial = state["partial"]  # the last sync hit its limit: new uploads may sit below archived ones
+        self.limit = max(0, int(limit or 0))
+        self.mark_only = mark_only
+        self.scanned = 0
+        self.newest = None  # first entry of this sync: the next high-water mark
+        self._run = 0
+        self._stopped_at = None
+        self._limited = False
+        self._ids = {}  # entry job id -> video id, only while the job is pending
+        self._t0 = time.monotonic()
+
+    def _should_stop(self, entry) -> bool:
+        vid = entry.get("id")
+        self.scanned += 1
+        if self.newest is None:
+            self.newest = vid
+        if self.mark_only:
+            self._stopped_at = "mark only"
+            return True
+        if vid and vid == self.high_water:
+            self._stopped_at = "high-water mark"
+            return True
+        if vid in self._known:
+            self._run += 1
+            if self._run >= STOP_AFTER and not self.partial:
+                self._stopped_at = f"{STOP_AFTER} archived videos in a row"
+                return True
+        else:
+            self._run = 0
+        if self.limit and self.counts["submitted"] >= self.limit:
+            self._stopped_at = f"limit of {self.limit}"
+            self._limited = True
+            return True
+        return False
+
+    def _skip_reason(self, entry) -> str | None:
+        if entry.get("id") in self._known:
+            return "already archived"
+        return super()._skip_reason(entry)
+
+    def _on_submitted(self, job: Job, entry):
+        self._ids[job.id] = entry["id"]
+
+    def _on_entry_finished(self, job: Job):
+        vid = self._ids.pop(job.id, None)
+        if vid and job.status == "done":
+            self.archive.add(self.key, vid)
+
+    def _finish(self):
+        s = self.summary()
+        # Only move the mark forward when every new upload made it; otherwise the
+        # failed ones are retried next time (they aren't in the archive). A run
+        # cut short by the limit never reached the old mark: moving it would hide
+        # the new uploads below the ones queued this time.
+        if self.mark_only:
+            self.archive.mark(self.key, self.newest)
+        elif self._limited:
+            self.archive.mark(self.key, None, partial=True)
+        elif not self.job.cancel.is_set() and not s["failed"] and not s["cancelled"]:
+            self.archive.mark(self.key, self.newest)
+        self.queue.engine.log(
+            self.job,
+            f"Sync scanned {self.scanned} entries in {time.monotonic() - self._t0:.1f}s, "
+            f"{s['entries'] - s['skipped']} new"
+            + (f" (stopped at {self._stopped_at})" if self._stopped_at else " (reached the end of the list)"),
+        )
+        super()._finish()
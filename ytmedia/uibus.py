@@ -0,0 +1,166 @@
+"""Coalescing event bus between worker threads and a UI thread that polls it.
+
+Workers post as fast as they like; the UI drains once per tick:
+
+- progress is kept as the latest value per key (job), not queued, so a flood
+  of hook callbacks costs one update per job per tick;
+- log lines are queued in order with the other events, and consecutive lines
+  come out of ``drain()`` as one ``("log", [lines])`` batch for a single insert.
+  Only the newest ``max_pending_logs`` lines are kept while the UI is behind;
+  the older ones are dropped and counted;
+- every other event (message boxes, state changes) is delivered in order and
+  never dropped.
+
+``LogRing`` is the matching view model: the last ``max_lines`` lines, with an
+optional spill file that keeps the whole log on disk.
+
+Nothing here imports Tk, so the bus can be driven (and benchmarked) headless.
+"""
+import threading
+import time
+from collections import deque
+
+MAX_PENDING_LOGS = 5000  # lines held while the UI thread is behind
+MAX_LOG_LINES = 2000  # lines kept in the log view
+
+
+class UIEventBus:
+    def __init__(self, max_pending_logs: int = MAX_PENDING_LOGS):
+        self.max_pending_logs = max_pending_logs
+        self._lock = threading.Lock()
+        self._events = deque()  # (kind, payload, posted_at)
+        self._progress = {}  # key -> latest value
+        self._pending_logs = 0
+        self.posted = 0
+        self.coalesced = 0  # progress updates replaced by a newer one before a drain
+        self.dropped_logs = 0
+        self.max_depth = 0
+        self.drains = 0
+        self.last_latency = 0.0  # age of the oldest event at the last drain
+        self.max_latency = 0.0
+        self.last_drain_seconds = 0.0  # time the UI took to apply the last drain (see drained())
+        self.max_drain_seconds = 0.0
+
+    # ---------------- Worker side ----------------
+    def post(self, kind: str, *payload):
+        with self._lock:
+            self.posted += 1
+            self._events.append((kind, payload, time.monotonic()))
+            if kind == "log":
+                self._pending_logs += 1
+                if self._pending_logs > self.max_pending_logs:
+                    self._drop_oldest_log()
+            self.max_depth = max(self.max_depth, len(self._events))
+
+    def log(self, text: str):
+        self.post("log", text)
+
+    def progress(self, key, value: float):
+        with self._lock:
+            self.posted += 1
+            if key in self._progress:
+                self.coalesced += 1
+            self._progress[key] = value
+
+    def _drop_oldest_log(self):
+        for i, (kind, _, _) in enumerate(self._events):
+            if kind == "log":
+                del self._events[i]
+                self._pending_logs -= 1
+                self.dropped_logs += 1
+                return
+
+    # ---------------- UI side ----------------
+    def drain(self):
+        """Take everything posted so far: (events, progress).
+
+        events is in posting order with runs of log lines merged into
+        ``("log", [lines])``; progress maps each key to its latest value.
+        """
+        with self._lock:
+            events, self._events = self._events, deque()
+            progress, self._progress = self._progress, {}
+            self._pending_logs = 0
+        now = time.monotonic()
+        latency = now - events[0][2] if events else 0.0
+        out = []
+        for kind, payload, _ in events:
+            if kind == "log":
+                if out and out[-1][0] == "log":
+                    out[-1][1].append(payload[0])
+                else:
+                    out.append(("log", [payload[0]]))
+            else:
+                out.append((kind, payload))
+        self.drains += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        return out, progress
+
+    def drained(self, seconds: float):
+        """Report how long applying the last drain took on the UI thread."""
+        self.last_drain_seconds = seconds
+        self.max_drain_seconds = max(self.max_drain_seconds, seconds)
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._events) + len(self._progress)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "posted": self.posted,
+            "coalesced": self.coalesced,
+            "dropped_logs": self.dropped_logs,
+            "drains": self.drains,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency,
+            "last_drain_seconds": self.last_drain_seconds,
+            "max_drain_seconds": self.max_drain_seconds,
+        }
+
+
+class LogRing:
+    def __init__(self, max_lines: int = MAX_LOG_LINES, spill_path=None):
+        self.max_lines = max_lines
+        self.lines = deque()
+        self.spill_path = spill_path
+        self._spill = open(spill_path, "a", encoding="utf-8") if spill_path else None
+
+    def extend(self, lines) -> tuple[str, int]:
+        """Add lines; returns the text to append to the view and how many view lines to delete from its top.
+
+        An entry may span several view lines (a traceback, a format table), so the
+        deletion counts the newlines of the entries that fell off, not the entries.
+        """
+        lines = list(lines)
+        if self._spill is not None:
+            self._spill.write("".join(f"{line}\n" for line in lines))
+            self._spill.flush()
+        on_screen = len(self.lines)
+        self.lines.extend(lines)
+        evicted = max(0, len(self.lines) - self.max_lines)
+        trim = 0
+        for i in range(evicted):
+            line = self.lines.popleft()
+            if i < on_screen:
+                trim += line.count("\n") + 1
+        shown = lines[max(0, evicted - on_screen):]  # new lines that fell off at once are never inserted
+        return "".join(f"{line}\n" for line in shown), trim
+
+    def show(self, view, lines):
+        """Add lines and mirror them in view, a Tk Text (or anything with its insert/delete/see)."""
+        text, trim = self.extend(lines)
+        view.insert("end", text)
+        if trim > 0:
+            view.delete("1.0", f"{trim + 1}.0")
+        view.see("end")
+
+    def clear(self):
+        self.lines.clear()
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
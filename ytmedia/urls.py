@@ -0,0 +1,30 @@
+"""URL helpers shared by the GUI, the CLI and the engine."""
+import re
+from urllib.parse import urlparse
+
+
+def is_youtube_url(url: str) -> bool:
+    """Cheap sanity check used before a job is queued (same rule the GUI always used)."""
+    if not url:
+        return False
+    return "youtu" in (urlparse(url).netloc or "").lower()
+
+
+_VIDEO_ID_RE = re.compile(r"(?:v=|/shorts/|/live/|/embed/|youtu\.be/|/v/)([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])")
+
+
+def video_id(url: str) -> str | None:
+    """Return the 11-character YouTube video ID in url, or None (playlists, channels, ...)."""
+    m = _VIDEO_ID_RE.search(url or "")
+    return m.group(1) if m else None
+
+
+_COLLECTION_PATH_RE = re.compile(r"^/(?:playlist|@[^/]+|channel/|c/|user/)")
+
+
+def is_collection_url(url: str) -> bool:
+    """True for playlist / channel URLs that don't point at one particular video."""
+    if not is_youtube_url(url) or video_id(url):
+        return False
+    parsed = urlparse(url)
+    return "list=" in (parsed.query or "") or bool(_COLLECTION_PATH_RE.match(parsed.path or ""))
@@ -0,0 +1,228 @@
+"""Extensions plugged into yt-dlp instances created by the engine."""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from yt_dlp.downloader import PROTOCOL_MAP, get_suitable_downloader
+from yt_dlp.downloader.common import FileDownloader
+from yt_dlp.downloader.dash import DashSegmentsFD
+from yt_dlp.downloader.hls import HlsFD
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.postprocessor.common import PostProcessor
+from yt_dlp.utils import Popen
+
+from .interrupt import ffmpeg_output
+from .ranged import RANGES_SUFFIX, RangedDownloader, RangeNotSupported
+
+RANGED_PROTOCOL = "ytmedia_ranged"
+RANGED_CONNECTIONS_PARAM = "ytmedia_ranged_connections"
+TUNE_PARAM = "ytmedia_tune"  # the job's autotune.TuneSession
+
+
+class RangedFD(FileDownloader):
+    """yt-dlp downloader backed by RangedDownloader (falls back to HttpFD without range support)."""
+
+    def real_download(self, filename, info_dict):
+        url = info_dict["url"]
+        headers = dict(info_dict.get("http_headers") or {})
+        cookies = self.ydl.cookiejar.get_cookie_header(url)
+        if cookies:
+            headers["Cookie"] = cookies
+        retries = self.params.get("retries")
+        tmpfilename = self.temp_name(filename)
+        t0 = time.time()
+        job = current_job()
+        flow = job.bandwidth if job is not None else None
+        tune = self.params.get(TUNE_PARAM)
+
+        dl = RangedDownloader(
+            connections=self.params.get(RANGED_CONNECTIONS_PARAM) or 4,
+            range_size=(lambda: tune.value(info_dict)) if tune is not None else 4 * 1024 * 1024,
+            retries=int(min(retries if retries is not None else 5, 10)),
+            timeout=self.params.get("socket_timeout") or 20.0,
+            headers=headers,
+            progress=lambda d: self._hook_progress(d, info_dict),
+            throttle=flow.consume if flow is not None else None,
+            retry_sleep=(self.params.get("retry_sleep_functions") or {}).get("http"),
+        )
+        if job is not None:
+            job.track(dl)
+        try:
+            size = dl.download(url, tmpfilename, resume=self.params.get("continuedl", True))
+        except RangeNotSupported as e:
+            self.report_warning(f"{e}; using a single connection")
+            if os.path.exists(tmpfilename + RANGES_SUFFIX):
+                # A ranged .part is preallocated to full size: HttpFD would take it for complete
+                for path in (tmpfilename, tmpfilename + RANGES_SUFFIX):
+                    os.remove(path)
+            # One plain request: HttpFD's chunked mode sends Range too, and breaks on a size-less Content-Range
+            fd = HttpFD(self.ydl, {**self.params, "http_chunk_size": 0})
+            for ph in self._progress_hooks:
+                fd.add_progress_hook(ph)
+            return fd.real_download(filename, info_dict)
+
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            "status": "finished",
+            "downloaded_bytes": size,
+            "total_bytes": size,
+            "filename": filename,
+            "elapsed": time.time() - t0,
+        }, info_dict)
+        return True
+
+
+class RangedProtocolPP(PostProcessor):
+    """Runs before download: route the selected plain HTTP(S) streams to RangedFD.
+
+    Done after format selection so yt-dlp's protocol-based format sorting is unaffected.
+    """
+
+    def run(self, info):
+        streams = info.get("requested_formats") or [info]
+        for f in streams:
+            if f.get("protocol") in ("http", "https") and not f.get("fragments"):
+                f["protocol"] = RANGED_PROTOCOL
+        if info.get("requested_formats"):
+            info["protocol"] = "+".join(f.get("protocol") or "" for f in streams)
+        return [], info
+
+
+def enable_ranged(Y, connections: int):
+    """Make Y download single-file formats over `connections` parallel ranged connections."""
+    PROTOCOL_MAP.setdefault(RANGED_PROTOCOL, RangedFD)
+    Y.params[RANGED_CONNECTIONS_PARAM] = connections
+    Y.add_post_processor(RangedProtocolPP(Y), when="before_dl")
+
+
+# ---------------- Live autotuning ----------------
+class _Gate:
+    """Lets at most limit() callers in at once; limit may change while they wait."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while self.active >= max(1, self.limit()):
+                self._cond.wait(0.2)  # also picks up a raised limit
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+
+class TunedFragmentsMixin:
+    """Fragment downloader whose concurrency follows the job's TuneSession fragment by fragment.
+
+    The worker pool is sized for the largest setting; a gate per stream holds
+    the workers beyond the current one.
+    """
+
+    def __init__(self, ydl, params):
+        tune = params[TUNE_PARAM]
+        super().__init__(ydl, {**params, "concurrent_fragment_downloads": max(tune.tuner.steps["fragmented"])})
+        self._tune = tune
+        self._gates = {}
+        self._gates_lock = threading.Lock()
+
+    def _download_fragment(self, ctx, frag_url, info_dict, headers=None, request_data=None):
+        name = info_dict.get("format_id")
+        with self._gates_lock:
+            gate = self._gates.get(name)
+            if gate is None:
+                gate = self._gates[name] = _Gate(lambda: self._tune.value(info_dict))
+        with gate.slot():
+            return super()._download_fragment(ctx, frag_url, info_dict, headers, request_data)
+
+
+class TunedDashFD(TunedFragmentsMixin, DashSegmentsFD):
+    pass
+
+
+class TunedHlsFD(TunedFragmentsMixin, HlsFD):
+    pass
+
+
+# yt-dlp's native fragment downloader -> (protocol, tuned subclass)
+TUNED_FDS = {DashSegmentsFD: ("ytmedia_tuned_dash", TunedDashFD), HlsFD: ("ytmedia_tuned_hls", TunedHlsFD)}
+
+
+class TunedProtocolPP(PostProcessor):
+    """Runs before download: route the selected streams yt-dlp would fetch natively to downloaders
+    that read the TuneSession live (RangedFD for plain HTTP(S), the Tuned*FD for DASH/HLS).
+    """
+
+    def run(self, info):
+        streams = info.get("requested_formats") or [info]
+        for f in streams:
+            if f.get("protocol") in ("http", "https") and not f.get("fragments"):
+                f["protocol"] = RANGED_PROTOCOL
+                continue
+            fd = get_suitable_downloader(f, self._downloader.params, None)
+            if fd in TUNED_FDS:
+                f["protocol"] = TUNED_FDS[fd][0]
+        if info.get("requested_formats"):
+            info["protocol"] = "+".join(f.get("protocol") or "" for f in streams)
+        return [], info
+
+
+def enable_tuning(Y, session):
+    """Make Y's native downloads follow session's settings, chunk by chunk and fragment by fragment."""
+    PROTOCOL_MAP.setdefault(RANGED_PROTOCOL, RangedFD)
+    for protocol, fd in TUNED_FDS.values():
+        PROTOCOL_MAP.setdefault(protocol, fd)
+    Y.params[TUNE_PARAM] = session
+    Y.params.setdefault(RANGED_CONNECTIONS_PARAM, 1)  # sequential ranges, like HttpFD's chunked mode
+    Y.add_post_processor(TunedProtocolPP(Y), when="before_dl")
+
+
+# ---------------- Subprocess tracking ----------------
+_owner = threading.local()
+_install_lock = threading.Lock()
+_popen_init = None
+_users = 0  # threads inside track_subprocesses(); Popen.__init__ is patched only while > 0
+
+
+def _tracked_init(self, *args, **kwargs):
+    _popen_init(self, *args, **kwargs)
+    job = current_job()
+    if job is not None:
+        out = ffmpeg_output(self.args)
+        if out:
+            job.intermediates.append(out)
+        job.track(self)
+
+
+def current_job():
+    """The job running on this thread inside track_subprocesses(), if any."""
+    return getattr(_owner, "job", None)
+
+
+@contextmanager
+def track_subprocesses(job):
+    """Register every process yt-dlp starts on this thread (FFmpeg post-processors) with job.
+
+    yt-dlp's Popen.__init__ is wrapped while any thread is inside; the last one out restores it.
+    """
+    global _popen_init, _users
+    with _install_lock:
+        if _users == 0:
+            _popen_init, Popen.__init__ = Popen.__init__, _tracked_init
+        _users += 1
+    prev, _owner.job = getattr(_owner, "job", None), job
+    try:
+        yield
+    finally:
+        _owner.job = prev
+        with _install_lock:
+            _users -= 1
+            if _users == 0:
+                Popen.__init__ = _popen_init